@@ -45,6 +45,33 @@ def create_app():
     from app.api import router as api_router
     app.include_router(api_router, prefix="/api", tags=["API"])
     
+    # Métriques Prometheus (/metrics) et latence HTTP par route
+    from app.metrics import install as install_metrics
+    install_metrics(app)
+    
+    # Writer d'ingestion BLE -> BDD (écriture différée par lots)
+    from app.services.ingestion import ingestion_queue
+    from app.services.live_state import live_state
+    
+    @app.on_event("startup")
+    async def start_ingestion():
+        await ingestion_queue.start()
+        # État initial du topic WebSocket 'live' (clients arrivant en cours de route)
+        await live_state.start()
+        # Scanner BLE continu (table des appareils à proximité)
+        from config import Config
+        if Config.BLE_SCANNER_ENABLED:
+            from app.services.ble_scanner import device_scanner
+            await device_scanner.start()
+    
+    @app.on_event("shutdown")
+    async def stop_ingestion():
+        from app.services.ble_manager import ble_pool
+        from app.services.ble_scanner import device_scanner
+        await device_scanner.stop()
+        await ble_pool.disconnect_all()
+        await ingestion_queue.stop()
+    
     # Routes HTML (dashboard, etc.)
     from app import routes
     routes.init_app(app)
@@ -61,8 +88,9 @@ def create_app():
         await manager.connect(websocket)
         try:
             while True:
-                # Garder la connexion ouverte en attendant des messages
+                # Messages de contrôle : souscription aux topics, encodage
                 data = await websocket.receive_text()
+                await manager.handle_client_message(websocket, data)
         except WebSocketDisconnect:
             manager.disconnect(websocket)
             logger.info("Client WebSocket déconnecté.")
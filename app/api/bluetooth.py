@@ -3,11 +3,14 @@ Routes API pour la gestion Bluetooth
 Gere la connexion et envoi de messages/images au robot
 Utilise FastAPI avec support async natif
 """
-from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+from typing import Optional
+from fastapi import HTTPException, Query, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel, Field
 from app.api import router
 from app.api.websocket_manager import manager
-from app.services.ble_manager import ble_manager
+from app.services.ble_manager import IMAGES, ble_pool
+from app.services.ble_scanner import device_scanner
+from app.services.gatt_cache import gatt_cache
 
 
 class MessageRequest(BaseModel):
@@ -18,9 +21,47 @@ class ImageRequest(BaseModel):
     name: str = Field(...)
 
 
+def get_device_manager(address: Optional[str], create: bool = True):
+    """Recupere le gestionnaire BLE du device demande (defaut: robot par defaut)"""
+    ble_manager = ble_pool.get(address, create=create)
+    if ble_manager is None:
+        raise HTTPException(status_code=404, detail={
+            'success': False,
+            'message': f'Device {address} inconnu'
+        })
+    return ble_manager
+
+
+@router.get('/ble/devices')
+async def list_ble_devices():
+    """Liste les robots du pool et leur statut de connexion"""
+    devices = await ble_pool.get_status()
+    return {
+        'devices': devices,
+        'count': len(devices),
+        'connected': sum(1 for d in devices if d['connected']),
+        'default': ble_pool.default_address
+    }
+
+
+@router.delete('/ble/devices/{address}')
+async def remove_ble_device(address: str):
+    """Deconnecte et retire un robot du pool"""
+    if not await ble_pool.remove(address):
+        raise HTTPException(status_code=404, detail={
+            'success': False,
+            'message': f'Device {address} inconnu'
+        })
+    return {
+        'success': True,
+        'message': f'Device {address} retire du pool'
+    }
+
+
 @router.get('/ble/status')
-async def get_ble_status():
+async def get_ble_status(address: Optional[str] = Query(None)):
     """Recupere le statut de la connexion Bluetooth"""
+    ble_manager = get_device_manager(address, create=False)
     return {
         'connected': ble_manager.is_connected,
         'device': ble_manager.address
@@ -28,8 +69,9 @@ async def get_ble_status():
 
 
 @router.post('/ble/connect')
-async def connect_bluetooth():
+async def connect_bluetooth(address: Optional[str] = Query(None)):
     """Etablit une connexion Bluetooth avec le robot"""
+    ble_manager = get_device_manager(address)
     try:
         result = await ble_manager.connect()
         
@@ -44,6 +86,8 @@ async def connect_bluetooth():
                 'success': False,
                 'message': result.get('message', 'Echec de la connexion au robot')
             })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail={
             'success': False,
@@ -52,8 +96,9 @@ async def connect_bluetooth():
 
 
 @router.post('/ble/disconnect')
-async def disconnect_bluetooth():
+async def disconnect_bluetooth(address: Optional[str] = Query(None)):
     """Ferme la connexion Bluetooth"""
+    ble_manager = get_device_manager(address, create=False)
     try:
         result = await ble_manager.disconnect()
         return {
@@ -68,13 +113,22 @@ async def disconnect_bluetooth():
 
 
 @router.get('/ble/scan')
-async def scan_devices(timeout: float = 5.0):
-    """Scanne les appareils Bluetooth a proximite"""
+async def scan_devices(timeout: float = 5.0, blocking: bool = Query(False)):
+    """
+    Appareils Bluetooth a proximite
+    Scanner continu actif : reponse immediate depuis sa table, sauf blocking=true
+    (scan de `timeout` secondes, ancien comportement)
+    """
     try:
-        devices = await ble_manager.scan_devices(timeout)
+        if device_scanner.is_running and not blocking:
+            devices, source = device_scanner.devices(), 'table'
+        else:
+            devices, source = await ble_pool.get().scan_devices(timeout), 'scan'
         return {
             'devices': devices,
-            'count': len(devices)
+            'count': len(devices),
+            'source': source,
+            'scanner': device_scanner.is_running
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail={
@@ -83,9 +137,34 @@ async def scan_devices(timeout: float = 5.0):
         })
 
 
+@router.get('/ble/scanner')
+async def get_scanner_status():
+    """Etat du scanner BLE continu"""
+    return device_scanner.get_stats()
+
+
+@router.post('/ble/scanner/start')
+async def start_scanner():
+    """Demarre le scanner BLE continu"""
+    if not await device_scanner.start():
+        raise HTTPException(status_code=503, detail={
+            'success': False,
+            'error': 'Demarrage du scanner impossible'
+        })
+    return {'success': True, 'scanner': device_scanner.get_stats()}
+
+
+@router.post('/ble/scanner/stop')
+async def stop_scanner():
+    """Arrete le scanner BLE continu"""
+    await device_scanner.stop()
+    return {'success': True, 'scanner': device_scanner.get_stats()}
+
+
 @router.post('/ble/message')
-async def send_text_message(request: MessageRequest):
+async def send_text_message(request: MessageRequest, address: Optional[str] = Query(None)):
     """Envoie un message texte au robot"""
+    ble_manager = get_device_manager(address, create=False)
     try:
         success = await ble_manager.send_message(request.message)
         
@@ -109,10 +188,18 @@ async def send_text_message(request: MessageRequest):
 
 
 @router.post('/ble/image')
-async def send_led_image(request: ImageRequest):
+async def send_led_image(request: ImageRequest, address: Optional[str] = Query(None)):
     """Envoie une image predefinie a la matrice LED"""
+    ble_manager = get_device_manager(address, create=False)
+    image = IMAGES.get(request.name)
+    if image is None:
+        raise HTTPException(status_code=400, detail={
+            'success': False,
+            'message': f'Image "{request.name}" inconnue',
+            'available_images': list(IMAGES.keys())
+        })
     try:
-        success = await ble_manager.send_image(request.name)
+        success = await ble_manager.send_image(image)
         
         if success:
             return {
@@ -122,7 +209,7 @@ async def send_led_image(request: ImageRequest):
         else:
             raise HTTPException(status_code=400, detail={
                 'success': False,
-                'message': f'Image "{request.name}" inconnue ou erreur d\'envoi'
+                'message': f'Image "{request.name}" : erreur d\'envoi'
             })
     except HTTPException:
         raise
@@ -135,9 +222,23 @@ async def send_led_image(request: ImageRequest):
         })
 
 
+@router.get('/ble/gatt-cache')
+async def get_gatt_cache():
+    """Etat du cache des dispositions GATT"""
+    return gatt_cache.get_stats()
+
+
+@router.delete('/ble/gatt-cache')
+async def clear_gatt_cache(address: Optional[str] = Query(None)):
+    """Invalide la disposition GATT d'un robot (ou de tous) : prochaine connexion avec decouverte complete"""
+    removed = gatt_cache.invalidate(address)
+    return {'success': True, 'removed': removed}
+
+
 @router.get('/ble/services')
-async def get_ble_services():
+async def get_ble_services(address: Optional[str] = Query(None)):
     """Récupère les services et caractéristiques BLE disponibles"""
+    ble_manager = get_device_manager(address, create=False)
     if not ble_manager.is_connected:
         raise HTTPException(status_code=503, detail={
             'success': False,
@@ -155,6 +256,7 @@ async def get_ble_services():
             for char in service.characteristics:
                 char_info = {
                     'uuid': str(char.uuid),
+                    'handle': char.handle,
                     'properties': char.properties
                 }
                 service_info['characteristics'].append(char_info)
@@ -164,7 +266,8 @@ async def get_ble_services():
         return {
             'success': True,
             'services': services_list,
-            'count': len(services_list)
+            'count': len(services_list),
+            'gatt_layout': ble_manager.gatt_layout
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail={
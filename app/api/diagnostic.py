@@ -2,11 +2,18 @@
 Routes API pour le diagnostic et le debogage Bluetooth
 Permet de tester la communication avec le robot et afficher les logs
 """
-from fastapi import HTTPException
+from fastapi import HTTPException, Query
 from pydantic import BaseModel, Field
 from app.api import router
-from app.services.ble_manager import ble_manager
-from typing import List, Dict
+from app.services.ble_manager import IMAGES, ble_manager
+from app.services.ble_simulator import simulator
+from app.services.frame_capture import DIRECTIONS, frame_capture
+from app.services.ingestion import ingestion_queue
+from app.services.live_state import live_state
+from app.services.response_cache import response_cache
+from app.api.websocket_manager import manager as websocket_manager
+from config import Config
+from typing import List, Dict, Optional
 
 
 class TestDataRequest(BaseModel):
@@ -30,11 +37,91 @@ async def get_diagnostic_info():
         'device_address': ble_manager.address,
         'uuid_write': ble_manager.uuid_write,
         'is_connected': ble_manager.is_connected,
+        'framer': ble_manager.framer.get_stats(),
         'available_images': list(IMAGES.keys()),
         'images_count': len(IMAGES)
     }
 
 
+@router.get('/diagnostic/ingestion')
+async def get_ingestion_stats():
+    """
+    Récupère l'état de la file d'ingestion (profondeur, latence d'écriture des lots)
+    """
+    return {
+        'success': True,
+        'ingestion': ingestion_queue.get_stats()
+    }
+
+
+@router.get('/diagnostic/websocket')
+async def get_websocket_stats():
+    """
+    Récupère l'état de la diffusion WebSocket (retard et pertes par client)
+    """
+    return {
+        'success': True,
+        'websocket': websocket_manager.get_stats(),
+        'live_state': live_state.get_stats()
+    }
+
+
+@router.get('/diagnostic/cache')
+async def get_cache_stats():
+    """
+    Récupère l'état du cache des réponses (filigrane d'ingestion, succès, calculs regroupés)
+    """
+    return {
+        'success': True,
+        'cache': response_cache.get_stats()
+    }
+
+
+@router.get('/diagnostic/simulator')
+async def get_simulator_stats(address: Optional[str] = None):
+    """
+    Récupère l'état du simulateur BLE (robots virtuels, paquets émis, pertes)
+    et les commandes reçues par un robot virtuel si une adresse est précisée
+    """
+    if Config.BLE_BACKEND != 'simulator':
+        raise HTTPException(status_code=404, detail="Simulateur inactif (BLE_BACKEND=simulator)")
+    result = {
+        'success': True,
+        'simulator': simulator.get_stats()
+    }
+    if address:
+        result['commands'] = simulator.commands(address)
+    return result
+
+
+@router.get('/diagnostic/frames')
+async def get_captured_frames(
+    address: Optional[str] = None,
+    direction: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=10000)
+):
+    """
+    Récupère les dernières trames BLE brutes capturées (notifications reçues
+    et écritures), avec horodatage, vidage hexadécimal et ASCII
+    """
+    if direction is not None and direction not in DIRECTIONS:
+        raise HTTPException(status_code=400, detail=f"Sens invalide: {direction} ({', '.join(DIRECTIONS)})")
+    frames = frame_capture.snapshot(limit=limit, device=address, direction=direction)
+    return {
+        'success': True,
+        'capture': frame_capture.get_stats(),
+        'count': len(frames),
+        'frames': frames
+    }
+
+
+@router.delete('/diagnostic/frames')
+async def clear_captured_frames():
+    """Vide le tampon de capture des trames BLE"""
+    frame_capture.clear()
+    return {'success': True, 'capture': frame_capture.get_stats()}
+
+
 @router.post('/diagnostic/send-raw')
 async def send_raw_data(request: TestDataRequest):
     """
@@ -97,10 +184,10 @@ async def send_raw_data(request: TestDataRequest):
                     'available_images': list(IMAGES.keys())
                 })
             
-            success = await ble_manager.send_image(request.content)
+            image = IMAGES[request.content]
+            success = await ble_manager.send_image(image)
             
             # Reconstruire les données
-            image = IMAGES[request.content]
             data_sent = bytes([0x02]) + image
             data_hex = ' '.join(f'{b:02X}' for b in data_sent)
             
@@ -114,6 +201,8 @@ async def send_raw_data(request: TestDataRequest):
         else:
             raise ValueError(f"Type de données invalide: {request.data_type}")
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail={
             'success': False,
@@ -1,12 +1,19 @@
 """
 Routes API pour la maintenance et l'optimisation de la base de données
 """
+from datetime import datetime, timedelta
+from typing import Optional
 from fastapi import Query
+from fastapi.responses import StreamingResponse
 from app.api import router
 from app.models.maintenance import (
     cleanup_old_data, get_database_size, archive_old_data,
-    rebuild_database, get_data_quality, export_data
+    rebuild_database, get_data_quality, export_data,
+    iter_export, gzip_stream, dedupe_telemetry, get_duplicate_count
 )
+from app.models.archive import get_archive_info
+from app.models.statistics import backfill_rollups
+from app.services.response_cache import response_cache
 
 
 @router.get('/database/size')
@@ -41,7 +48,9 @@ def cleanup_db(
             'preview': f'Supprimera les données de plus de {days} jours'
         }
     
-    return cleanup_old_data(days)
+    result = cleanup_old_data(days)
+    response_cache.invalidate()
+    return result
 
 
 @router.post('/database/archive')
@@ -61,10 +70,21 @@ def archive_db(
             'success': False,
             'message': 'Paramètre confirm=true requis',
             'action': 'archive',
-            'preview': f'Archivera les données de plus de {days} jours'
+            'preview': f'Déplacera la télémétrie de plus de {days} jours vers l\'archive'
         }
     
-    return archive_old_data(days)
+    result = archive_old_data(days)
+    response_cache.invalidate()
+    return result
+
+
+@router.get('/database/archive')
+def get_db_archive():
+    """Récupère l'état de l'archive froide (segments, lignes, période couverte)"""
+    return {
+        'success': True,
+        'archive': get_archive_info()
+    }
 
 
 @router.post('/database/optimize')
@@ -87,19 +107,99 @@ def optimize_db(confirm: bool = Query(False)):
     return rebuild_database()
 
 
+@router.post('/database/dedupe')
+def dedupe_db(confirm: bool = Query(False)):
+    """
+    Supprime les paquets de télémétrie en double et crée l'index unique d'idempotence
+    Les lignes supprimées sont copiées dans telemetry_duplicates_backup
+    
+    Args:
+        confirm: Confirmation requise
+    """
+    if not confirm:
+        return {
+            'success': False,
+            'message': 'Paramètre confirm=true requis',
+            'action': 'dedupe',
+            'preview': f'Supprimera {get_duplicate_count()} paquet(s) de télémétrie en double'
+        }
+    
+    result = dedupe_telemetry()
+    response_cache.invalidate()
+    return result
+
+
+@router.post('/database/rollups/rebuild')
+def rebuild_rollups(
+    days: Optional[int] = Query(None, ge=1),
+    confirm: bool = Query(False)
+):
+    """
+    Reconstruit les agrégats horaires/journaliers depuis la télémétrie brute
+    
+    Args:
+        days: Ne reconstruire que les X derniers jours (défaut: tout)
+        confirm: Confirmation requise
+    """
+    if not confirm:
+        return {
+            'success': False,
+            'message': 'Paramètre confirm=true requis',
+            'action': 'rollups',
+            'preview': 'Recalculera les agrégats ' + (f'des {days} derniers jours' if days else 'de toute la télémétrie')
+        }
+    
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    result = backfill_rollups(start=since)
+    response_cache.invalidate()
+    return result
+
+
 @router.get('/database/export')
 def export_db(
-    format: str = Query('json', regex='^(json|csv)$'),
-    limit: int = Query(1000, ge=10, le=10000)
+    format: str = Query('json', regex='^(json|csv|ndjson)$'),
+    limit: Optional[int] = Query(None, ge=1),
+    table: str = Query('telemetry', regex='^(telemetry|events)$'),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    device: Optional[str] = Query(None),
+    compress: bool = Query(False),
+    include_archive: bool = Query(False)
 ):
     """
     Exporte les données
     
+    csv et ndjson sont envoyés en flux (fichier téléchargeable, sans limite de lignes),
+    json conserve la réponse historique limitée aux derniers enregistrements
+    
     Args:
-        format: Format (json ou csv)
-        limit: Nombre de records
+        format: Format (json, csv ou ndjson)
+        limit: Nombre de records (json: 1000 par défaut, 10000 max ; flux: aucune limite)
+        table: Table exportée en flux (telemetry ou events)
+        start: Début de la période (inclus)
+        end: Fin de la période (exclue)
+        device: Filtrer par adresse MAC du robot
+        compress: Compresser le flux en gzip
+        include_archive: Inclure la télémétrie archivée (segments sur disque)
     """
-    return export_data(format, limit)
+    if format == 'json':
+        return export_data(format, min(limit or 1000, 10000))
+    
+    chunks = iter_export(
+        table, format, start=start, end=end, device=device, limit=limit, include_archive=include_archive
+    )
+    filename = f"{table}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{format}"
+    media_type = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+    if compress:
+        chunks = gzip_stream(chunks)
+        filename += '.gz'
+        media_type = 'application/gzip'
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
 
 
 @router.get('/database/health')
@@ -0,0 +1,89 @@
+"""
+Pagination par curseur (keyset) sur (timestamp, id)
+
+Le curseur est opaque pour les clients : il encode la clé de la dernière ligne
+renvoyée. La page suivante filtre sur (timestamp, id) < clé, ce que SQLite
+résout par une recherche dans l'index sur timestamp (qui contient le rowid),
+quelle que soit la profondeur, contrairement à OFFSET.
+"""
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import desc, tuple_
+
+Cursor = Tuple[datetime, int]
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """
+    Encode la clé (timestamp, id) d'une ligne en curseur opaque
+
+    Args:
+        timestamp: Horodatage de la ligne
+        row_id: Identifiant de la ligne
+
+    Returns:
+        Curseur (base64 URL-safe, sans padding)
+    """
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Décode un curseur produit par encode_cursor
+
+    Args:
+        cursor: Curseur reçu du client
+
+    Returns:
+        (timestamp, id)
+
+    Raises:
+        HTTPException 400 si le curseur est invalide
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=400,
+            detail={'error': 'Curseur invalide', 'cursor': cursor}
+        )
+
+
+def keyset_query(query, model, cursor: Optional[Cursor]):
+    """
+    Applique l'ordre (timestamp DESC, id DESC) et la borne du curseur
+
+    Args:
+        query: Requête SQLAlchemy sur model
+        model: Modèle possédant les colonnes timestamp et id
+        cursor: Clé de la dernière ligne de la page précédente (None = début)
+    """
+    if cursor is not None:
+        query = query.filter(tuple_(model.timestamp, model.id) < tuple_(*cursor))
+    return query.order_by(desc(model.timestamp), desc(model.id))
+
+
+def fetch_page(query, limit: int) -> Tuple[List, Optional[str]]:
+    """
+    Lit une page et calcule le curseur suivant
+
+    Une ligne de plus que limit est lue pour savoir s'il reste des données.
+
+    Args:
+        query: Requête déjà passée par keyset_query
+        limit: Taille de la page
+
+    Returns:
+        (lignes, next_cursor) ; next_cursor vaut None sur la dernière page
+    """
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].timestamp, rows[-1].id)
@@ -6,24 +6,49 @@ from sqlalchemy.orm import Session
 from sqlalchemy import desc, func, and_
 from typing import List, Optional
 from datetime import datetime, timedelta
+from itertools import dropwhile, islice
+import numpy as np
 
 from app.api import router
-from app.models.database import get_db
+from app.api.pagination import decode_cursor, encode_cursor, fetch_page, keyset_query
+from app.models import archive
+from app.models.database import get_db, get_read_db
 from app.models.telemetry import Telemetry, Event, TelemetryStatistics, ConnectionLog
+from app.models.statistics import aggregate_window, delete_telemetry_before, get_totals, totals_summary
+from app.services.downsampling import downsample
+from app.services.response_cache import response_cache
+
+# Position des colonnes de la clé de pagination dans les lignes archivées
+_TS = archive.DICT_FIELDS.index('timestamp')
+_ID = archive.DICT_FIELDS.index('id')
 
 
 @router.get('/telemetry/latest')
 def get_latest_telemetry(
     limit: int = Query(50, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    device: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère le(s) dernier(s) paquet(s) de télémétrie
     
     Args:
         limit: Nombre maximum d'entrées à retourner (défaut: 50)
+        device: Filtrer par adresse MAC du robot (optionnel)
     """
-    telemetries = db.query(Telemetry).order_by(desc(Telemetry.timestamp)).limit(limit).all()
+    return response_cache.get_or_compute(
+        ('telemetry/latest', limit, device),
+        lambda: _latest_telemetry(db, limit, device)
+    )
+
+
+def _latest_telemetry(db: Session, limit: int, device: Optional[str]) -> dict:
+    query = db.query(Telemetry)
+    
+    if device:
+        query = query.filter(Telemetry.device_address == device.upper())
+    
+    telemetries = query.order_by(desc(Telemetry.timestamp)).limit(limit).all()
     
     if not telemetries:
         return {
@@ -44,7 +69,10 @@ def get_telemetry_history(
     limit: int = Query(100, ge=1, le=1000),
     hours: Optional[int] = Query(None, ge=1),
     mode: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    device: Optional[str] = Query(None),
+    include_archive: bool = Query(False),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère l'historique de télémétrie avec filtres avancés
@@ -53,9 +81,14 @@ def get_telemetry_history(
         limit: Nombre maximum d'entrées (défaut: 100)
         hours: Filtrer les X dernières heures (optionnel)
         mode: Filtrer par mode ("auto" ou "manual")
+        device: Filtrer par adresse MAC du robot (optionnel)
+        include_archive: Compléter avec la télémétrie archivée (segments sur disque)
+        cursor: Curseur de la page suivante (next_cursor de la réponse précédente)
     """
-    query = db.query(Telemetry).order_by(desc(Telemetry.timestamp))
+    after = decode_cursor(cursor) if cursor else None
+    query = db.query(Telemetry)
     
+    cutoff = None
     if hours:
         cutoff = datetime.utcnow() - timedelta(hours=hours)
         query = query.filter(Telemetry.timestamp >= cutoff)
@@ -63,59 +96,100 @@ def get_telemetry_history(
     if mode:
         query = query.filter(Telemetry.mode == mode.lower())
     
-    telemetries = query.limit(limit).all()
+    if device:
+        query = query.filter(Telemetry.device_address == device.upper())
+    
+    telemetries, next_cursor = fetch_page(keyset_query(query, Telemetry, after), limit)
+    data = [t.to_dict() for t in telemetries]
+    
+    if include_archive and next_cursor is None:
+        # Les lignes archivées sont toutes plus anciennes que celles de la base :
+        # le même curseur (timestamp, id) continue dans les segments
+        need = limit - len(data)
+        rows = archive.iter_rows(
+            start=cutoff,
+            end=after[0] + timedelta(microseconds=1) if after else None,
+            device=device,
+            mode=mode.lower() if mode else None,
+            descending=True
+        )
+        if after:
+            rows = dropwhile(lambda values: (values[_TS], values[_ID]) >= after, rows)
+        extra = list(islice(rows, need + 1))
+        for values in extra[:need]:
+            data.append({
+                field: value.isoformat() if isinstance(value, datetime) else value
+                for field, value in zip(archive.DICT_FIELDS, values)
+            })
+        if len(extra) > need:
+            last = extra[need - 1] if need else None
+            next_cursor = (
+                encode_cursor(last[_TS], last[_ID]) if last
+                else encode_cursor(telemetries[-1].timestamp, telemetries[-1].id)
+            )
     
     return {
         'success': True,
-        'count': len(telemetries),
-        'data': [t.to_dict() for t in telemetries]
+        'count': len(data),
+        'data': data,
+        'next_cursor': next_cursor
     }
 
 
 @router.get('/telemetry/stats')
 def get_telemetry_stats(
     hours: Optional[int] = Query(24),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère des statistiques détaillées sur les données de télémétrie
+    Calculées depuis les agrégats horaires/journaliers (telemetry_statistics)
     
     Args:
         hours: Statistiques sur les X dernières heures (défaut: 24)
     """
-    cutoff = datetime.utcnow() - timedelta(hours=hours if hours else 24)
-    recent = db.query(Telemetry).filter(Telemetry.timestamp >= cutoff)
+    hours = hours or 24
+    return response_cache.get_or_compute(
+        ('telemetry/stats', hours),
+        lambda: _telemetry_stats(db, hours)
+    )
+
+
+def _telemetry_stats(db: Session, hours: int) -> dict:
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    window = aggregate_window(db, cutoff)
     
-    all_telemetry = db.query(Telemetry)
+    def average(total, samples):
+        return total / samples if samples else 0
     
     # Calculer les statistiques
     stats = {
-        'period_hours': hours or 24,
-        'total_records': all_telemetry.count(),
-        'last_period_records': recent.count(),
+        'period_hours': hours,
+        'total_records': get_totals(db).record_count or 0,
+        'last_period_records': window['packet_count'],
         
         # Vitesse
-        'avg_speed_pwm': recent.with_entities(func.avg(Telemetry.speed_pwm)).scalar() or 0,
-        'max_speed_pwm': recent.with_entities(func.max(Telemetry.speed_pwm)).scalar() or 0,
-        'min_speed_pwm': recent.with_entities(func.min(Telemetry.speed_pwm)).scalar() or 0,
+        'avg_speed_pwm': average(window['sum_speed_pwm'], window['speed_samples']),
+        'max_speed_pwm': window['max_speed_pwm'] or 0,
+        'min_speed_pwm': window['min_speed_pwm'] or 0,
         
         # Distance
-        'total_distance_cm': recent.with_entities(func.sum(Telemetry.dist_traveled_cm)).scalar() or 0,
-        'avg_distance_cm': recent.with_entities(func.avg(Telemetry.distance_cm)).scalar() or 0,
+        'total_distance_cm': window['total_distance_cm'] or 0,
+        'avg_distance_cm': average(window['sum_distance_cm'], window['distance_samples']),
         
         # Obstacle
-        'obstacle_count': recent.with_entities(func.sum(Telemetry.obstacle_events)).scalar() or 0,
+        'obstacle_count': window['obstacle_count'] or 0,
         
         # Batterie
-        'avg_battery': recent.with_entities(func.avg(Telemetry.battery_level)).scalar() or 0,
-        'min_battery': recent.with_entities(func.min(Telemetry.battery_level)).scalar() or 0,
+        'avg_battery': average(window['sum_battery'], window['battery_samples']),
+        'min_battery': window['min_battery'] or 0,
         
         # Uptime
-        'max_uptime': recent.with_entities(func.max(Telemetry.uptime_s)).scalar() or 0,
+        'max_uptime': window['max_uptime_s'] or 0,
         
         # Mode
-        'mode_auto_count': recent.filter(Telemetry.mode == 'auto').count(),
-        'mode_manual_count': recent.filter(Telemetry.mode == 'manual').count(),
+        'mode_auto_count': window['mode_auto_count'],
+        'mode_manual_count': window['mode_manual_count'],
     }
     
     # Dernier état connu
@@ -137,56 +211,43 @@ def get_telemetry_stats(
 
 @router.get('/telemetry/total-stats')
 def get_total_telemetry_stats(
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère les statistiques TOTALES sur TOUTE la durée de la base de données
     (Distance totale, Temps de fonctionnement total, Obstacles)
+    Servies depuis les compteurs cumulés (telemetry_totals), sans parcourir la table
     """
-    all_telemetry = db.query(Telemetry).all()
-    
-    if not all_telemetry:
-        return {
-            'success': True,
-            'total_distance_m': 0,
-            'total_uptime_hours': 0,
-            'total_obstacles': 0,
-            'total_records': 0,
-            'first_record': None,
-            'last_record': None
-        }
-    
-    # Distance totale en mètres (somme de dist_traveled_cm divisée par 100)
-    total_distance_cm = db.query(func.sum(Telemetry.dist_traveled_cm)).scalar() or 0
-    total_distance_m = round(total_distance_cm / 100, 2)
-    
-    # Temps de fonctionnement total (maximum uptime_s enregistré)
-    max_uptime_s = db.query(func.max(Telemetry.uptime_s)).scalar() or 0
-    total_uptime_hours = round(max_uptime_s / 3600, 2)
-    
-    # Nombre total d'obstacles
-    total_obstacles = db.query(func.sum(Telemetry.obstacle_events)).scalar() or 0
-    
-    # Timestamps
-    first_record = db.query(Telemetry).order_by(Telemetry.timestamp).first()
-    last_record = db.query(Telemetry).order_by(desc(Telemetry.timestamp)).first()
-    
+    return response_cache.get_or_compute(
+        ('telemetry/total-stats',),
+        lambda: _total_telemetry_stats(db)
+    )
+
+
+def _total_telemetry_stats(db: Session) -> dict:
     return {
         'success': True,
-        'total_distance_m': total_distance_m,
-        'total_uptime_hours': total_uptime_hours,
-        'total_obstacles': int(total_obstacles) if total_obstacles else 0,
-        'total_records': len(all_telemetry),
-        'first_record': first_record.timestamp.isoformat() if first_record else None,
-        'last_record': last_record.timestamp.isoformat() if last_record else None
+        **totals_summary(get_totals(db))
     }
 
 
+# Champs numériques disponibles pour les tendances
+TREND_FIELDS = (
+    'speed_pwm', 'distance_cm', 'dist_traveled_cm', 'battery_level',
+    'signal_strength', 'uptime_s', 'obstacle_events'
+)
+
+
 @router.get('/telemetry/trend')
 def get_telemetry_trend(
     field: str = Query('speed_pwm'),
     minutes: int = Query(60, ge=1, le=1440),
-    db: Session = Depends(get_db)
+    max_points: Optional[int] = Query(None, ge=3, le=10000),
+    method: str = Query('lttb', regex='^(lttb|minmax|avg|min|max)$'),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    include_archive: bool = Query(False),
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère la tendance d'un champ de télémétrie
@@ -194,28 +255,56 @@ def get_telemetry_trend(
     Args:
         field: Champ à analyser (speed_pwm, distance_cm, etc.)
         minutes: Historique en minutes
+        max_points: Nombre maximum de points (sous-échantillonnage côté serveur)
+        method: Sous-échantillonnage : lttb, minmax, avg, min ou max par bucket de temps
+        start: Début de la période (remplace minutes)
+        end: Fin de la période (défaut: maintenant)
+        include_archive: Inclure la télémétrie archivée (segments sur disque)
     """
-    cutoff = datetime.utcnow() - timedelta(minutes=minutes)
+    if field not in TREND_FIELDS:
+        raise HTTPException(status_code=400, detail={
+            'success': False,
+            'message': f'Champ inconnu: {field}',
+            'available_fields': list(TREND_FIELDS)
+        })
+    
+    cutoff = start or datetime.utcnow() - timedelta(minutes=minutes)
     
+    # Colonnes brutes (jour julien -> secondes epoch) sans matérialiser d'objets ORM
     query = db.query(
-        Telemetry.timestamp,
+        (func.julianday(Telemetry.timestamp) - 2440587.5) * 86400.0,
         getattr(Telemetry, field)
     ).filter(
         Telemetry.timestamp >= cutoff
-    ).order_by(Telemetry.timestamp)
+    )
+    if end:
+        query = query.filter(Telemetry.timestamp < end)
+    rows = query.order_by(Telemetry.timestamp).all()
     
-    data = query.all()
+    data = np.array(rows, dtype=float).reshape(-1, 2)
+    x, y = data[:, 0], data[:, 1]
+    
+    if include_archive:
+        # Segments archivés : antérieurs aux lignes de la base
+        archived_x, archived_y = archive.series(field, cutoff, end)
+        x, y = np.concatenate([archived_x, x]), np.concatenate([archived_y, y])
+    raw_points = len(x)
+    
+    if max_points:
+        x, y = downsample(x, y, max_points, method)
     
     return {
         'success': True,
         'field': field,
         'minutes': minutes,
-        'data_points': len(data),
+        'data_points': len(x),
+        'raw_points': raw_points,
+        'method': method if max_points else None,
         'trend': [
             {
-                'timestamp': t[0].isoformat(),
-                'value': t[1]
-            } for t in data
+                'timestamp': datetime.utcfromtimestamp(t).isoformat(),
+                'value': None if np.isnan(v) else v
+            } for t, v in zip(x.tolist(), y.tolist())
         ]
     }
 
@@ -226,7 +315,8 @@ def get_latest_events(
     event_type: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     hours: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère les derniers événements avec filtres avancés
@@ -236,8 +326,10 @@ def get_latest_events(
         event_type: Filtrer par type
         category: Filtrer par catégorie (info, warning, critical)
         hours: Dernières X heures
+        cursor: Curseur de la page suivante (next_cursor de la réponse précédente)
     """
-    query = db.query(Event).order_by(desc(Event.timestamp))
+    after = decode_cursor(cursor) if cursor else None
+    query = db.query(Event)
     
     if event_type:
         query = query.filter(Event.event_type == event_type)
@@ -249,17 +341,18 @@ def get_latest_events(
         cutoff = datetime.utcnow() - timedelta(hours=hours)
         query = query.filter(Event.timestamp >= cutoff)
     
-    events = query.limit(limit).all()
+    events, next_cursor = fetch_page(keyset_query(query, Event, after), limit)
     
     return {
         'success': True,
         'count': len(events),
-        'data': [e.to_dict() for e in events]
+        'data': [e.to_dict() for e in events],
+        'next_cursor': next_cursor
     }
 
 
 @router.get('/events/types')
-def get_event_types(db: Session = Depends(get_db)):
+def get_event_types(db: Session = Depends(get_read_db)):
     """Liste tous les types d'événements enregistrés"""
     types = db.query(Event.event_type).distinct().all()
     
@@ -273,7 +366,7 @@ def get_event_types(db: Session = Depends(get_db)):
 def get_events_summary(
     hours: int = Query(24),
     limit: int = Query(50, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Résumé des événements par catégorie et liste des derniers événements
@@ -282,6 +375,13 @@ def get_events_summary(
         hours: Historique en heures
         limit: Nombre maximum d'événements à retourner
     """
+    return response_cache.get_or_compute(
+        ('events/summary', hours, limit),
+        lambda: _events_summary(db, hours, limit)
+    )
+
+
+def _events_summary(db: Session, hours: int, limit: int) -> dict:
     cutoff = datetime.utcnow() - timedelta(hours=hours)
     
     events_query = db.query(Event).filter(Event.timestamp >= cutoff)
@@ -308,7 +408,7 @@ def get_events_summary(
 @router.get('/events/critical')
 def get_critical_events(
     hours: int = Query(24),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Récupère tous les événements critiques des X dernières heures"""
     cutoff = datetime.utcnow() - timedelta(hours=hours)
@@ -332,22 +432,32 @@ def get_critical_events(
 def get_connection_log(
     limit: int = Query(50, ge=1, le=500),
     hours: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db)
 ):
-    """Récupère l'historique de connexion"""
-    query = db.query(ConnectionLog).order_by(desc(ConnectionLog.timestamp))
+    """
+    Récupère l'historique de connexion
+    
+    Args:
+        limit: Nombre d'entrées (défaut: 50)
+        hours: Dernières X heures
+        cursor: Curseur de la page suivante (next_cursor de la réponse précédente)
+    """
+    after = decode_cursor(cursor) if cursor else None
+    query = db.query(ConnectionLog)
     
     if hours:
         cutoff = datetime.utcnow() - timedelta(hours=hours)
         query = query.filter(ConnectionLog.timestamp >= cutoff)
     
-    logs = query.limit(limit).all()
+    logs, next_cursor = fetch_page(keyset_query(query, ConnectionLog, after), limit)
     
     return {
         'success': True,
         'count': len(logs),
         'connections': [log.to_dict() for log in logs],
-        'data': [log.to_dict() for log in logs]
+        'data': [log.to_dict() for log in logs],
+        'next_cursor': next_cursor
     }
 
 
@@ -404,14 +514,17 @@ def clear_telemetry(
             'message': 'Paramètre confirm=true requis'
         })
     
-    query = db.query(Telemetry)
+    cutoff = None
     
     if older_than_hours:
         cutoff = datetime.utcnow() - timedelta(hours=older_than_hours)
-        query = query.filter(Telemetry.timestamp < cutoff)
     
-    count = query.delete()
+    # Suppression + mise à jour des agrégats et compteurs cumulés
+    count = delete_telemetry_before(db, cutoff)
     db.commit()
+    # Segments d'archive supprimés une fois la transaction validée
+    archive.delete_before(cutoff)
+    response_cache.invalidate()
     
     return {
         'success': True,
@@ -447,6 +560,7 @@ def clear_events(
     
     count = query.delete()
     db.commit()
+    response_cache.invalidate()
     
     return {
         'success': True,
@@ -468,6 +582,7 @@ def acknowledge_event(
     
     event.acknowledged = True
     db.commit()
+    response_cache.invalidate()
     
     return {
         'success': True,
@@ -477,7 +592,7 @@ def acknowledge_event(
 
 
 @router.get('/database/info')
-def get_database_info(db: Session = Depends(get_db)):
+def get_database_info(db: Session = Depends(get_read_db)):
     """Récupère des informations sur la base de données"""
     telemetry_count = db.query(Telemetry).count()
     events_count = db.query(Event).count()
@@ -1,86 +1,517 @@
 """
 Gestionnaire WebSocket pour les notifications BLE
 Gère la diffusion des notifications à tous les clients connectés
+
+Les messages sont publiés une seule fois dans un tampon circulaire partagé ;
+chaque client possède sa propre tâche d'envoi et un curseur dans ce tampon.
+Un client lent ne retarde donc ni les autres clients ni le callback BLE.
+
+Chaque client peut souscrire à des topics et choisir un encodage en envoyant
+un message de contrôle sur la socket (ou via les paramètres de l'URL) :
+    {"action": "subscribe", "topics": ["events", "device:48:87:2D:76:B3:1D"],
+     "encoding": "msgpack", "delta": true}
+    {"action": "unsubscribe", "topics": ["raw"]}
+
+Le topic 'live' n'est envoyé qu'aux clients qui y souscrivent ; chaque souscription
+renvoie immédiatement l'état courant (snapshot) au client.
 """
-from typing import List, Set
-from fastapi import WebSocket
+import asyncio
+import json
 import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, FrozenSet, List, Optional, Set
+
+from fastapi import WebSocket
+
+from app.api.websocket_messages import (
+    BroadcastMessage, DEFAULT_TOPICS, DEVICE_TOPIC_PREFIX, TOPICS, available_encodings, telemetry_delta
+)
+from app.metrics import WEBSOCKET_SEND_LAG_SECONDS, WEBSOCKET_SEND_SECONDS
+from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Politiques de débordement d'un client en retard
+OVERFLOW_POLICIES = ('drop_oldest', 'latest', 'disconnect')
+
+# Code de fermeture WebSocket "Try Again Later"
+CLOSE_CODE_OVERLOADED = 1013
+
+
+class WebSocketClient:
+    """
+    Client WebSocket connecté : curseur de lecture et métriques d'envoi
+    """
+
+    def __init__(self, websocket: WebSocket, client_id: int, cursor: int):
+        """
+        Args:
+            websocket: Connexion WebSocket
+            client_id: Identifiant du client (ordre de connexion)
+            cursor: Numéro de séquence du prochain message à envoyer
+        """
+        self.websocket = websocket
+        self.client_id = client_id
+        self.cursor = cursor
+        self.task: Optional[asyncio.Task] = None
+        self.connected_at = datetime.utcnow()
+
+        # Souscription (None = tous les topics / tous les robots)
+        self.encoding = 'json'
+        self.topics: Optional[FrozenSet[str]] = None
+        self.devices: Optional[FrozenSet[str]] = None
+        self.delta = False
+        # Dernière télémétrie envoyée par robot (base des deltas)
+        self.last_telemetry: Dict[str, int] = {}
+
+        # Métriques
+        self.sent = 0
+        self.dropped = 0
+        self.overflows = 0
+        self.max_lag = 0
+        self.last_send_ms = 0.0
+        self.max_send_ms = 0.0
+
+    def accepts(self, message: BroadcastMessage) -> bool:
+        """Indique si le message correspond à la souscription du client"""
+        if message.target is not None:
+            return message.target == self.client_id
+        if message.topics is None:
+            return True
+        topics = self.topics if self.topics is not None else DEFAULT_TOPICS
+        if message.topics.isdisjoint(topics):
+            return False
+        # Les messages sans robot (compteurs de la flotte) passent le filtre par robot
+        if self.devices is not None and message.device is not None and message.device not in self.devices:
+            return False
+        return True
+
+    def subscription(self) -> Dict[str, any]:
+        """Souscription courante du client"""
+        return {
+            'topics': sorted(self.topics) if self.topics is not None else list(DEFAULT_TOPICS),
+            'devices': sorted(self.devices) if self.devices is not None else None,
+            'encoding': self.encoding,
+            'delta': self.delta
+        }
+
+    def get_stats(self, head: int) -> Dict[str, any]:
+        """
+        Métriques du client
+
+        Args:
+            head: Numéro de séquence du prochain message publié
+        """
+        client = self.websocket.client
+        return {
+            'id': self.client_id,
+            'remote': f"{client.host}:{client.port}" if client else None,
+            'connected_at': self.connected_at.isoformat(),
+            **self.subscription(),
+            'lag': head - self.cursor,
+            'max_lag': self.max_lag,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'overflows': self.overflows,
+            'last_send_ms': round(self.last_send_ms, 3),
+            'max_send_ms': round(self.max_send_ms, 3)
+        }
+
 
 class WebSocketManager:
     """
     Gestionnaire de connexions WebSocket
     Permet la diffusion de messages à tous les clients connectés
     """
-    
-    def __init__(self):
-        """Initialise le gestionnaire avec une liste vide de connexions"""
-        self.active_connections: List[WebSocket] = []
-    
+
+    def __init__(
+        self,
+        queue_size: int = Config.WS_SEND_QUEUE_SIZE,
+        overflow_policy: str = Config.WS_OVERFLOW_POLICY,
+        send_timeout_s: float = Config.WS_SEND_TIMEOUT_S,
+        keyframe_interval: int = Config.WS_DELTA_KEYFRAME_INTERVAL
+    ):
+        """
+        Initialise le gestionnaire sans connexion
+
+        Args:
+            queue_size: Nombre maximum de messages en attente par client
+            overflow_policy: 'drop_oldest', 'latest' ou 'disconnect'
+            send_timeout_s: Délai maximum d'un envoi avant déconnexion du client
+            keyframe_interval: Télémétrie complète envoyée tous les N paquets en mode delta
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            logger.warning(f"⚠️ Politique de débordement inconnue '{overflow_policy}', utilisation de 'drop_oldest'")
+            overflow_policy = 'drop_oldest'
+
+        self.queue_size = max(1, queue_size)
+        self.overflow_policy = overflow_policy
+        self.send_timeout_s = send_timeout_s
+        self.keyframe_interval = max(1, keyframe_interval)
+
+        # Tampon circulaire partagé : le message de séquence n est en _ring[n % queue_size]
+        self._ring: List[Optional[BroadcastMessage]] = [None] * self.queue_size
+        self._head = 0
+        self._wakeup = asyncio.Event()
+
+        # Dernière télémétrie publiée par robot : (seq, télémétrie, paquets depuis la keyframe)
+        self._last_telemetry: Dict[str, tuple] = {}
+
+        self._clients: Dict[WebSocket, WebSocketClient] = {}
+        self._next_client_id = 1
+
+        # Fournisseurs d'état courant par topic, envoyé à chaque souscription
+        self._snapshots: Dict[str, Callable[[Optional[FrozenSet[str]]], dict]] = {}
+
+        # Statistiques globales
+        self.published = 0
+        self.disconnected_slow = 0
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        """Connexions WebSocket actives"""
+        return list(self._clients)
+
     async def connect(self, websocket: WebSocket):
         """
         Ajoute une nouvelle connexion WebSocket
-        
+
         Args:
             websocket: La connexion WebSocket à ajouter
         """
         await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"✓ Client WebSocket connecté. Total: {len(self.active_connections)}")
-    
+        client = WebSocketClient(websocket, self._next_client_id, self._head)
+        self._next_client_id += 1
+
+        # Souscription initiale via l'URL (?topics=events,raw&encoding=compact&delta=1)
+        params = websocket.query_params
+        if params.get('topics') or params.get('encoding') or params.get('delta'):
+            error = self._apply_subscription(client, {
+                'action': 'subscribe',
+                'topics': [t for t in (params.get('topics') or '').split(',') if t],
+                'encoding': params.get('encoding'),
+                'delta': params.get('delta') in ('1', 'true') if params.get('delta') else None
+            })
+            if error:
+                logger.warning(f"⚠️ Souscription WebSocket invalide: {error}")
+
+        client.task = asyncio.create_task(self._sender(client))
+        self._clients[websocket] = client
+        logger.info(f"✓ Client WebSocket connecté. Total: {len(self._clients)}")
+
     def disconnect(self, websocket: WebSocket):
         """
         Supprime une connexion WebSocket
-        
+
         Args:
             websocket: La connexion WebSocket à supprimer
         """
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            logger.info(f"✓ Client WebSocket déconnecté. Total: {len(self.active_connections)}")
-    
+        client = self._clients.pop(websocket, None)
+        if client is None:
+            return
+        if client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+        logger.info(f"✓ Client WebSocket déconnecté. Total: {len(self._clients)}")
+
+    def publish(self, message: BroadcastMessage):
+        """
+        Publie un message pour tous les clients sans attendre les envois
+        Coût constant quel que soit le nombre de clients ou leur retard
+
+        Args:
+            message: Le message à diffuser
+        """
+        message.seq = self._head
+        message.published_at = time.perf_counter()
+        if message.topics is not None and 'telemetry' in message.topics:
+            self._track_telemetry(message)
+
+        self._ring[self._head % self.queue_size] = message
+        self._head += 1
+        self.published += 1
+
+        # Réveiller les tâches d'envoi en attente
+        wakeup = self._wakeup
+        self._wakeup = asyncio.Event()
+        wakeup.set()
+
     async def broadcast(self, message: str):
         """
         Diffuse un message à tous les clients connectés
-        
+
         Args:
             message: Le message à diffuser (JSON)
         """
-        if not self.active_connections:
+        if not self._clients:
             logger.debug("Aucun client WebSocket connecté pour la diffusion")
             return
-        
-        # Copier la liste pour éviter les modifications pendant l'itération
-        connections_copy = self.active_connections.copy()
-        
-        for connection in connections_copy:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"Erreur lors de l'envoi WebSocket: {str(e)}")
-                # Supprimer la connexion défectueuse
-                self.disconnect(connection)
-    
+        self.publish(BroadcastMessage(text=message))
+
     async def broadcast_json(self, data: dict):
         """
         Diffuse un message JSON à tous les clients connectés
-        
+
         Args:
             data: Le dictionnaire à envoyer (sera sérialisé en JSON)
         """
-        import json
-        await self.broadcast(json.dumps(data))
-    
+        if not self._clients:
+            return
+        self.publish(BroadcastMessage(payload=data))
+
+    async def broadcast_notification(self, notification_data: dict, packet: bytes):
+        """
+        Diffuse une notification BLE selon les topics et encodages des clients
+        La sérialisation n'a lieu qu'à l'envoi, une fois par variante demandée
+
+        Args:
+            notification_data: Notification complète (format historique)
+            packet: Paquet brut reçu
+        """
+        if not self._clients:
+            return
+        self.publish(BroadcastMessage.notification(notification_data, packet))
+
+    async def broadcast_live(self, payload: dict, device: Optional[str] = None):
+        """
+        Diffuse un changement d'état du dashboard aux clients souscrits au topic 'live'
+
+        Args:
+            payload: Message complet ({"type": "live_state", ...})
+            device: Adresse MAC du robot concerné (None = toute la flotte)
+        """
+        if not self._clients:
+            return
+        self.publish(BroadcastMessage.live(payload, device))
+
+    def register_snapshot(self, topic: str, provider: Callable[[Optional[FrozenSet[str]]], dict]):
+        """
+        Enregistre le fournisseur de l'état courant d'un topic
+
+        Args:
+            topic: Topic concerné (ex: 'live')
+            provider: Fonction (robots souscrits ou None) -> message à envoyer
+        """
+        self._snapshots[topic] = provider
+
+    def _track_telemetry(self, message: BroadcastMessage):
+        """Calcule le delta de télémétrie par rapport au paquet précédent du même robot"""
+        telemetry = message.parts['telemetry']
+        previous = self._last_telemetry.get(message.device)
+        since_keyframe = 0
+        if previous is not None and previous[2] + 1 < self.keyframe_interval:
+            message.delta = telemetry_delta(previous[1], telemetry)
+            message.delta_base = previous[0]
+            since_keyframe = previous[2] + 1
+        self._last_telemetry[message.device] = (message.seq, telemetry, since_keyframe)
+
+    async def handle_client_message(self, websocket: WebSocket, data: str):
+        """
+        Traite un message de contrôle reçu d'un client (souscription, encodage)
+
+        Args:
+            websocket: Connexion émettrice
+            data: Message texte reçu (JSON)
+        """
+        client = self._clients.get(websocket)
+        if client is None:
+            return
+
+        try:
+            request = json.loads(data)
+        except json.JSONDecodeError:
+            request = None
+        if not isinstance(request, dict):
+            self._reply(client, {'type': 'error', 'message': 'Message de contrôle JSON attendu'})
+            return
+
+        error = self._apply_subscription(client, request)
+        if error:
+            self._reply(client, {'type': 'error', 'message': error})
+        else:
+            self._reply(client, {'type': 'subscription', **client.subscription()})
+
+    def _apply_subscription(self, client: WebSocketClient, request: dict) -> Optional[str]:
+        """
+        Applique une demande de souscription au client
+
+        Returns:
+            Message d'erreur, ou None si la demande est valide
+        """
+        action = request.get('action', 'subscribe')
+        if action not in ('subscribe', 'unsubscribe'):
+            return f"Action inconnue: {action}"
+
+        encoding = request.get('encoding')
+        if encoding is not None and encoding not in available_encodings():
+            return f"Encodage non disponible: {encoding} (disponibles: {', '.join(available_encodings())})"
+
+        topics: Set[str] = set()
+        devices: Set[str] = set()
+        for topic in request.get('topics') or []:
+            if not isinstance(topic, str):
+                return f"Topic invalide: {topic}"
+            if topic.startswith(DEVICE_TOPIC_PREFIX):
+                devices.add(topic[len(DEVICE_TOPIC_PREFIX):].upper())
+            elif topic in TOPICS:
+                topics.add(topic)
+            else:
+                return f"Topic inconnu: {topic} (disponibles: {', '.join(TOPICS)}, {DEVICE_TOPIC_PREFIX}<MAC>)"
+
+        if action == 'subscribe':
+            if topics:
+                client.topics = frozenset(topics | (client.topics or set()))
+            if devices:
+                client.devices = frozenset(devices | (client.devices or set()))
+        else:
+            if topics:
+                client.topics = frozenset((client.topics if client.topics is not None else set(DEFAULT_TOPICS)) - topics)
+            if devices and client.devices is not None:
+                client.devices = frozenset(client.devices - devices)
+
+        if encoding is not None:
+            client.encoding = encoding
+        if request.get('delta') is not None:
+            client.delta = bool(request['delta'])
+
+        # Client arrivant en cours de route : état courant immédiatement
+        if action == 'subscribe':
+            for topic in topics:
+                provider = self._snapshots.get(topic)
+                if provider is not None:
+                    self._reply(client, provider(client.devices))
+        return None
+
+    def _reply(self, client: WebSocketClient, data: dict):
+        """Envoie une réponse de contrôle à un seul client, via sa tâche d'envoi"""
+        self.publish(BroadcastMessage(payload=data, target=client.client_id))
+
+    async def _sender(self, client: WebSocketClient):
+        """Tâche d'envoi d'un client : suit le tampon partagé à son rythme"""
+        websocket = client.websocket
+        try:
+            while True:
+                if client.cursor >= self._head:
+                    await self._wakeup.wait()
+                    continue
+
+                lag = self._head - client.cursor
+                client.max_lag = max(client.max_lag, lag)
+                if lag > self.queue_size:
+                    if not self._handle_overflow(client, lag):
+                        self.disconnected_slow += 1
+                        logger.warning(f"⚠️ Client WebSocket #{client.client_id} trop lent ({lag} messages de retard), déconnexion")
+                        await self._close(websocket)
+                        break
+
+                message = self._ring[client.cursor % self.queue_size]
+                client.cursor += 1
+                if not client.accepts(message):
+                    continue
+
+                frame = self._frame_for(client, message)
+                start = time.perf_counter()
+                if isinstance(frame, bytes):
+                    await asyncio.wait_for(websocket.send_bytes(frame), self.send_timeout_s)
+                else:
+                    await asyncio.wait_for(websocket.send_text(frame), self.send_timeout_s)
+                end = time.perf_counter()
+                elapsed_ms = (end - start) * 1000
+                WEBSOCKET_SEND_SECONDS.observe(end - start)
+                WEBSOCKET_SEND_LAG_SECONDS.observe(end - message.published_at)
+                client.sent += 1
+                client.last_send_ms = elapsed_ms
+                client.max_send_ms = max(client.max_send_ms, elapsed_ms)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.disconnected_slow += 1
+            logger.warning(f"⚠️ Client WebSocket #{client.client_id} bloqué depuis {self.send_timeout_s}s, déconnexion")
+            await self._close(websocket)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'envoi WebSocket: {str(e)}")
+        finally:
+            # Supprimer la connexion défectueuse
+            if self._clients.get(websocket) is client:
+                self.disconnect(websocket)
+
+    def _frame_for(self, client: WebSocketClient, message: BroadcastMessage):
+        """Choisit la variante du message pour le client (trame partagée)"""
+        if client.encoding == 'json' or message.topics is None:
+            return message.frame(client.encoding)
+
+        if 'telemetry' in message.topics and (client.topics is None or 'telemetry' in client.topics):
+            # Delta seulement si le client a reçu la télémétrie de référence
+            use_delta = client.delta and client.last_telemetry.get(message.device) == message.delta_base
+            client.last_telemetry[message.device] = message.seq
+            return message.frame(client.encoding, client.topics, use_delta)
+        return message.frame(client.encoding, client.topics)
+
+    async def _close(self, websocket: WebSocket):
+        """Ferme une connexion surchargée sans rester bloqué dessus"""
+        try:
+            await asyncio.wait_for(websocket.close(code=CLOSE_CODE_OVERLOADED), 1.0)
+        except Exception:
+            pass
+
+    def _handle_overflow(self, client: WebSocketClient, lag: int) -> bool:
+        """
+        Applique la politique de débordement à un client en retard
+
+        Returns:
+            False si le client doit être déconnecté
+        """
+        client.overflows += 1
+        if self.overflow_policy == 'disconnect':
+            return False
+
+        if self.overflow_policy == 'latest':
+            # Ne conserver que le message le plus récent
+            new_cursor = self._head - 1
+        else:
+            # Reprendre au plus ancien message encore présent dans le tampon
+            new_cursor = self._head - self.queue_size
+        client.dropped += new_cursor - client.cursor
+        client.cursor = new_cursor
+        return True
+
     def get_connection_count(self) -> int:
         """
         Retourne le nombre de connexions actives
-        
+
         Returns:
             Nombre de clients WebSocket connectés
         """
-        return len(self.active_connections)
+        return len(self._clients)
+
+    def get_max_lag(self) -> int:
+        """
+        Retard du client le plus lent
+
+        Returns:
+            Nombre de messages publiés non encore traités par ce client (0 sans client)
+        """
+        head = self._head
+        return max((head - client.cursor for client in self._clients.values()), default=0)
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Récupère l'état de la diffusion et le retard de chaque client
+
+        Returns:
+            Dict avec paramètres, compteurs globaux et métriques par client
+        """
+        head = self._head
+        return {
+            'connections': len(self._clients),
+            'queue_size': self.queue_size,
+            'overflow_policy': self.overflow_policy,
+            'send_timeout_s': self.send_timeout_s,
+            'encodings': list(available_encodings()),
+            'published': self.published,
+            'disconnected_slow': self.disconnected_slow,
+            'clients': [client.get_stats(head) for client in self._clients.values()]
+        }
 
 
 # Instance globale du gestionnaire
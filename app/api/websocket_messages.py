@@ -0,0 +1,203 @@
+"""
+Messages diffusés sur /ws/ble-notifications : topics, encodages et deltas
+
+Un message est sérialisé au plus une fois par variante (encodage, topics
+demandés, delta) puis partagé entre tous les clients qui la reçoivent.
+
+Encodages :
+- 'json'    : notification complète historique (hex, bytes, text, telemetry...)
+- 'compact' : JSON réduit aux topics souscrits
+- 'msgpack' : même contenu que 'compact' en trames binaires MessagePack
+
+Le topic 'live' (état du dashboard : dernière télémétrie, compteurs cumulés,
+nouveaux événements) est sur souscription explicite ; ses messages ont le même
+contenu dans tous les encodages.
+"""
+import json
+from typing import Dict, FrozenSet, Optional, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:  # Dépendance optionnelle
+    msgpack = None
+
+# Topics de contenu (les topics 'device:<MAC>' filtrent par robot)
+TOPICS = ('telemetry', 'events', 'raw', 'live')
+# Topics reçus sans souscription explicite
+DEFAULT_TOPICS = ('telemetry', 'events', 'raw')
+LIVE_TOPICS = frozenset({'live'})
+DEVICE_TOPIC_PREFIX = 'device:'
+
+ENCODINGS = ('json', 'compact', 'msgpack')
+
+Frame = Union[str, bytes]
+
+# Sentinelle : distingue un champ absent d'un champ à None
+_MISSING = object()
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Encodages utilisables avec les dépendances installées"""
+    if msgpack is None:
+        return tuple(e for e in ENCODINGS if e != 'msgpack')
+    return ENCODINGS
+
+
+def telemetry_delta(previous: dict, current: dict) -> dict:
+    """
+    Champs de télémétrie modifiés depuis le paquet précédent
+
+    Args:
+        previous: Télémétrie précédente du même robot
+        current: Nouvelle télémétrie
+
+    Returns:
+        Dict des champs modifiés (None pour un champ disparu)
+    """
+    delta = {key: value for key, value in current.items() if previous.get(key, _MISSING) != value}
+    for key in previous.keys() - current.keys():
+        delta[key] = None
+    return delta
+
+
+class BroadcastMessage:
+    """
+    Message publié dans le tampon de diffusion
+
+    Les messages système (texte déjà sérialisé, réponses de contrôle) n'ont
+    pas de topics et sont envoyés tels quels à tous les clients concernés.
+    """
+
+    __slots__ = (
+        'seq', 'published_at', 'topics', 'device', 'target', 'payload', 'parts',
+        'delta', 'delta_base', '_text', '_frames'
+    )
+
+    def __init__(
+        self,
+        payload: Optional[dict] = None,
+        text: Optional[str] = None,
+        topics: Optional[FrozenSet[str]] = None,
+        device: Optional[str] = None,
+        parts: Optional[Dict[str, any]] = None,
+        target: Optional[int] = None
+    ):
+        """
+        Args:
+            payload: Contenu complet (encodage 'json')
+            text: Contenu déjà sérialisé en JSON (évite une sérialisation)
+            topics: Topics de contenu présents dans le message (None = système)
+            device: Adresse MAC du robot émetteur
+            parts: Contenu compact par topic ('telemetry', 'events', 'raw')
+            target: Identifiant du seul client destinataire (réponses de contrôle)
+        """
+        self.seq = 0
+        self.published_at = 0.0
+        self.topics = topics
+        self.device = device
+        self.target = target
+        self.payload = payload
+        self.parts = parts or {}
+        self.delta: Optional[dict] = None
+        self.delta_base: Optional[int] = None
+        self._text = text
+        self._frames: Dict[tuple, Frame] = {}
+
+    @classmethod
+    def notification(cls, notification_data: dict, packet: bytes) -> 'BroadcastMessage':
+        """
+        Construit le message d'une notification BLE
+
+        Args:
+            notification_data: Notification complète (format historique)
+            packet: Paquet brut reçu
+        """
+        parts = {'raw': packet}
+        if 'telemetry' in notification_data:
+            parts['telemetry'] = notification_data['telemetry']
+        if 'event' in notification_data:
+            parts['events'] = notification_data['event']
+        device = notification_data.get('device')
+        return cls(
+            payload=notification_data,
+            topics=frozenset(parts),
+            device=device.upper() if device else None,
+            parts=parts
+        )
+
+    @classmethod
+    def live(cls, payload: dict, device: Optional[str] = None) -> 'BroadcastMessage':
+        """
+        Construit un message d'état du dashboard (topic 'live')
+
+        Args:
+            payload: Message complet ({"type": "live_state", ...})
+            device: Adresse MAC du robot concerné (None = toute la flotte)
+        """
+        return cls(
+            payload=payload,
+            topics=LIVE_TOPICS,
+            device=device.upper() if device else None
+        )
+
+    def text(self) -> str:
+        """Notification complète en JSON (sérialisée une seule fois)"""
+        if self._text is None:
+            payload = self.payload
+            raw = self.parts.get('raw')
+            if raw is not None:
+                # Paquet brut au format historique, formaté seulement si un client 'json' le reçoit
+                payload = {**payload, 'hex': raw.hex(' ').upper(), 'bytes': list(raw)}
+            self._text = json.dumps(payload)
+        return self._text
+
+    def frame(self, encoding: str, topics: Optional[FrozenSet[str]] = None, use_delta: bool = False) -> Frame:
+        """
+        Trame à envoyer pour une variante donnée, mise en cache sur le message
+
+        Args:
+            encoding: Une des ENCODINGS
+            topics: Topics souscrits par le client (None = tous)
+            use_delta: Envoyer la télémétrie en delta (le client possède delta_base)
+
+        Returns:
+            str (trame texte) ou bytes (trame binaire)
+        """
+        if encoding == 'json':
+            return self.text()
+
+        wanted = self.topics if topics is None or self.topics is None else self.topics & topics
+        use_delta = use_delta and self.delta is not None and 'telemetry' in (wanted or ())
+        key = (encoding, wanted, use_delta)
+        frame = self._frames.get(key)
+        if frame is None:
+            frame = self._encode(encoding, wanted, use_delta)
+            self._frames[key] = frame
+        return frame
+
+    def _encode(self, encoding: str, wanted: Optional[FrozenSet[str]], use_delta: bool) -> Frame:
+        """Sérialise la variante compacte du message"""
+        binary = encoding == 'msgpack'
+
+        if self.topics is None or self.topics == LIVE_TOPICS:
+            if not binary:
+                return self.text()
+            return msgpack.packb(self.payload if self.payload is not None else json.loads(self._text))
+
+        body = {'s': self.seq, 'd': self.device, 'ts': self.payload.get('timestamp')}
+        for topic in wanted:
+            if topic == 'raw':
+                packet = self.parts['raw']
+                body['raw'] = packet if binary else packet.hex()
+            elif topic == 'telemetry':
+                if use_delta:
+                    body['tel_d'] = self.delta
+                    body['b'] = self.delta_base
+                else:
+                    body['tel'] = self.parts['telemetry']
+            elif topic == 'events':
+                body['ev'] = self.parts['events']
+
+        if binary:
+            return msgpack.packb(body, use_bin_type=True)
+        return json.dumps(body, separators=(',', ':'))
@@ -0,0 +1,499 @@
+"""
+Métriques de l'application au format texte Prometheus (/metrics)
+
+Instrumentation en mémoire à faible coût sur les chemins critiques :
+- compteurs et histogrammes mis à jour depuis la boucle asyncio (pas de verrou) ;
+  les séries étiquetées sont résolues une fois (labels) puis conservées par l'appelant
+- jauges et compteurs calculés à la lecture (callback) pour l'état déjà suivi
+  ailleurs (profondeur de file, clients WebSocket...) : aucun coût hors scrape
+
+    notifications = BLE_NOTIFICATIONS.labels(address)
+    notifications.inc()
+    BLE_HANDLER_SECONDS.labels(address).observe(elapsed_s)
+"""
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import Config
+
+# Type MIME de l'exposition texte Prometheus
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Bornes des histogrammes (secondes)
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    """Valeur d'un échantillon (entiers sans décimale, infinis en +Inf/-Inf)"""
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    """Échappe une valeur d'étiquette"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class _CounterValue:
+    """Série d'un compteur (valeur croissante)"""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class _GaugeValue:
+    """Série d'une jauge (valeur instantanée)"""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+
+class _HistogramValue:
+    """Série d'un histogramme : comptes par intervalle (non cumulés), somme et nombre"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """
+    Métrique nommée, éventuellement étiquetée
+
+    Une métrique à callback n'a pas de séries propres : la fonction est appelée
+    à chaque lecture et retourne une valeur (sans étiquette) ou un dict
+    {tuple des valeurs d'étiquettes: valeur}.
+    """
+
+    kind = 'untyped'
+    _series_class = _GaugeValue
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        callback: Optional[Callable[[], object]] = None
+    ):
+        """
+        Args:
+            name: Nom Prometheus (ex: robot_ble_notifications_total)
+            documentation: Description (ligne # HELP)
+            labels: Noms des étiquettes
+            callback: Fonction de lecture (métrique calculée au scrape)
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labels)
+        self.callback = callback
+        self._series: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames and callback is None:
+            self._series[()] = self._new_series()
+
+    def _new_series(self):
+        return self._series_class()
+
+    def labels(self, *values) -> object:
+        """
+        Série correspondant aux valeurs d'étiquettes (créée au premier appel)
+
+        Args:
+            values: Valeurs des étiquettes, dans l'ordre de déclaration
+
+        Returns:
+            Série (inc/set/observe selon le type)
+        """
+        key = tuple(str(v) for v in values)
+        series = self._series.get(key)
+        if series is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: {len(self.labelnames)} étiquette(s) attendue(s), {len(key)} reçue(s)")
+            series = self._series[key] = self._new_series()
+        return series
+
+    def _values(self) -> Iterable[Tuple[Tuple[str, ...], float]]:
+        if self.callback is None:
+            return ((key, series.value) for key, series in self._series.items())
+        result = self.callback()
+        if isinstance(result, dict):
+            return ((tuple(str(v) for v in (key if isinstance(key, tuple) else (key,))), value)
+                    for key, value in result.items())
+        return [((), result)]
+
+    def render(self) -> List[str]:
+        """Lignes de l'exposition texte de la métrique"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self._values():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Compteur (valeur croissante depuis le démarrage)"""
+
+    kind = 'counter'
+    _series_class = _CounterValue
+
+    def inc(self, amount: float = 1):
+        """Incrémente la série sans étiquette"""
+        self._series[()].inc(amount)
+
+
+class Gauge(Metric):
+    """Jauge (valeur instantanée)"""
+
+    kind = 'gauge'
+    _series_class = _GaugeValue
+
+    def set(self, value: float):
+        """Fixe la série sans étiquette"""
+        self._series[()].set(value)
+
+
+class Histogram(Metric):
+    """Histogramme à intervalles fixes (latences en secondes)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            name: Nom Prometheus (ex: robot_ble_handler_seconds)
+            documentation: Description (ligne # HELP)
+            labels: Noms des étiquettes
+            buckets: Bornes supérieures des intervalles, croissantes
+        """
+        self.bounds = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labels)
+
+    def _new_series(self):
+        return _HistogramValue(self.bounds)
+
+    def observe(self, value: float):
+        """Enregistre une mesure dans la série sans étiquette"""
+        self._series[()].observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ('le',)
+        for key, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), series.counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Registre des métriques exposées sur /metrics
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Enregistre une métrique
+
+        Args:
+            metric: Counter, Gauge ou Histogram
+
+        Returns:
+            La métrique enregistrée
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrique déjà enregistrée: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = (), callback=None) -> Counter:
+        return self.register(Counter(name, documentation, labels, callback))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labels, callback))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """
+        Exposition texte Prometheus de toutes les métriques
+
+        Returns:
+            Document texte (format 0.0.4)
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                lines += metric.render()
+            except Exception as e:
+                # Une métrique à callback en erreur ne doit pas masquer les autres
+                lines.append(f"# {metric.name}: erreur de lecture ({e})")
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI : latence des requêtes HTTP par route
+
+    La route est le modèle de chemin FastAPI (/api/events/{event_id}/acknowledge) et non le
+    chemin reçu, pour borner le nombre de séries.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            path = getattr(route, 'path', None) or ('/static' if scope['path'].startswith('/static/') else 'unmatched')
+            HTTP_REQUEST_SECONDS.labels(scope['method'], path, status[0]).observe(time.perf_counter() - start)
+
+
+# --- Collecteurs de l'état suivi par les services (lus au scrape) ---
+
+def _ingestion_stat(key: str):
+    def read():
+        from app.services.ingestion import ingestion_queue
+        return ingestion_queue.get_stats()[key]
+    return read
+
+
+def _ingestion_duplicates():
+    from app.services.ingestion import ingestion_queue
+    stats = ingestion_queue.get_stats()
+    return {'window': stats['duplicates'], 'database': stats['duplicates_db']}
+
+
+def _framer_stat(key: str):
+    def read():
+        from app.services.ble_manager import ble_pool
+        return {m.address: getattr(m.framer, key) for m in ble_pool.managers()}
+    return read
+
+
+def _ble_connected():
+    from app.services.ble_manager import ble_pool
+    return {m.address: int(m.is_connected) for m in ble_pool.managers()}
+
+
+def _connection_stat(key: str):
+    def read():
+        from app.services.ble_manager import ble_pool
+        return {m.address: getattr(m, key) for m in ble_pool.managers()}
+    return read
+
+
+def _scanner_stat(key: str):
+    def read():
+        from app.services.ble_scanner import device_scanner
+        return device_scanner.get_stats()[key]
+    return read
+
+
+def _command_pending():
+    from app.services.ble_manager import ble_pool
+    return {
+        (m.address, lane): count
+        for m in ble_pool.managers() for lane, count in m.commands.pending().items()
+    }
+
+
+def _command_stat(key: str):
+    def read():
+        from app.services.ble_manager import ble_pool
+        return {m.address: getattr(m.commands, key) for m in ble_pool.managers()}
+    return read
+
+
+def _websocket_clients():
+    from app.api.websocket_manager import manager
+    return manager.get_connection_count()
+
+
+def _websocket_max_lag():
+    from app.api.websocket_manager import manager
+    return manager.get_max_lag()
+
+
+def _response_cache_stat(key: str):
+    def read():
+        from app.services.response_cache import response_cache
+        return getattr(response_cache, key)
+    return read
+
+
+# Registre global
+registry = MetricsRegistry()
+
+# Notifications BLE
+BLE_NOTIFICATIONS = registry.counter(
+    'robot_ble_notifications_total', "Notifications BLE reçues", ('device',))
+BLE_NOTIFICATION_BYTES = registry.counter(
+    'robot_ble_notification_bytes_total', "Octets de notifications BLE reçus", ('device',))
+BLE_PACKETS = registry.counter(
+    'robot_ble_packets_total', "Paquets complets réassemblés par le framer", ('device',), _framer_stat('frames'))
+BLE_FRAMER_DISCARDED_BYTES = registry.counter(
+    'robot_ble_framer_discarded_bytes_total', "Octets écartés par le framer (resynchronisation)",
+    ('device',), _framer_stat('discarded_bytes'))
+BLE_PARSE_FAILURES = registry.counter(
+    'robot_ble_parse_failures_total', "Paquets complets non décodables", ('device', 'format'))
+BLE_HANDLER_SECONDS = registry.histogram(
+    'robot_ble_handler_seconds', "Durée de traitement d'une notification BLE (framer, décodage, diffusion, mise en file)",
+    ('device',), FAST_BUCKETS)
+BLE_CONNECTED = registry.gauge(
+    'robot_ble_connected', "Robot connecté (1) ou non (0)", ('device',), _ble_connected)
+BLE_CONNECT_SECONDS = registry.histogram(
+    'robot_ble_connect_seconds', "Durée d'une connexion jusqu'aux notifications actives",
+    ('device', 'gatt'), DEFAULT_BUCKETS + (30.0,))
+BLE_DISCONNECTS = registry.counter(
+    'robot_ble_disconnects_total', "Pertes de liaison subies (hors déconnexions demandées)",
+    ('device',), _connection_stat('disconnects'))
+BLE_RECONNECTS = registry.counter(
+    'robot_ble_reconnects_total', "Reconnexions automatiques réussies", ('device',), _connection_stat('reconnects'))
+BLE_RECONNECT_ATTEMPTS = registry.counter(
+    'robot_ble_reconnect_attempts_total', "Tentatives de reconnexion automatique",
+    ('device',), _connection_stat('reconnect_attempts'))
+
+# Scanner BLE
+BLE_SCAN_DEVICES = registry.gauge(
+    'robot_ble_scan_devices', "Appareils présents dans la table du scanner", callback=_scanner_stat('devices'))
+BLE_ADVERTISEMENTS = registry.counter(
+    'robot_ble_advertisements_total', "Advertisings reçus par le scanner continu",
+    callback=_scanner_stat('advertisements'))
+
+# Écritures BLE
+BLE_WRITE_SECONDS = registry.histogram(
+    'robot_ble_write_seconds', "Durée d'une écriture GATT vers le robot", ('device',))
+BLE_WRITE_FAILURES = registry.counter(
+    'robot_ble_write_failures_total', "Écritures GATT en échec", ('device',))
+
+# File de commandes BLE
+BLE_COMMAND_WAIT_SECONDS = registry.histogram(
+    'robot_ble_command_wait_seconds', "Attente d'une commande dans la file avant écriture", ('device', 'lane'),
+    FAST_BUCKETS + (2.5, 5.0, 10.0))
+BLE_COMMANDS_PENDING = registry.gauge(
+    'robot_ble_commands_pending', "Commandes en attente par voie", ('device', 'lane'), _command_pending)
+BLE_COMMANDS_COALESCED = registry.counter(
+    'robot_ble_commands_coalesced_total', "Commandes remplacées avant envoi (fusionnées)",
+    ('device',), _command_stat('coalesced'))
+BLE_COMMANDS_REJECTED = registry.counter(
+    'robot_ble_commands_rejected_total', "Commandes rejetées (voie pleine)", ('device',), _command_stat('rejected'))
+
+# Ingestion
+INGESTION_COMMIT_SECONDS = registry.histogram(
+    'robot_ingestion_commit_seconds', "Durée d'écriture d'un lot d'ingestion (transaction comprise)")
+INGESTION_BATCH_ROWS = registry.histogram(
+    'robot_ingestion_batch_rows', "Enregistrements par lot d'ingestion",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+INGESTION_QUEUE_DEPTH = registry.gauge(
+    'robot_ingestion_queue_depth', "Enregistrements en attente d'écriture", callback=_ingestion_stat('queue_depth'))
+INGESTION_ROWS = registry.counter(
+    'robot_ingestion_rows_total', "Enregistrements écrits en base", callback=_ingestion_stat('rows_written'))
+INGESTION_FAILED_ROWS = registry.counter(
+    'robot_ingestion_failed_rows_total', "Enregistrements perdus sur erreur d'écriture", callback=_ingestion_stat('failed_rows'))
+INGESTION_DROPPED = registry.counter(
+    'robot_ingestion_dropped_total', "Enregistrements rejetés (file pleine)", callback=_ingestion_stat('dropped'))
+INGESTION_DUPLICATES = registry.counter(
+    'robot_ingestion_duplicates_total', "Paquets de télémétrie déjà reçus, non réécrits",
+    labels=('source',), callback=_ingestion_duplicates)
+
+# Diffusion WebSocket
+WEBSOCKET_CLIENTS = registry.gauge(
+    'robot_websocket_clients', "Clients WebSocket connectés", callback=_websocket_clients)
+WEBSOCKET_MAX_LAG = registry.gauge(
+    'robot_websocket_max_lag_messages', "Retard du client le plus lent (messages)", callback=_websocket_max_lag)
+WEBSOCKET_SEND_LAG_SECONDS = registry.histogram(
+    'robot_websocket_send_lag_seconds', "Délai entre la publication d'un message et son envoi à un client",
+    buckets=FAST_BUCKETS + (2.5, 5.0, 10.0))
+WEBSOCKET_SEND_SECONDS = registry.histogram(
+    'robot_websocket_send_seconds', "Durée d'un envoi WebSocket à un client", buckets=FAST_BUCKETS)
+
+# Cache des réponses
+RESPONSE_CACHE_HITS = registry.counter(
+    'robot_response_cache_hits_total', "Réponses servies par le cache", callback=_response_cache_stat('hits'))
+RESPONSE_CACHE_MISSES = registry.counter(
+    'robot_response_cache_misses_total', "Réponses calculées", callback=_response_cache_stat('misses'))
+
+# HTTP
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'robot_http_request_seconds', "Durée des requêtes HTTP par route", ('method', 'route', 'status'))
+
+
+def render() -> str:
+    """Exposition texte Prometheus du registre global"""
+    return registry.render()
+
+
+def install(app):
+    """
+    Ajoute l'instrumentation HTTP et l'endpoint /metrics à l'application
+
+    Args:
+        app: Instance FastAPI
+    """
+    if not Config.METRICS_ENABLED:
+        return
+
+    from fastapi.responses import PlainTextResponse
+
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get('/metrics', include_in_schema=False)
+    async def metrics_endpoint():
+        return PlainTextResponse(render(), media_type=CONTENT_TYPE)
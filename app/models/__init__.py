@@ -2,6 +2,6 @@
 Modèles de base de données pour le projet IoT Robot
 """
 from app.models.telemetry import Telemetry, Event
-from app.models.database import init_db, get_db, engine
+from app.models.database import init_db, get_db, get_read_db, engine, read_engine
 
-__all__ = ['Telemetry', 'Event', 'init_db', 'get_db', 'engine']
+__all__ = ['Telemetry', 'Event', 'init_db', 'get_db', 'get_read_db', 'engine', 'read_engine']
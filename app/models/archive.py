@@ -0,0 +1,662 @@
+"""
+Archive froide de la télémétrie : segments colonnaires compressés, un fichier par jour
+
+La base SQLite ne conserve que les données récentes ; l'archivage déplace les
+lignes anciennes dans ARCHIVE_DIR/telemetry/AAAA/telemetry-AAAA-MM-JJ.seg.
+
+Format d'un segment :
+    MAGIC (8 octets) | longueur de l'en-tête (uint32 LE) | en-tête JSON | blocs
+Chaque colonne est stockée dans ses propres blocs compressés (zlib) :
+valeurs, masque des NULL (bits) et, pour les chaînes, longueurs UTF-8.
+Les horodatages sont en microsecondes depuis l'epoch, encodés en delta.
+Les segments sont lus par memory-mapping : seules les colonnes demandées
+sont décompressées.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.telemetry import Telemetry
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RTSEG01\n'
+FORMAT_VERSION = 1
+_HEADER_LENGTH = struct.Struct('<I')
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+_US_PER_HOUR = 3600 * 1000000
+
+# Colonnes archivées (toutes les colonnes de la table telemetry) et leur type de stockage
+COLUMNS = (
+    ('id', 'int'),
+    ('packet_id', 'str'),
+    ('device_address', 'str'),
+    ('timestamp', 'ts'),
+    ('received_at', 'ts'),
+    ('uptime_s', 'int'),
+    ('mode', 'str'),
+    ('distance_cm', 'float'),
+    ('obstacle_events', 'int'),
+    ('last_ir_cmd', 'str'),
+    ('speed_pwm', 'int'),
+    ('dist_traveled_cm', 'float'),
+    ('battery_level', 'int'),
+    ('signal_strength', 'int'),
+    ('packet_raw', 'str'),
+    ('checksum', 'str'),
+    ('processed', 'bool'),
+    ('archived', 'bool'),
+)
+COLUMN_NAMES = tuple(name for name, _ in COLUMNS)
+_KINDS = dict(COLUMNS)
+_DTYPES = {'int': np.int64, 'float': np.float64, 'bool': np.uint8, 'ts': np.int64}
+
+# Champs retournés par l'API (mêmes que Telemetry.to_dict)
+DICT_FIELDS = tuple(name for name in COLUMN_NAMES if name not in ('packet_raw', 'checksum'))
+
+_lock = threading.RLock()
+# Catalogue en mémoire {jour: entrée} chargé depuis les en-têtes des segments
+_catalog: Optional[Dict[str, dict]] = None
+
+
+def _to_us(ts: datetime) -> int:
+    """Horodatage -> microsecondes depuis l'epoch"""
+    return (ts - _EPOCH) // _US
+
+
+def _from_us(values: np.ndarray) -> list:
+    """Microsecondes depuis l'epoch -> liste de datetime"""
+    return values.astype('datetime64[us]').tolist()
+
+
+def _day_of(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def archive_dir() -> str:
+    """Dossier des segments de télémétrie"""
+    return os.path.join(Config.ARCHIVE_DIR, 'telemetry')
+
+
+def segment_path(day: datetime) -> str:
+    """Chemin du segment d'un jour"""
+    return os.path.join(archive_dir(), f"{day:%Y}", f"telemetry-{day:%Y-%m-%d}.seg")
+
+
+# ----------------------------------------------------------------------------
+# Écriture
+# ----------------------------------------------------------------------------
+
+def _encode_column(kind: str, values: list, blobs: List[bytes], offset: int) -> Tuple[dict, int]:
+    """Encode une colonne en blocs compressés ; retourne sa description d'en-tête"""
+    def add(data: bytes) -> List[int]:
+        nonlocal offset
+        compressed = zlib.compress(data, 6)
+        blobs.append(compressed)
+        ref = [offset, len(compressed)]
+        offset += len(compressed)
+        return ref
+
+    nulls = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+    meta = {'kind': kind, 'nulls': add(np.packbits(nulls).tobytes()) if nulls.any() else None}
+
+    if kind == 'str':
+        encoded = [v.encode('utf-8') if v is not None else b'' for v in values]
+        lengths = np.fromiter((len(v) for v in encoded), dtype=np.int32, count=len(encoded))
+        meta['lengths'] = add(lengths.tobytes())
+        meta['data'] = add(b''.join(encoded))
+    elif kind == 'ts':
+        us = np.array(values, dtype='datetime64[us]').astype(np.int64)
+        meta['data'] = add(np.diff(us, prepend=np.int64(0)).tobytes())
+    else:
+        filled = [v if v is not None else 0 for v in values]
+        meta['data'] = add(np.array(filled, dtype=_DTYPES[kind]).tobytes())
+    return meta, offset
+
+
+def write_segment(day: datetime, columns: Dict[str, list]) -> dict:
+    """
+    Écrit (ou remplace) le segment d'un jour de façon atomique
+
+    Args:
+        day: Jour du segment
+        columns: Valeurs par colonne (listes alignées, triées par horodatage)
+
+    Returns:
+        Entrée du catalogue du segment
+    """
+    rows = len(columns['id'])
+    blobs: List[bytes] = []
+    offset = 0
+    header_columns = {}
+    for name, kind in COLUMNS:
+        header_columns[name], offset = _encode_column(kind, columns[name], blobs, offset)
+
+    timestamps = columns['timestamp']
+    header = {
+        'version': FORMAT_VERSION,
+        'table': 'telemetry',
+        'day': f"{day:%Y-%m-%d}",
+        'rows': rows,
+        'min_ts': min(timestamps).isoformat(),
+        'max_ts': max(timestamps).isoformat(),
+        'columns': header_columns
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    path = segment_path(day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for blob in blobs:
+            f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    entry = _catalog_entry(path, header)
+    with _lock:
+        _load_catalog()[header['day']] = entry
+    return entry
+
+
+def _remove_segment(day_key: str):
+    """Supprime un segment et son entrée de catalogue"""
+    with _lock:
+        entry = _load_catalog().pop(day_key, None)
+    if entry and os.path.exists(entry['path']):
+        os.remove(entry['path'])
+
+
+# ----------------------------------------------------------------------------
+# Lecture
+# ----------------------------------------------------------------------------
+
+def _read_header(f) -> Tuple[dict, int]:
+    """Lit l'en-tête d'un segment ; retourne (en-tête, position du premier bloc)"""
+    magic = f.read(len(MAGIC))
+    if magic != MAGIC:
+        raise ValueError("Fichier de segment invalide")
+    (length,) = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))
+    header = json.loads(f.read(length).decode('utf-8'))
+    return header, len(MAGIC) + _HEADER_LENGTH.size + length
+
+
+class Segment:
+    """
+    Segment ouvert en memory-mapping
+    Les colonnes sont décompressées à la demande et gardées en cache
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Chemin du fichier de segment
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self.header, self._base = _read_header(f)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.rows = self.header['rows']
+        self._cache: Dict[str, tuple] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._cache.clear()
+        self._mmap.close()
+
+    def _block(self, ref: List[int]) -> bytes:
+        start = self._base + ref[0]
+        return zlib.decompress(self._mmap[start:start + ref[1]])
+
+    def _nulls(self, meta: dict) -> Optional[np.ndarray]:
+        if meta['nulls'] is None:
+            return None
+        bits = np.frombuffer(self._block(meta['nulls']), dtype=np.uint8)
+        return np.unpackbits(bits, count=self.rows).astype(bool)
+
+    def column(self, name: str) -> Tuple[object, Optional[np.ndarray]]:
+        """
+        Colonne décodée
+
+        Returns:
+            (valeurs, masque des NULL ou None) ; valeurs = tableau numpy
+            (microsecondes pour les horodatages) ou liste pour les chaînes
+        """
+        cached = self._cache.get(name)
+        if cached is not None:
+            return cached
+
+        meta = self.header['columns'][name]
+        kind = meta['kind']
+        nulls = self._nulls(meta)
+        if kind == 'str':
+            lengths = np.frombuffer(self._block(meta['lengths']), dtype=np.int32)
+            data = self._block(meta['data'])
+            ends = np.cumsum(lengths).tolist()
+            starts = [0] + ends[:-1]
+            values = [data[s:e].decode('utf-8') for s, e in zip(starts, ends)]
+            if nulls is not None:
+                for i in np.flatnonzero(nulls).tolist():
+                    values[i] = None
+        elif kind == 'ts':
+            values = np.cumsum(np.frombuffer(self._block(meta['data']), dtype=np.int64))
+        else:
+            values = np.frombuffer(self._block(meta['data']), dtype=_DTYPES[kind])
+        self._cache[name] = (values, nulls)
+        return values, nulls
+
+    def select(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        device: Optional[str] = None,
+        mode: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        Indices des lignes dans [start, end) correspondant aux filtres (ordre chronologique)
+        """
+        ts, _ = self.column('timestamp')
+        lo = int(np.searchsorted(ts, _to_us(start), side='left')) if start else 0
+        hi = int(np.searchsorted(ts, _to_us(end), side='left')) if end else self.rows
+        idx = np.arange(lo, hi)
+        if device is not None and len(idx):
+            # Adresses MAC comparées en majuscules (segments écrits avant la normalisation des adresses)
+            values, _ = self.column('device_address')
+            device = device.upper()
+            keep = np.fromiter(((values[i] or '').upper() == device for i in idx.tolist()), dtype=bool, count=len(idx))
+            idx = idx[keep]
+        if mode is not None and len(idx):
+            values, _ = self.column('mode')
+            keep = np.fromiter((values[i] == mode for i in idx.tolist()), dtype=bool, count=len(idx))
+            idx = idx[keep]
+        return idx
+
+    def values(self, name: str, idx: np.ndarray) -> list:
+        """Valeurs Python (None pour NULL) d'une colonne pour les lignes idx"""
+        values, nulls = self.column(name)
+        kind = _KINDS[name]
+        if kind == 'str':
+            return [values[i] for i in idx.tolist()]
+        if kind == 'ts':
+            out = _from_us(values[idx])
+        elif kind == 'bool':
+            out = values[idx].astype(bool).tolist()
+        else:
+            out = values[idx].tolist()
+        if nulls is not None:
+            for pos in np.flatnonzero(nulls[idx]).tolist():
+                out[pos] = None
+        return out
+
+    def numeric(self, name: str, idx: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(valeurs, masque des valeurs présentes) d'une colonne numérique"""
+        values, nulls = self.column(name)
+        valid = ~nulls[idx] if nulls is not None else np.ones(len(idx), dtype=bool)
+        return values[idx], valid
+
+    def all_columns(self) -> Dict[str, list]:
+        """Toutes les colonnes en listes Python (réécriture d'un segment)"""
+        idx = np.arange(self.rows)
+        return {name: self.values(name, idx) for name in COLUMN_NAMES}
+
+
+# ----------------------------------------------------------------------------
+# Catalogue
+# ----------------------------------------------------------------------------
+
+def _catalog_entry(path: str, header: dict) -> dict:
+    return {
+        'path': path,
+        'day': header['day'],
+        'rows': header['rows'],
+        'min_ts': datetime.fromisoformat(header['min_ts']),
+        'max_ts': datetime.fromisoformat(header['max_ts']),
+        'bytes': os.path.getsize(path)
+    }
+
+
+def _load_catalog() -> Dict[str, dict]:
+    """Charge le catalogue depuis les en-têtes des segments (une seule fois)"""
+    global _catalog
+    with _lock:
+        if _catalog is None:
+            catalog = {}
+            root = archive_dir()
+            if os.path.isdir(root):
+                for dirpath, _, filenames in os.walk(root):
+                    for filename in filenames:
+                        if not filename.endswith('.seg'):
+                            continue
+                        path = os.path.join(dirpath, filename)
+                        try:
+                            with open(path, 'rb') as f:
+                                header, _ = _read_header(f)
+                            catalog[header['day']] = _catalog_entry(path, header)
+                        except Exception as e:
+                            logger.error(f"✗ Segment d'archive illisible {path}: {e}")
+            _catalog = catalog
+        return _catalog
+
+
+def reload_catalog():
+    """Force la relecture des segments présents sur disque"""
+    global _catalog
+    with _lock:
+        _catalog = None
+    _load_catalog()
+
+
+def segments(start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[dict]:
+    """
+    Segments dont les données recoupent [start, end), triés chronologiquement
+
+    Returns:
+        Entrées du catalogue (path, day, rows, min_ts, max_ts, bytes)
+    """
+    with _lock:
+        entries = list(_load_catalog().values())
+    return sorted(
+        (e for e in entries
+         if (start is None or e['max_ts'] >= start) and (end is None or e['min_ts'] < end)),
+        key=lambda e: e['day']
+    )
+
+
+def get_archive_info() -> dict:
+    """
+    Résumé de l'archive
+
+    Returns:
+        Dict avec nombre de segments, lignes, taille et période couverte
+    """
+    entries = segments()
+    return {
+        'directory': archive_dir(),
+        'segments': len(entries),
+        'rows': sum(e['rows'] for e in entries),
+        'size_mb': round(sum(e['bytes'] for e in entries) / (1024 * 1024), 3),
+        'oldest': entries[0]['min_ts'].isoformat() if entries else None,
+        'latest': entries[-1]['max_ts'].isoformat() if entries else None
+    }
+
+
+# ----------------------------------------------------------------------------
+# Requêtes
+# ----------------------------------------------------------------------------
+
+def iter_rows(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    device: Optional[str] = None,
+    mode: Optional[str] = None,
+    fields: Sequence[str] = DICT_FIELDS,
+    descending: bool = False
+) -> Iterator[tuple]:
+    """
+    Parcourt les lignes archivées de [start, end), segment par segment
+
+    Args:
+        start: Début inclus
+        end: Fin exclue
+        device: Adresse MAC du robot
+        mode: Mode ("auto" ou "manual")
+        fields: Colonnes retournées
+        descending: Ordre antichronologique
+
+    Yields:
+        Tuples des valeurs de fields (datetime pour les horodatages)
+    """
+    entries = segments(start, end)
+    if descending:
+        entries.reverse()
+    for entry in entries:
+        with Segment(entry['path']) as seg:
+            idx = seg.select(start, end, device, mode)
+            if descending:
+                idx = idx[::-1]
+            if not len(idx):
+                continue
+            columns = [seg.values(name, idx) for name in fields]
+        yield from zip(*columns)
+
+
+def series(
+    field: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    device: Optional[str] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Série temporelle d'un champ numérique (pour les tendances)
+
+    Returns:
+        (temps en secondes depuis l'epoch, valeurs avec NaN pour NULL)
+    """
+    xs, ys = [], []
+    for entry in segments(start, end):
+        with Segment(entry['path']) as seg:
+            idx = seg.select(start, end, device)
+            if not len(idx):
+                continue
+            ts, _ = seg.column('timestamp')
+            values, valid = seg.numeric(field, idx)
+            y = values.astype(np.float64)
+            y[~valid] = np.nan
+            xs.append(ts[idx] / 1e6)
+            ys.append(y)
+    if not xs:
+        return np.empty(0), np.empty(0)
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+def _aggregate(seg: Segment, idx: np.ndarray) -> dict:
+    """Agrégat (champs de TelemetryStatistics) des lignes idx d'un segment"""
+    def stats(name):
+        values, valid = seg.numeric(name, idx)
+        return values[valid]
+
+    speed = stats('speed_pwm')
+    distance = stats('distance_cm')
+    battery = stats('battery_level')
+    uptime = stats('uptime_s')
+    modes, _ = seg.column('mode')
+    lowered = [(modes[i] or '').lower() for i in idx.tolist()]
+    return {
+        'packet_count': len(idx),
+        'speed_samples': len(speed),
+        'sum_speed_pwm': int(speed.sum()),
+        'max_speed_pwm': int(speed.max()) if len(speed) else None,
+        'min_speed_pwm': int(speed.min()) if len(speed) else None,
+        'distance_samples': len(distance),
+        'sum_distance_cm': float(distance.sum()),
+        'total_distance_cm': float(stats('dist_traveled_cm').sum()),
+        'obstacle_count': int(stats('obstacle_events').sum()),
+        'battery_samples': len(battery),
+        'sum_battery': int(battery.sum()),
+        'min_battery': int(battery.min()) if len(battery) else None,
+        'max_uptime_s': int(uptime.max()) if len(uptime) else None,
+        'mode_auto_count': lowered.count('auto'),
+        'mode_manual_count': lowered.count('manual'),
+    }
+
+
+def aggregate(start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[dict]:
+    """
+    Agrégats partiels des lignes archivées de [start, end), un par segment concerné
+    (à fusionner avec statistics.merge_aggregate)
+    """
+    parts = []
+    for entry in segments(start, end):
+        with Segment(entry['path']) as seg:
+            idx = seg.select(start, end)
+            if len(idx):
+                parts.append(_aggregate(seg, idx))
+    return parts
+
+
+def aggregate_by_hour(start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[datetime, dict]:
+    """
+    Agrégats horaires des lignes archivées de [start, end)
+
+    Returns:
+        Dict {début de l'heure: agrégat}
+    """
+    hours = {}
+    for entry in segments(start, end):
+        with Segment(entry['path']) as seg:
+            idx = seg.select(start, end)
+            if not len(idx):
+                continue
+            ts, _ = seg.column('timestamp')
+            hour_keys = ts[idx] // _US_PER_HOUR
+            # Lignes triées par horodatage : une tranche contiguë par heure
+            keys, firsts = np.unique(hour_keys, return_index=True)
+            bounds = list(firsts) + [len(idx)]
+            for i, key in enumerate(keys.tolist()):
+                hour = _EPOCH + timedelta(hours=key)
+                hours[hour] = _aggregate(seg, idx[bounds[i]:bounds[i + 1]])
+    return hours
+
+
+# ----------------------------------------------------------------------------
+# Archivage et suppression
+# ----------------------------------------------------------------------------
+
+def _merge_columns(existing: Dict[str, list], new: Dict[str, list]) -> Dict[str, list]:
+    """Fusionne deux jeux de colonnes (dédoublonnage par id, tri par horodatage)"""
+    merged = {name: existing[name] + new[name] for name in COLUMN_NAMES}
+    order = {}
+    for i, row_id in enumerate(merged['id']):
+        order.setdefault(row_id, i)
+    keep = sorted(order.values(), key=lambda i: (merged['timestamp'][i], merged['id'][i]))
+    return {name: [values[i] for i in keep] for name, values in merged.items()}
+
+
+def archive_before(db: Session, cutoff: datetime) -> dict:
+    """
+    Déplace la télémétrie antérieure à cutoff de la base vers les segments,
+    un jour à la fois (segment écrit sur disque avant la suppression des lignes)
+    Les agrégats et compteurs cumulés restent inchangés : les lignes sont déplacées
+
+    Args:
+        db: Session (commit effectué après chaque jour)
+        cutoff: Date de coupure
+
+    Returns:
+        Dict avec le nombre de lignes archivées et de segments écrits
+    """
+    first = db.query(func.min(Telemetry.timestamp)).filter(Telemetry.timestamp < cutoff).scalar()
+    columns = [getattr(Telemetry, name) for name in COLUMN_NAMES]
+    archived_rows = 0
+    written = 0
+
+    day = _day_of(first) if first else cutoff
+    while day < cutoff:
+        day_end = min(day + timedelta(days=1), cutoff)
+        rows = db.query(*columns).filter(
+            Telemetry.timestamp >= day,
+            Telemetry.timestamp < day_end
+        ).order_by(Telemetry.timestamp, Telemetry.id).all()
+
+        if rows:
+            new = {name: list(values) for name, values in zip(COLUMN_NAMES, zip(*rows))}
+            new['archived'] = [True] * len(rows)
+            with _lock:
+                entry = _load_catalog().get(f"{day:%Y-%m-%d}")
+            if entry:
+                with Segment(entry['path']) as seg:
+                    new = _merge_columns(seg.all_columns(), new)
+            write_segment(day, new)
+
+            db.query(Telemetry).filter(
+                Telemetry.timestamp >= day,
+                Telemetry.timestamp < day_end
+            ).delete(synchronize_session=False)
+            db.commit()
+            archived_rows += len(rows)
+            written += 1
+
+        day += timedelta(days=1)
+
+    return {'archived_count': archived_rows, 'segments_written': written}
+
+
+def pending_delete(cutoff: Optional[datetime] = None) -> Tuple[int, Optional[datetime]]:
+    """
+    Lignes archivées que delete_before(cutoff) supprimerait, sans rien modifier
+    (comptées dans la transaction de suppression ; les fichiers ne sont touchés qu'après son commit)
+
+    Args:
+        cutoff: Date de coupure ; None pour toute l'archive
+
+    Returns:
+        (nombre de lignes, horodatage de la plus ancienne ligne conservée ou None)
+    """
+    removed = 0
+    first_kept = None
+    for entry in segments():
+        if cutoff is None or entry['max_ts'] < cutoff:
+            removed += entry['rows']
+        elif entry['min_ts'] >= cutoff:
+            first_kept = first_kept or entry['min_ts']
+        else:
+            # Segment à cheval sur la coupure
+            with Segment(entry['path']) as seg:
+                keep = seg.select(start=cutoff)
+                removed += seg.rows - len(keep)
+                if len(keep) and first_kept is None:
+                    first_kept = seg.values('timestamp', keep[:1])[0]
+    return removed, first_kept
+
+
+def delete_before(cutoff: Optional[datetime] = None) -> int:
+    """
+    Supprime les lignes archivées antérieures à cutoff
+    À appeler après le commit de la transaction qui a mis à jour agrégats et compteurs
+    (un rollback ne doit pas laisser des compteurs qui décrivent des segments supprimés)
+
+    Args:
+        cutoff: Date de coupure ; None pour supprimer toute l'archive
+
+    Returns:
+        Nombre de lignes supprimées
+    """
+    removed = 0
+    for entry in segments(None, cutoff):
+        if cutoff is None or entry['max_ts'] < cutoff:
+            removed += entry['rows']
+            _remove_segment(entry['day'])
+            continue
+
+        # Segment à cheval sur la coupure : réécrit avec les lignes restantes
+        with Segment(entry['path']) as seg:
+            keep = seg.select(start=cutoff)
+            remaining = {name: seg.values(name, keep) for name in COLUMN_NAMES}
+            rows = seg.rows
+        removed += rows - len(keep)
+        if len(keep):
+            write_segment(datetime.strptime(entry['day'], '%Y-%m-%d'), remaining)
+        else:
+            _remove_segment(entry['day'])
+    return removed
@@ -1,34 +1,250 @@
 """
 Configuration de la base de données SQLite
+
+Deux moteurs :
+- engine : connexion d'écriture (ingestion, maintenance, endpoints qui modifient)
+- read_engine : pool de connexions en lecture seule pour les requêtes de l'API
+
+Profil 'production' (DB_PROFILE) : journal WAL, synchronous=NORMAL, busy_timeout
+et mmap_size appliqués à chaque connexion, une seule connexion d'écriture.
+En WAL les lecteurs ne bloquent pas l'écriture (et inversement).
+Profil 'default' : moteur SQLAlchemy par défaut, partagé en lecture et écriture.
 """
-from sqlalchemy import create_engine
+import logging
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
+from typing import Tuple
 
-# Chemin vers la base de données
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'robot_data.db')
+from config import Config
+
+# Chemin vers la base de données (DB_PATH)
+DB_PATH = Config.DB_PATH
 DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-# Création du moteur SQLAlchemy
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  # Nécessaire pour SQLite
-    echo=False  # Mettre à True pour voir les requêtes SQL
-)
+DB_PROFILES = ('production', 'default')
+
+# Index d'idempotence de l'ingestion et copie des paquets supprimés par le dédoublonnage
+TELEMETRY_UNIQUE_INDEX = 'uq_telemetry_device_uptime_checksum'
+DUPLICATES_BACKUP_TABLE = 'telemetry_duplicates_backup'
+
+logger = logging.getLogger(__name__)
+
+
+def _apply_pragmas(dbapi_connection, pragmas: Tuple[str, ...]):
+    """Exécute les PRAGMA d'un profil sur une nouvelle connexion"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in pragmas:
+            cursor.execute(f"PRAGMA {pragma}")
+    finally:
+        cursor.close()
+
+
+def create_engines(db_path: str = DB_PATH, profile: str = Config.DB_PROFILE) -> Tuple[Engine, Engine]:
+    """
+    Crée les moteurs d'écriture et de lecture selon le profil
+
+    Args:
+        db_path: Chemin du fichier SQLite
+        profile: 'production' ou 'default'
+
+    Returns:
+        (moteur d'écriture, moteur de lecture) ; identiques pour le profil 'default'
+    """
+    if profile not in DB_PROFILES:
+        raise ValueError(f"Profil de base de données inconnu: {profile}")
+
+    if profile == 'default':
+        writer = create_engine(
+            f"sqlite:///{db_path}",
+            connect_args={"check_same_thread": False},  # Nécessaire pour SQLite
+            echo=False  # Mettre à True pour voir les requêtes SQL
+        )
+        return writer, writer
+
+    common = (
+        f"busy_timeout = {Config.DB_BUSY_TIMEOUT_MS}",
+        f"mmap_size = {Config.DB_MMAP_SIZE_MB * 1024 * 1024}",
+        "temp_store = MEMORY",
+    )
+    writer_pragmas = ("journal_mode = WAL", f"synchronous = {Config.DB_SYNCHRONOUS}") + common
+    reader_pragmas = common + ("query_only = ON",)
+
+    # Une seule connexion d'écriture : les transactions sont sérialisées par le pool
+    # au lieu d'échouer sur SQLITE_BUSY
+    writer = create_engine(
+        f"sqlite:///{db_path}",
+        connect_args={"check_same_thread": False, "timeout": Config.DB_BUSY_TIMEOUT_MS / 1000},
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=30,
+        echo=False
+    )
+    reader = create_engine(
+        f"sqlite:///file:{db_path}?mode=ro&uri=true",
+        connect_args={"check_same_thread": False, "timeout": Config.DB_BUSY_TIMEOUT_MS / 1000},
+        pool_size=Config.DB_READ_POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=30,
+        echo=False
+    )
+    event.listen(writer, 'connect', lambda conn, _: _apply_pragmas(conn, writer_pragmas))
+    event.listen(reader, 'connect', lambda conn, _: _apply_pragmas(conn, reader_pragmas))
+    return writer, reader
+
 
-# Session factory
+# Création des moteurs SQLAlchemy
+engine, read_engine = create_engines()
+
+# Session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Base pour les modèles
 Base = declarative_base()
 
 def init_db():
     """Initialise la base de données en créant toutes les tables"""
-    from app.models.telemetry import Telemetry, Event, TelemetryStatistics, ConnectionLog
+    from app.models.telemetry import Telemetry, Event, TelemetryStatistics, TelemetryTotals, ConnectionLog
     Base.metadata.create_all(bind=engine)
+    if migrate_schema(dedupe=Config.DB_DEDUPE_ON_STARTUP):
+        # Doublons supprimés : agrégats et compteurs cumulés recalculés depuis les lignes restantes
+        from app.models.statistics import backfill_rollups, rebuild_totals
+        backfill_rollups()
+        db = SessionLocal()
+        try:
+            rebuild_totals(db)
+        finally:
+            db.close()
+    # Compteurs cumulés calculés une fois ici plutôt qu'à la première lecture
+    from app.models.statistics import ensure_totals
+    ensure_totals()
     print(f"✓ Base de données initialisée : {DB_PATH}")
 
+def migrate_schema(dedupe: bool = False) -> int:
+    """
+    Ajoute les colonnes et index manquants aux tables existantes
+    (create_all ne modifie pas une table déjà créée)
+
+    Une base antérieure à l'ingestion idempotente peut contenir des paquets en double :
+    l'index unique n'est alors créé qu'une fois ces doublons supprimés, sur demande
+    explicite (DB_DEDUPE_ON_STARTUP, POST /api/database/dedupe)
+
+    Args:
+        dedupe: Supprimer les doublons (copiés dans telemetry_duplicates_backup) pour créer l'index unique
+
+    Returns:
+        Nombre de paquets de télémétrie en double supprimés
+    """
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        tables = [table for table in Base.metadata.sorted_tables if inspector.has_table(table.name)]
+        for table in tables:
+            existing = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                    print(f"✓ Colonne ajoutée : {table.name}.{column.name}")
+
+        # Données existantes mises en conformité avant les index uniques
+        removed = 0
+        skip_unique = False
+        if 'telemetry' in {table.name for table in tables}:
+            # Index unique absent, ou adresses à normaliser (un même paquet stocké sous deux casses)
+            indexes = {index['name'] for index in inspector.get_indexes('telemetry')}
+            unnormalized = conn.execute(text(
+                'SELECT 1 FROM telemetry WHERE device_address != UPPER(device_address) LIMIT 1'
+            )).first()
+            if TELEMETRY_UNIQUE_INDEX not in indexes or unnormalized:
+                duplicates = count_duplicate_telemetry(conn)
+                if duplicates and dedupe:
+                    removed = _remove_duplicate_telemetry(conn)
+                elif duplicates:
+                    # Aucune suppression implicite : index unique reporté (il ferait aussi échouer
+                    # la normalisation des adresses), doublons écartés par la fenêtre en mémoire seulement
+                    logger.warning(
+                        f"⚠️ {duplicates} paquet(s) de télémétrie en double : index {TELEMETRY_UNIQUE_INDEX} non créé. "
+                        f"Dédoublonner avec POST /api/database/dedupe?confirm=true ou DB_DEDUPE_ON_STARTUP=true"
+                    )
+                    conn.execute(text(f'DROP INDEX IF EXISTS {TELEMETRY_UNIQUE_INDEX}'))
+                    skip_unique = True
+        _normalize_device_addresses(conn, tables)
+
+        for table in tables:
+            for index in table.indexes:
+                if skip_unique and index.name == TELEMETRY_UNIQUE_INDEX:
+                    continue
+                index.create(bind=conn, checkfirst=True)
+    return removed
+
+# Paquets identifiés par (robot, uptime_s, checksum) : une ligne dont une de ces valeurs est NULL
+# n'a pas de clé (SQLite ne compare pas les NULL dans un index unique), elle n'est jamais dédoublonnée
+_DUPLICATE_KEY = 'device_address IS NOT NULL AND uptime_s IS NOT NULL AND checksum IS NOT NULL'
+
+def count_duplicate_telemetry(conn) -> int:
+    """
+    Compte les paquets de télémétrie en double (hors premier exemplaire de chaque clé)
+
+    Args:
+        conn: Connexion SQLAlchemy
+
+    Returns:
+        Nombre de lignes que le dédoublonnage supprimerait
+    """
+    return conn.execute(text(
+        'SELECT COALESCE(SUM(n - 1), 0) FROM ('
+        f'    SELECT COUNT(*) AS n FROM telemetry WHERE {_DUPLICATE_KEY} '
+        '    GROUP BY UPPER(device_address), uptime_s, checksum HAVING COUNT(*) > 1'
+        ')'
+    )).scalar()
+
+def _remove_duplicate_telemetry(conn) -> int:
+    """
+    Supprime les paquets de télémétrie reçus plusieurs fois, en gardant le premier (plus petit id)
+    Même clé que l'index unique : (robot, uptime_s, checksum), adresse comparée en majuscules
+    Les lignes supprimées sont d'abord copiées dans telemetry_duplicates_backup
+    """
+    duplicates = (
+        f'{_DUPLICATE_KEY} AND id NOT IN ('
+        f'    SELECT MIN(id) FROM telemetry WHERE {_DUPLICATE_KEY} '
+        '    GROUP BY UPPER(device_address), uptime_s, checksum'
+        ')'
+    )
+    conn.execute(text(f'CREATE TABLE IF NOT EXISTS {DUPLICATES_BACKUP_TABLE} AS SELECT * FROM telemetry WHERE 0'))
+    # Colonnes de la copie (telemetry a pu gagner des colonnes depuis sa création)
+    columns = ', '.join(
+        column['name'] for column in inspect(conn).get_columns(DUPLICATES_BACKUP_TABLE)
+    )
+    conn.execute(text(
+        f'INSERT INTO {DUPLICATES_BACKUP_TABLE} ({columns}) SELECT {columns} FROM telemetry WHERE {duplicates}'
+    ))
+    result = conn.execute(text(f'DELETE FROM telemetry WHERE {duplicates}'))
+    if result.rowcount:
+        logger.warning(
+            f"⚠️ Télémétrie dédoublonnée : {result.rowcount} paquet(s) en double supprimé(s), "
+            f"copiés dans {DUPLICATES_BACKUP_TABLE}"
+        )
+    return result.rowcount
+
+def _normalize_device_addresses(conn, tables):
+    """
+    Met en majuscules les adresses MAC déjà stockées (device_address)
+    Les robots sont enregistrés sous leur adresse normalisée : les filtres par robot comparent en majuscules
+    """
+    for table in tables:
+        if 'device_address' not in table.c:
+            continue
+        result = conn.execute(
+            text(f'UPDATE {table.name} SET device_address = UPPER(device_address) '
+                 f'WHERE device_address != UPPER(device_address)')
+        )
+        if result.rowcount:
+            print(f"✓ Adresses normalisées : {table.name} ({result.rowcount} ligne(s))")
+
 def get_db():
     """Générateur de session de base de données pour FastAPI"""
     db = SessionLocal()
@@ -36,3 +252,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    """Générateur de session en lecture seule pour les endpoints GET"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,10 +1,20 @@
 """
 Utilitaires de maintenance et d'optimisation de la base de données
 """
+import csv
+import io
+import json
 import logging
+import zlib
 from datetime import datetime, timedelta
+from itertools import islice
+from typing import Iterator, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.models.database import SessionLocal
+from app.models.archive import (
+    archive_before, delete_before as archive_delete_before, get_archive_info, iter_rows as iter_archive_rows
+)
+from app.models.database import SessionLocal, ReadSessionLocal
 from app.models.telemetry import Telemetry, Event, ConnectionLog
 
 logger = logging.getLogger(__name__)
@@ -24,9 +34,9 @@ def cleanup_old_data(days: int = 30) -> dict:
     try:
         cutoff = datetime.utcnow() - timedelta(days=days)
         
-        telemetry_deleted = db.query(Telemetry).filter(
-            Telemetry.timestamp < cutoff
-        ).delete()
+        # Suppression + mise à jour des agrégats et compteurs cumulés
+        from app.models.statistics import delete_telemetry_before
+        telemetry_deleted = delete_telemetry_before(db, cutoff)
         
         events_deleted = db.query(Event).filter(
             Event.timestamp < cutoff
@@ -37,6 +47,8 @@ def cleanup_old_data(days: int = 30) -> dict:
         ).delete()
         
         db.commit()
+        # Segments d'archive supprimés une fois la transaction validée
+        archive_delete_before(cutoff)
         
         result = {
             'success': True,
@@ -63,7 +75,7 @@ def cleanup_old_data(days: int = 30) -> dict:
 
 def get_database_size() -> dict:
     """Récupère la taille et les statistiques de la base de données"""
-    db = SessionLocal()
+    db = ReadSessionLocal()
     try:
         telemetry_count = db.query(Telemetry).count()
         events_count = db.query(Event).count()
@@ -98,7 +110,8 @@ def get_database_size() -> dict:
                 'oldest': oldest_data.timestamp.isoformat() if oldest_data else None,
                 'latest': latest_data.timestamp.isoformat() if latest_data else None,
                 'days': span_days
-            }
+            },
+            'archive': get_archive_info()
         }
     
     except Exception as e:
@@ -110,7 +123,8 @@ def get_database_size() -> dict:
 
 def archive_old_data(days: int = 90) -> dict:
     """
-    Archive les données de plus de X jours (marque comme archivées)
+    Archive les données de plus de X jours : la télémétrie est déplacée de la base
+    vers des segments colonnaires compressés (un fichier par jour, voir archive.py)
     
     Args:
         days: Nombre de jours avant archivage
@@ -122,21 +136,19 @@ def archive_old_data(days: int = 90) -> dict:
     try:
         cutoff = datetime.utcnow() - timedelta(days=days)
         
-        archived = db.query(Telemetry).filter(
-            Telemetry.timestamp < cutoff,
-            Telemetry.archived == False
-        ).update({'archived': True})
+        result = archive_before(db, cutoff)
         
-        db.commit()
-        
-        logger.info(f"✓ Archivage: {archived} paquets marqués comme archivés")
+        logger.info(f"✓ Archivage: {result['archived_count']} paquets déplacés dans {result['segments_written']} segment(s)")
         return {
             'success': True,
-            'archived_count': archived,
-            'cutoff_date': cutoff.isoformat()
+            'archived_count': result['archived_count'],
+            'segments_written': result['segments_written'],
+            'cutoff_date': cutoff.isoformat(),
+            'archive': get_archive_info()
         }
     
     except Exception as e:
+        db.rollback()
         logger.error(f"✗ Erreur archivage: {e}")
         return {'success': False, 'error': str(e)}
     finally:
@@ -151,10 +163,11 @@ def rebuild_database() -> dict:
     try:
         from app.models.database import engine
         
-        # SQLite VACUUM
-        with engine.connect() as conn:
-            conn.execute("VACUUM")
-            conn.commit()
+        # SQLite VACUUM (hors transaction), puis troncature du journal WAL
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.exec_driver_sql("VACUUM")
+            if conn.exec_driver_sql("PRAGMA journal_mode").scalar() == 'wal':
+                conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
         
         logger.info("✓ Optimisation BDD terminée (VACUUM)")
         return {
@@ -167,11 +180,55 @@ def rebuild_database() -> dict:
         return {'success': False, 'error': str(e)}
 
 
+def dedupe_telemetry() -> dict:
+    """
+    Supprime les paquets de télémétrie en double d'une base antérieure à l'ingestion idempotente,
+    puis crée l'index unique (robot, uptime_s, checksum) et recalcule agrégats et compteurs cumulés
+
+    Le premier exemplaire de chaque paquet est conservé ; les lignes supprimées sont copiées
+    dans la table telemetry_duplicates_backup. Les lignes sans robot ou sans uptime_s ne sont
+    pas concernées (pas de clé d'idempotence).
+
+    Returns:
+        Dict avec le nombre de paquets supprimés
+    """
+    try:
+        from app.models.database import DUPLICATES_BACKUP_TABLE, migrate_schema
+        from app.models.statistics import backfill_rollups, rebuild_totals
+
+        removed = migrate_schema(dedupe=True)
+        if removed:
+            backfill_rollups()
+            db = SessionLocal()
+            try:
+                rebuild_totals(db)
+            finally:
+                db.close()
+
+        logger.info(f"✓ Dédoublonnage terminé : {removed} paquet(s) supprimé(s)")
+        return {
+            'success': True,
+            'removed': removed,
+            'backup_table': DUPLICATES_BACKUP_TABLE
+        }
+
+    except Exception as e:
+        logger.error(f"✗ Erreur dédoublonnage: {e}")
+        return {'success': False, 'error': str(e)}
+
+
+def get_duplicate_count() -> int:
+    """Nombre de paquets de télémétrie que dedupe_telemetry supprimerait"""
+    from app.models.database import count_duplicate_telemetry, read_engine
+    with read_engine.connect() as conn:
+        return count_duplicate_telemetry(conn)
+
+
 def get_data_quality() -> dict:
     """
     Analyse la qualité des données
     """
-    db = SessionLocal()
+    db = ReadSessionLocal()
     try:
         total_telemetry = db.query(Telemetry).count()
         complete_telemetry = db.query(Telemetry).filter(
@@ -220,7 +277,7 @@ def export_data(format: str = 'json', limit: int = 1000) -> dict:
     Returns:
         Données exportées
     """
-    db = SessionLocal()
+    db = ReadSessionLocal()
     try:
         if format == 'json':
             telemetry = db.query(Telemetry).order_by(Telemetry.timestamp.desc()).limit(limit).all()
@@ -234,9 +291,6 @@ def export_data(format: str = 'json', limit: int = 1000) -> dict:
             }
         
         elif format == 'csv':
-            import csv
-            import io
-            
             # Export télémétrie
             telemetry = db.query(Telemetry).order_by(Telemetry.timestamp.desc()).limit(limit).all()
             
@@ -264,6 +318,125 @@ def export_data(format: str = 'json', limit: int = 1000) -> dict:
         db.close()
 
 
+# Colonnes exportées (mêmes champs que to_dict)
+EXPORT_TABLES = {
+    'telemetry': (Telemetry, (
+        'id', 'packet_id', 'device_address', 'timestamp', 'received_at', 'uptime_s', 'mode',
+        'distance_cm', 'obstacle_events', 'last_ir_cmd', 'speed_pwm', 'dist_traveled_cm',
+        'battery_level', 'signal_strength', 'processed', 'archived'
+    )),
+    'events': (Event, (
+        'id', 'event_id', 'device_address', 'timestamp', 'received_at', 'event_type', 'category',
+        'description', 'value', 'new_value', 'source', 'severity_level', 'acknowledged', 'processed'
+    ))
+}
+
+# Lignes lues par aller-retour curseur / par morceau envoyé au client
+EXPORT_CHUNK_ROWS = 1000
+
+
+def iter_export(
+    table: str = 'telemetry',
+    format: str = 'csv',
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    device: Optional[str] = None,
+    limit: Optional[int] = None,
+    include_archive: bool = False
+) -> Iterator[bytes]:
+    """
+    Exporte une table en flux, par morceaux, sans charger les lignes en mémoire
+    Lecture par curseur serveur (yield_per) dans l'ordre chronologique
+
+    Args:
+        table: 'telemetry' ou 'events'
+        format: 'csv' ou 'ndjson'
+        start: Début de la période (inclus)
+        end: Fin de la période (exclue)
+        device: Adresse MAC du robot
+        limit: Nombre maximum de lignes (défaut: aucune limite)
+        include_archive: Inclure la télémétrie archivée (segments, avant les lignes de la base)
+
+    Yields:
+        Morceaux encodés en UTF-8
+    """
+    model, columns = EXPORT_TABLES[table]
+    device = device.upper() if device else None
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if format == 'csv' else None
+    if writer:
+        writer.writerow(columns)
+
+    db = ReadSessionLocal()
+    try:
+        def partitions():
+            # Segments d'archive (jours les plus anciens), puis lignes de la base
+            if include_archive and table == 'telemetry':
+                rows = iter_archive_rows(start, end, device=device, fields=columns)
+                while True:
+                    chunk = list(islice(rows, EXPORT_CHUNK_ROWS))
+                    if not chunk:
+                        break
+                    yield chunk
+
+            stmt = select(*(getattr(model, name) for name in columns)).order_by(model.timestamp, model.id)
+            if start:
+                stmt = stmt.where(model.timestamp >= start)
+            if end:
+                stmt = stmt.where(model.timestamp < end)
+            if device:
+                stmt = stmt.where(model.device_address == device)
+            if limit:
+                stmt = stmt.limit(max(0, limit - exported))
+            yield from db.execute(stmt, execution_options={'yield_per': EXPORT_CHUNK_ROWS}).partitions()
+
+        exported = 0
+        for rows in partitions():
+            if limit:
+                rows = rows[:limit - exported]
+            for row in rows:
+                values = [v.isoformat() if isinstance(v, datetime) else v for v in row]
+                if writer:
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, values))))
+                    buffer.write('\n')
+            exported += len(rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            if limit and exported >= limit:
+                break
+
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    except Exception as e:
+        logger.error(f"✗ Erreur export en flux: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def gzip_stream(chunks: Iterator[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Compresse un flux de morceaux au format gzip, sans le matérialiser
+
+    Args:
+        chunks: Morceaux à compresser
+        level: Niveau de compression zlib (1-9)
+
+    Yields:
+        Morceaux gzip
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 : en-tête gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
 if __name__ == '__main__':
     # Test des fonctions de maintenance
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,566 @@
+"""
+Agrégats de la télémétrie maintenus incrémentalement à l'ingestion :
+- buckets horaires et journaliers (table telemetry_statistics), pour calculer
+  les statistiques d'une fenêtre en O(buckets) au lieu de O(lignes)
+- compteurs cumulés sur toute la durée de la base (table telemetry_totals)
+
+Les lignes brutes comprennent la télémétrie archivée (app.models.archive) :
+les recalculs depuis les lignes brutes fusionnent base et segments d'archive.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.models import archive
+from app.models.database import SessionLocal
+from app.models.telemetry import Telemetry, TelemetryStatistics, TelemetryTotals
+
+logger = logging.getLogger(__name__)
+
+PERIOD_TYPES = ('hour', 'day')
+
+# Champs additifs et extrêmes d'un agrégat (noms des colonnes de TelemetryStatistics)
+_SUM_FIELDS = (
+    'packet_count', 'speed_samples', 'sum_speed_pwm', 'distance_samples', 'sum_distance_cm',
+    'total_distance_cm', 'obstacle_count', 'battery_samples', 'sum_battery',
+    'mode_auto_count', 'mode_manual_count'
+)
+_MAX_FIELDS = ('max_speed_pwm', 'max_uptime_s')
+_MIN_FIELDS = ('min_speed_pwm', 'min_battery')
+
+
+def period_start(ts: datetime, period_type: str) -> datetime:
+    """Début du bucket (heure ou jour) contenant ts"""
+    if period_type == 'day':
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def period_length(period_type: str) -> timedelta:
+    """Durée d'un bucket"""
+    return timedelta(days=1) if period_type == 'day' else timedelta(hours=1)
+
+
+def empty_aggregate() -> Dict[str, Optional[float]]:
+    """Agrégat neutre"""
+    agg = {field: 0 for field in _SUM_FIELDS}
+    agg.update({field: None for field in _MAX_FIELDS + _MIN_FIELDS})
+    return agg
+
+
+def merge_aggregate(target: dict, other: dict) -> dict:
+    """
+    Fusionne un agrégat partiel dans target (sommes, min et max)
+
+    Args:
+        target: Agrégat modifié en place
+        other: Agrégat (ou ligne TelemetryStatistics convertie) à ajouter
+
+    Returns:
+        target
+    """
+    for field in _SUM_FIELDS:
+        target[field] = (target[field] or 0) + (other.get(field) or 0)
+    for field in _MAX_FIELDS:
+        value = other.get(field)
+        if value is not None and (target[field] is None or value > target[field]):
+            target[field] = value
+    for field in _MIN_FIELDS:
+        value = other.get(field)
+        if value is not None and (target[field] is None or value < target[field]):
+            target[field] = value
+    return target
+
+
+def _mode_of(mode: Optional[str]) -> str:
+    return (mode or '').lower()
+
+
+def aggregate_rows(rows: Iterable[dict]) -> Dict[Tuple[str, datetime], dict]:
+    """
+    Calcule les agrégats horaires et journaliers d'un lot de lignes de télémétrie
+
+    Args:
+        rows: Lignes de télémétrie (dicts avec les colonnes de la table telemetry)
+
+    Returns:
+        Dict {(period_type, period_start): agrégat}
+    """
+    buckets: Dict[Tuple[str, datetime], dict] = {}
+    for row in rows:
+        ts = row['timestamp']
+        speed = row.get('speed_pwm')
+        distance = row.get('distance_cm')
+        battery = row.get('battery_level')
+        mode = _mode_of(row.get('mode'))
+        sample = {
+            'packet_count': 1,
+            'speed_samples': 1 if speed is not None else 0,
+            'sum_speed_pwm': speed or 0,
+            'max_speed_pwm': speed,
+            'min_speed_pwm': speed,
+            'distance_samples': 1 if distance is not None else 0,
+            'sum_distance_cm': distance or 0,
+            'total_distance_cm': row.get('dist_traveled_cm') or 0,
+            'obstacle_count': row.get('obstacle_events') or 0,
+            'battery_samples': 1 if battery is not None else 0,
+            'sum_battery': battery or 0,
+            'min_battery': battery,
+            'max_uptime_s': row.get('uptime_s'),
+            'mode_auto_count': 1 if mode == 'auto' else 0,
+            'mode_manual_count': 1 if mode == 'manual' else 0,
+        }
+        for period_type in PERIOD_TYPES:
+            key = (period_type, period_start(ts, period_type))
+            merge_aggregate(buckets.setdefault(key, empty_aggregate()), sample)
+    return buckets
+
+
+def _stats_to_aggregate(stats: TelemetryStatistics) -> dict:
+    return {field: getattr(stats, field) for field in _SUM_FIELDS + _MAX_FIELDS + _MIN_FIELDS}
+
+
+def _store_aggregate(stats: TelemetryStatistics, agg: dict):
+    """Copie un agrégat dans une ligne TelemetryStatistics et recalcule les moyennes"""
+    for field, value in agg.items():
+        setattr(stats, field, value)
+    stats.avg_speed_pwm = agg['sum_speed_pwm'] / agg['speed_samples'] if agg['speed_samples'] else None
+    stats.avg_distance_cm = agg['sum_distance_cm'] / agg['distance_samples'] if agg['distance_samples'] else None
+    stats.avg_battery = agg['sum_battery'] / agg['battery_samples'] if agg['battery_samples'] else None
+    stats.last_updated = datetime.utcnow()
+
+
+def apply_rollups(db: Session, rows: List[dict]):
+    """
+    Met à jour incrémentalement les agrégats avec un lot de télémétrie
+    (appelé dans la transaction d'ingestion, sans commit)
+
+    Args:
+        db: Session de la transaction d'ingestion
+        rows: Lignes de télémétrie insérées
+    """
+    if not rows:
+        return
+    buckets = aggregate_rows(rows)
+
+    for period_type in PERIOD_TYPES:
+        starts = [start for (ptype, start) in buckets if ptype == period_type]
+        existing = {
+            stats.period_start: stats
+            for stats in db.query(TelemetryStatistics).filter(
+                TelemetryStatistics.period_type == period_type,
+                TelemetryStatistics.period_start.in_(starts)
+            )
+        }
+        for start in starts:
+            agg = buckets[(period_type, start)]
+            stats = existing.get(start)
+            if stats is None:
+                stats = TelemetryStatistics(period_type=period_type, period_start=start)
+                db.add(stats)
+            else:
+                agg = merge_aggregate(_stats_to_aggregate(stats), agg)
+            _store_aggregate(stats, agg)
+
+
+def _aggregate_columns():
+    """Expressions SQL d'agrégation équivalentes à aggregate_rows"""
+    mode = func.lower(Telemetry.mode)
+    return [
+        func.count(Telemetry.id).label('packet_count'),
+        func.count(Telemetry.speed_pwm).label('speed_samples'),
+        func.coalesce(func.sum(Telemetry.speed_pwm), 0).label('sum_speed_pwm'),
+        func.max(Telemetry.speed_pwm).label('max_speed_pwm'),
+        func.min(Telemetry.speed_pwm).label('min_speed_pwm'),
+        func.count(Telemetry.distance_cm).label('distance_samples'),
+        func.coalesce(func.sum(Telemetry.distance_cm), 0).label('sum_distance_cm'),
+        func.coalesce(func.sum(Telemetry.dist_traveled_cm), 0).label('total_distance_cm'),
+        func.coalesce(func.sum(Telemetry.obstacle_events), 0).label('obstacle_count'),
+        func.count(Telemetry.battery_level).label('battery_samples'),
+        func.coalesce(func.sum(Telemetry.battery_level), 0).label('sum_battery'),
+        func.min(Telemetry.battery_level).label('min_battery'),
+        func.max(Telemetry.uptime_s).label('max_uptime_s'),
+        func.coalesce(func.sum(case((mode == 'auto', 1), else_=0)), 0).label('mode_auto_count'),
+        func.coalesce(func.sum(case((mode == 'manual', 1), else_=0)), 0).label('mode_manual_count'),
+    ]
+
+
+def aggregate_raw(db: Session, start: datetime, end: datetime) -> dict:
+    """
+    Agrège les lignes brutes d'un intervalle [start, end) en une seule requête
+    (plus les segments d'archive qui recoupent l'intervalle)
+
+    Args:
+        db: Session
+        start: Début inclus
+        end: Fin exclue
+
+    Returns:
+        Agrégat
+    """
+    if start >= end:
+        return empty_aggregate()
+    row = db.query(*_aggregate_columns()).filter(
+        Telemetry.timestamp >= start,
+        Telemetry.timestamp < end
+    ).one()
+    agg = merge_aggregate(empty_aggregate(), row._asdict())
+    for part in archive.aggregate(start, end):
+        merge_aggregate(agg, part)
+    return agg
+
+
+def _rollup_sum(db: Session, period_type: str, start: datetime, end: datetime) -> dict:
+    """Somme des buckets d'un type dont le début est dans [start, end)"""
+    agg = empty_aggregate()
+    if start >= end:
+        return agg
+    for stats in db.query(TelemetryStatistics).filter(
+        TelemetryStatistics.period_type == period_type,
+        TelemetryStatistics.period_start >= start,
+        TelemetryStatistics.period_start < end
+    ):
+        merge_aggregate(agg, _stats_to_aggregate(stats))
+    return agg
+
+
+def _ceil(ts: datetime, period_type: str) -> datetime:
+    start = period_start(ts, period_type)
+    return start if start == ts else start + period_length(period_type)
+
+
+def aggregate_window(db: Session, start: datetime, end: Optional[datetime] = None) -> dict:
+    """
+    Agrégat d'une fenêtre quelconque à partir des buckets journaliers et horaires,
+    plus les lignes brutes de la portion d'heure entamée au début de la fenêtre
+
+    Args:
+        db: Session
+        start: Début de la fenêtre
+        end: Fin de la fenêtre (défaut: maintenant, bucket courant inclus)
+
+    Returns:
+        Agrégat de la fenêtre
+    """
+    now = datetime.utcnow()
+    end = end or now
+    agg = empty_aggregate()
+
+    first_hour = min(_ceil(start, 'hour'), end)
+    last_hour = period_start(end, 'hour') if end < now else end
+    if first_hour >= last_hour:
+        return merge_aggregate(agg, aggregate_raw(db, start, end))
+
+    # Bord gauche : portion d'heure entamée, depuis les lignes brutes
+    merge_aggregate(agg, aggregate_raw(db, start, first_hour))
+
+    # Heures jusqu'au premier jour complet, jours complets, puis heures restantes
+    first_day = min(_ceil(first_hour, 'day'), last_hour)
+    last_day = max(period_start(last_hour, 'day'), first_day)
+    merge_aggregate(agg, _rollup_sum(db, 'hour', first_hour, first_day))
+    merge_aggregate(agg, _rollup_sum(db, 'day', first_day, last_day))
+    if end < now:
+        merge_aggregate(agg, _rollup_sum(db, 'hour', last_day, last_hour))
+        # Bord droit : portion d'heure entamée à la fin de la fenêtre
+        merge_aggregate(agg, aggregate_raw(db, last_hour, end))
+    else:
+        # Fenêtre ouverte : les buckets courants sont maintenus à l'ingestion
+        merge_aggregate(agg, _rollup_sum(db, 'hour', last_day, now + timedelta(hours=1)))
+    return agg
+
+
+def _rebuild_range(db: Session, start: Optional[datetime], end: Optional[datetime]) -> int:
+    """Recalcule depuis les lignes brutes les buckets compris dans [start, end)"""
+    hour_key = func.strftime('%Y-%m-%d %H:00:00', Telemetry.timestamp)
+    query = db.query(hour_key.label('hour'), *_aggregate_columns())
+    if start is not None:
+        query = query.filter(Telemetry.timestamp >= start)
+    if end is not None:
+        query = query.filter(Telemetry.timestamp < end)
+
+    hours = [
+        (datetime.strptime(values.pop('hour'), '%Y-%m-%d %H:%M:%S'), values)
+        for values in (row._asdict() for row in query.group_by(hour_key))
+    ]
+    hours.extend(archive.aggregate_by_hour(start, end).items())
+
+    buckets: Dict[Tuple[str, datetime], dict] = {}
+    for hour, values in hours:
+        for period_type in PERIOD_TYPES:
+            key = (period_type, period_start(hour, period_type))
+            merge_aggregate(buckets.setdefault(key, empty_aggregate()), values)
+
+    stale = db.query(TelemetryStatistics)
+    if start is not None:
+        stale = stale.filter(TelemetryStatistics.period_start >= start)
+    if end is not None:
+        stale = stale.filter(TelemetryStatistics.period_start < end)
+    stale.delete(synchronize_session=False)
+
+    for (period_type, bucket_start), agg in buckets.items():
+        stats = TelemetryStatistics(period_type=period_type, period_start=bucket_start)
+        _store_aggregate(stats, agg)
+        db.add(stats)
+    return len(buckets)
+
+
+def backfill_rollups(start: Optional[datetime] = None, end: Optional[datetime] = None) -> dict:
+    """
+    Reconstruit les agrégats depuis les lignes brutes (données existantes)
+
+    Args:
+        start: Début (aligné sur le jour) ; défaut: toute la table
+        end: Fin (alignée sur le jour) ; défaut: toute la table
+
+    Returns:
+        Dict avec le nombre de buckets écrits
+    """
+    start = period_start(start, 'day') if start else None
+    end = _ceil(end, 'day') if end else None
+
+    db = SessionLocal()
+    try:
+        buckets = _rebuild_range(db, start, end)
+        db.commit()
+        logger.info(f"✓ Agrégats reconstruits: {buckets} bucket(s)")
+        return {
+            'success': True,
+            'buckets': buckets,
+            'start': start.isoformat() if start else None,
+            'end': end.isoformat() if end else None
+        }
+    except Exception as e:
+        db.rollback()
+        logger.error(f"✗ Erreur reconstruction agrégats: {e}")
+        return {'success': False, 'error': str(e)}
+    finally:
+        db.close()
+
+
+def prune_rollups(db: Session, cutoff: Optional[datetime] = None):
+    """
+    Répercute une suppression de télémétrie (timestamp < cutoff) sur les agrégats
+    (appelé dans la transaction de suppression, sans commit)
+
+    Args:
+        db: Session de la transaction de suppression
+        cutoff: Date de coupure ; None si toute la télémétrie a été supprimée
+    """
+    if cutoff is None:
+        db.query(TelemetryStatistics).delete(synchronize_session=False)
+        return
+
+    # Buckets entièrement supprimés
+    db.query(TelemetryStatistics).filter(
+        TelemetryStatistics.period_start < period_start(cutoff, 'day')
+    ).delete(synchronize_session=False)
+    # Jour contenant la coupure : recalcul depuis les lignes restantes de ce jour
+    day = period_start(cutoff, 'day')
+    _rebuild_range(db, day, day + timedelta(days=1))
+
+
+TOTALS_ID = 1
+
+
+def apply_totals(db: Session, rows: List[dict]) -> Optional[TelemetryTotals]:
+    """
+    Met à jour les compteurs cumulés avec un lot de télémétrie
+    (appelé dans la transaction d'ingestion, sans commit)
+
+    Args:
+        db: Session de la transaction d'ingestion
+        rows: Lignes de télémétrie insérées
+
+    Returns:
+        Ligne TelemetryTotals à jour (None si le lot est vide)
+    """
+    if not rows:
+        return None
+    totals = db.get(TelemetryTotals, TOTALS_ID)
+    if totals is None:
+        totals = _compute_totals(db)
+        db.add(totals)
+        return totals  # Les lignes du lot sont déjà flushées et comptées
+
+    timestamps = [row['timestamp'] for row in rows]
+    uptimes = [row['uptime_s'] for row in rows if row.get('uptime_s') is not None]
+
+    totals.record_count = (totals.record_count or 0) + len(rows)
+    totals.total_distance_cm = (totals.total_distance_cm or 0) + sum(row.get('dist_traveled_cm') or 0 for row in rows)
+    totals.total_obstacles = (totals.total_obstacles or 0) + sum(row.get('obstacle_events') or 0 for row in rows)
+    if uptimes:
+        totals.max_uptime_s = max(uptimes + ([totals.max_uptime_s] if totals.max_uptime_s is not None else []))
+    first, last = min(timestamps), max(timestamps)
+    if totals.first_timestamp is None or first < totals.first_timestamp:
+        totals.first_timestamp = first
+    if totals.last_timestamp is None or last > totals.last_timestamp:
+        totals.last_timestamp = last
+    return totals
+
+
+def _compute_totals(db: Session) -> TelemetryTotals:
+    """Calcule les compteurs cumulés depuis les lignes brutes et l'archive (parcours complet)"""
+    row = db.query(
+        func.min(Telemetry.timestamp),
+        func.max(Telemetry.timestamp)
+    ).one()
+    agg = aggregate_raw(db, datetime.min, datetime.max)
+    first, last = row
+    archived = archive.segments()
+    if archived:
+        first = min(t for t in (first, archived[0]['min_ts']) if t is not None)
+        last = max(t for t in (last, archived[-1]['max_ts']) if t is not None)
+    return TelemetryTotals(
+        id=TOTALS_ID,
+        record_count=agg['packet_count'],
+        total_distance_cm=agg['total_distance_cm'],
+        total_obstacles=agg['obstacle_count'],
+        max_uptime_s=agg['max_uptime_s'],
+        first_timestamp=first,
+        last_timestamp=last
+    )
+
+
+def ensure_totals() -> None:
+    """
+    Calcule et enregistre les compteurs cumulés s'ils n'existent pas encore
+    (appelé une fois au démarrage, par init_db, avant l'ingestion et les lectures)
+    """
+    db = SessionLocal()
+    try:
+        if db.get(TelemetryTotals, TOTALS_ID) is None:
+            rebuild_totals(db)
+    finally:
+        db.close()
+
+
+def get_totals(db: Session) -> TelemetryTotals:
+    """
+    Récupère les compteurs cumulés
+
+    Args:
+        db: Session (éventuellement en lecture seule)
+
+    Returns:
+        Ligne TelemetryTotals ; calculée sans être enregistrée si elle n'existe pas encore
+        (pas de session d'écriture ouverte depuis un chemin de lecture : ensure_totals au démarrage)
+    """
+    totals = db.get(TelemetryTotals, TOTALS_ID)
+    if totals is None:
+        totals = _compute_totals(db)
+    return totals
+
+
+def totals_summary(totals: TelemetryTotals) -> dict:
+    """
+    Compteurs cumulés au format de /api/telemetry/total-stats
+
+    Args:
+        totals: Ligne TelemetryTotals
+
+    Returns:
+        Dict (distance en mètres, uptime en heures, obstacles, période couverte)
+    """
+    return {
+        # Distance totale en mètres (somme de dist_traveled_cm divisée par 100)
+        'total_distance_m': round((totals.total_distance_cm or 0) / 100, 2),
+        # Temps de fonctionnement total (maximum uptime_s enregistré)
+        'total_uptime_hours': round((totals.max_uptime_s or 0) / 3600, 2),
+        'total_obstacles': int(totals.total_obstacles or 0),
+        'total_records': totals.record_count or 0,
+        'first_record': totals.first_timestamp.isoformat() if totals.first_timestamp else None,
+        'last_record': totals.last_timestamp.isoformat() if totals.last_timestamp else None
+    }
+
+
+def rebuild_totals(db: Session) -> TelemetryTotals:
+    """
+    Recalcule et enregistre les compteurs cumulés depuis les lignes brutes
+
+    Args:
+        db: Session (commit effectué)
+
+    Returns:
+        Ligne TelemetryTotals
+    """
+    db.query(TelemetryTotals).delete(synchronize_session=False)
+    totals = _compute_totals(db)
+    db.add(totals)
+    db.commit()
+    logger.info(f"✓ Compteurs cumulés recalculés ({totals.record_count} paquets)")
+    return totals
+
+
+def delete_telemetry_before(db: Session, cutoff: Optional[datetime] = None) -> int:
+    """
+    Supprime la télémétrie antérieure à cutoff de la base et met à jour agrégats et
+    compteurs cumulés, lignes archivées comprises (sans commit). Les segments d'archive
+    ne sont pas modifiés ici : archive.delete_before(cutoff) après le commit
+
+    Args:
+        db: Session de la transaction de suppression
+        cutoff: Date de coupure ; None pour tout supprimer
+
+    Returns:
+        Nombre de lignes supprimées
+    """
+    query = db.query(Telemetry)
+    if cutoff is not None:
+        query = query.filter(Telemetry.timestamp < cutoff)
+        removed = aggregate_raw(db, datetime.min, cutoff)
+
+    count = query.delete(synchronize_session=False)
+    archived_count, archive_first = archive.pending_delete(cutoff)
+    count += archived_count
+    prune_rollups(db, cutoff)
+
+    totals = db.get(TelemetryTotals, TOTALS_ID)
+    if totals is None or not count:
+        return count
+    if cutoff is None:
+        totals.record_count = 0
+        totals.total_distance_cm = 0
+        totals.total_obstacles = 0
+        totals.max_uptime_s = None
+        totals.first_timestamp = None
+        totals.last_timestamp = None
+        return count
+
+    totals.record_count = max(0, (totals.record_count or 0) - removed['packet_count'])
+    totals.total_distance_cm = (totals.total_distance_cm or 0) - (removed['total_distance_cm'] or 0)
+    totals.total_obstacles = (totals.total_obstacles or 0) - (removed['obstacle_count'] or 0)
+    # Bornes recalculées sur les lignes restantes (recherche par index / rare) ;
+    # l'archive contient encore les lignes supprimées jusqu'au commit : seul [cutoff, ...) est lu
+    totals.first_timestamp = archive_first or db.query(func.min(Telemetry.timestamp)).scalar()
+    if totals.first_timestamp is None:
+        totals.last_timestamp = None
+    if removed['max_uptime_s'] is not None and removed['max_uptime_s'] >= (totals.max_uptime_s or 0):
+        totals.max_uptime_s = aggregate_raw(db, cutoff, datetime.max)['max_uptime_s']
+    return count
+
+
+if __name__ == '__main__':
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Reconstruction des agrégats de télémétrie")
+    parser.add_argument('--days', type=int, default=None, help="Ne reconstruire que les X derniers jours")
+    args = parser.parse_args()
+
+    from app.models.database import init_db
+    init_db()
+
+    since = datetime.utcnow() - timedelta(days=args.days) if args.days else None
+    result = backfill_rollups(start=since)
+    print(f"📊 Agrégats: {result}")
+
+    db = SessionLocal()
+    try:
+        totals = rebuild_totals(db)
+        print(f"📊 Compteurs cumulés: {totals.to_dict()}")
+    finally:
+        db.close()
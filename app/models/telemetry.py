@@ -16,7 +16,8 @@ class Telemetry(Base):
     
     # Clés primaires et identifiants
     id = Column(Integer, primary_key=True, autoincrement=True)
-    packet_id = Column(String(36), unique=True, nullable=True, index=True)  # UUID du paquet
+    packet_id = Column(String(36), unique=True, nullable=True, index=True)  # UUID du paquet (dérivé de robot, uptime_s, checksum)
+    device_address = Column(String(20), nullable=True, index=True)  # Adresse MAC du robot émetteur
     
     # Timestamps
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -46,6 +47,10 @@ class Telemetry(Base):
         Index('idx_telemetry_timestamp_mode', 'timestamp', 'mode'),
         Index('idx_telemetry_received_at', 'received_at'),
         Index('idx_telemetry_mode_timestamp', 'mode', 'timestamp'),
+        Index('idx_telemetry_device_timestamp', 'device_address', 'timestamp'),
+        # Idempotence de l'ingestion : un paquet n'est stocké qu'une fois par robot
+        # (sans effet sur les lignes dont device_address ou uptime_s est NULL : NULL != NULL dans l'index)
+        Index('uq_telemetry_device_uptime_checksum', 'device_address', 'uptime_s', 'checksum', unique=True),
         CheckConstraint('speed_pwm >= 0 AND speed_pwm <= 255'),
         CheckConstraint('battery_level >= 0 AND battery_level <= 100'),
     )
@@ -55,6 +60,7 @@ class Telemetry(Base):
         return {
             'id': self.id,
             'packet_id': self.packet_id,
+            'device_address': self.device_address,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
             'received_at': self.received_at.isoformat() if self.received_at else None,
             'uptime_s': self.uptime_s,
@@ -81,6 +87,7 @@ class Event(Base):
     # Clés primaires et identifiants
     id = Column(Integer, primary_key=True, autoincrement=True)
     event_id = Column(String(36), unique=True, nullable=True, index=True)  # UUID unique
+    device_address = Column(String(20), nullable=True, index=True)  # Adresse MAC du robot émetteur
     
     # Timestamps
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -113,6 +120,7 @@ class Event(Base):
         Index('idx_event_category_severity', 'category', 'severity_level'),
         Index('idx_event_received_at', 'received_at'),
         Index('idx_event_type_timestamp', 'event_type', 'timestamp'),
+        Index('idx_event_device_timestamp', 'device_address', 'timestamp'),
     )
     
     def to_dict(self):
@@ -120,6 +128,7 @@ class Event(Base):
         return {
             'id': self.id,
             'event_id': self.event_id,
+            'device_address': self.device_address,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
             'received_at': self.received_at.isoformat() if self.received_at else None,
             'event_type': self.event_type,
@@ -156,9 +165,21 @@ class TelemetryStatistics(Base):
     
     obstacle_count = Column(Integer, default=0)
     avg_battery = Column(Float, nullable=True)
+    min_battery = Column(Integer, nullable=True)
+    max_uptime_s = Column(Integer, nullable=True)
     
     mode_auto_time = Column(Integer, default=0)  # Temps en mode auto (secondes)
     mode_manual_time = Column(Integer, default=0)  # Temps en mode manuel (secondes)
+    mode_auto_count = Column(Integer, default=0)  # Paquets reçus en mode auto
+    mode_manual_count = Column(Integer, default=0)  # Paquets reçus en mode manuel
+    
+    # Sommes et effectifs (valeurs non nulles) pour la mise à jour incrémentale des moyennes
+    speed_samples = Column(Integer, default=0)
+    sum_speed_pwm = Column(Float, default=0)
+    distance_samples = Column(Integer, default=0)
+    sum_distance_cm = Column(Float, default=0)
+    battery_samples = Column(Integer, default=0)
+    sum_battery = Column(Float, default=0)
     
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -166,6 +187,7 @@ class TelemetryStatistics(Base):
     
     __table_args__ = (
         Index('idx_stats_period_start_type', 'period_start', 'period_type'),
+        Index('uq_stats_period_type_start', 'period_type', 'period_start', unique=True),
     )
     
     def to_dict(self):
@@ -182,12 +204,48 @@ class TelemetryStatistics(Base):
             'total_distance_cm': self.total_distance_cm,
             'obstacle_count': self.obstacle_count,
             'avg_battery': self.avg_battery,
+            'min_battery': self.min_battery,
+            'max_uptime_s': self.max_uptime_s,
             'mode_auto_time': self.mode_auto_time,
             'mode_manual_time': self.mode_manual_time,
+            'mode_auto_count': self.mode_auto_count,
+            'mode_manual_count': self.mode_manual_count,
             'last_updated': self.last_updated.isoformat()
         }
 
 
+class TelemetryTotals(Base):
+    """
+    Table (une seule ligne) des compteurs cumulés sur toute la durée de la base
+    Maintenue à l'ingestion et lors des suppressions de rétention
+    """
+    __tablename__ = "telemetry_totals"
+    
+    id = Column(Integer, primary_key=True)  # Toujours 1
+    
+    record_count = Column(Integer, default=0)
+    total_distance_cm = Column(Float, default=0)
+    total_obstacles = Column(Integer, default=0)
+    max_uptime_s = Column(Integer, nullable=True)
+    
+    first_timestamp = Column(DateTime, nullable=True)
+    last_timestamp = Column(DateTime, nullable=True)
+    
+    last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convertit l'objet en dictionnaire"""
+        return {
+            'record_count': self.record_count,
+            'total_distance_cm': self.total_distance_cm,
+            'total_obstacles': self.total_obstacles,
+            'max_uptime_s': self.max_uptime_s,
+            'first_timestamp': self.first_timestamp.isoformat() if self.first_timestamp else None,
+            'last_timestamp': self.last_timestamp.isoformat() if self.last_timestamp else None,
+            'last_updated': self.last_updated.isoformat() if self.last_updated else None
+        }
+
+
 class ConnectionLog(Base):
     """
     Table pour logger toutes les connexions/déconnexions
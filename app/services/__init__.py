@@ -4,11 +4,28 @@ Contient la logique de communication Bluetooth
 """
 from app.services.ble_manager import (
     BLEConnectionManager,
-    ble_manager
+    BLEConnectionPool,
+    IMAGES,
+    ble_manager,
+    ble_pool
 )
+from app.services.ble_scanner import DeviceScanner, device_scanner
+from app.services.ingestion import IngestionQueue, ingestion_queue
+from app.services.live_state import LiveState, live_state
+from app.services.response_cache import ResponseCache, response_cache
 
 __all__ = [
     'BLEConnectionManager',
+    'BLEConnectionPool',
     'ble_manager',
+    'ble_pool',
+    'DeviceScanner',
+    'device_scanner',
+    'IngestionQueue',
+    'ingestion_queue',
+    'LiveState',
+    'live_state',
+    'ResponseCache',
+    'response_cache',
     'IMAGES'
 ]
@@ -3,41 +3,83 @@ Gestionnaire de connexion Bluetooth Low Energy (BLE)
 Gère la communication avec le robot Arduino via BLE
 """
 import asyncio
-from bleak import BleakClient, BleakScanner
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 import logging
 import json
+import random
 import re
+import time
+from datetime import datetime
 
 from app.api.websocket_manager import manager as connection_manager
+from config import Config
+
+# Backend BLE : robots physiques (bleak) ou robots virtuels (simulateur)
+if Config.BLE_BACKEND == 'simulator':
+    from app.services.ble_simulator import SimulatedBleakClient as BleakClient, simulator
+else:
+    from bleak import BleakClient
+from app.services.ble_scanner import DeviceEntry, device_scanner
+from app.services.command_queue import CommandScheduler
+from app.services.event_classifier import event_classifier
+from app.services.frame_capture import HexDump, LogSampler, frame_capture
+from app.services.gatt_cache import gatt_cache, resolve_layout
+from app.services.framer import PacketFramer
+from app.services.ingestion import ingestion_queue
+from app.services.live_state import live_state
+from app.metrics import (
+    BLE_CONNECT_SECONDS, BLE_HANDLER_SECONDS, BLE_NOTIFICATION_BYTES, BLE_NOTIFICATIONS, BLE_PARSE_FAILURES,
+    BLE_WRITE_FAILURES, BLE_WRITE_SECONDS
+)
+from app.services.telemetry_protocol import decode_telemetry, frame_size
 
 # Configuration du logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration BLE
-ADDRESS = "48:87:2d:76:b3:1d"
+ADDRESS = Config.BLE_DEVICE_ADDRESS
 # UUID_WRITE en format standard Bluetooth (16-bit 0xFFE2 -> UUID 128-bit)
 UUID_WRITE = "0000ffe2-0000-1000-8000-00805f9b34fb"
 # UUID_NOTIFY en format standard Bluetooth (16-bit 0xFFE1 -> UUID 128-bit)
 UUID_WRITENOTIFY = "0000ffe1-0000-1000-8000-00805f9b34fb"
 
 # Images prédéfinies pour la matrice LED (16 bytes chacune)
-# IMAGES = {
-#     'heart': bytes([0x00, 0x00, 0x00, 0x0c, 0x1e, 0x3f, 0x7f, 0xfe, 0xfe, 0x7f, 0x3f, 0x1e, 0x0c, 0x00, 0x00, 0x00]),
-#     'cross': bytes([0x81, 0x42, 0x24, 0x18, 0x18, 0x24, 0x42, 0x81, 0x81, 0x42, 0x24, 0x18, 0x18, 0x24, 0x42, 0x81]),
-#     'ok': bytes([0x0, 0x0, 0x0, 0x38, 0x44, 0x44, 0x38, 0x0, 0x0, 0x7c, 0x10, 0x28, 0x44, 0x0, 0x0, 0x0]),
-#     'warning': bytes([0x0, 0x0, 0x5e, 0x5e, 0x0, 0x0, 0x0, 0x5e, 0x5e, 0x0, 0x0, 0x0, 0x5e, 0x5e, 0x0, 0x0]),
-#     'smile': bytes([0x00, 0x00, 0x00, 0x10, 0x20, 0x40, 0x46, 0x40, 0x40, 0x46, 0x40, 0x20, 0x10, 0x00, 0x00, 0x00]),
-#     'sad': bytes([0x00, 0x00, 0x00, 0x00, 0x40, 0x24, 0x20, 0x20, 0x20, 0x20, 0x24, 0x40, 0x00, 0x00, 0x00, 0x00]),
-#     'neutral': bytes([0x0, 0x0, 0x0, 0x3c, 0x42, 0x95, 0x81, 0x42, 0x42, 0x81, 0x91, 0x42, 0x3c, 0x0, 0x0, 0x0]),
-#     'arrow_up': bytes([0x0, 0x10, 0x38, 0x7c, 0xfe, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x0, 0x0, 0x0]),
-#     'arrow_down': bytes([0x0, 0x0, 0x0, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0xfe, 0x7c, 0x38, 0x10, 0x0, 0x0]),
-#     'arrow_left': bytes([0x0, 0x0, 0x10, 0x30, 0x78, 0xfe, 0x78, 0x30, 0x10, 0x10, 0x10, 0x10, 0x10, 0x0, 0x0, 0x0]),
-#     'arrow_right': bytes([0x0, 0x0, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x78, 0xfe, 0x78, 0x30, 0x10, 0x0, 0x0, 0x0]),
-#     'stop': bytes([0x0, 0x0, 0x0, 0x7e, 0x7e, 0x7e, 0x7e, 0x7e, 0x7e, 0x7e, 0x7e, 0x7e, 0x0, 0x0, 0x0, 0x0]),
-#     'off': bytes([0x0, 0x3c, 0x42, 0x42, 0x3c, 0x0, 0x7e, 0xa, 0xa, 0x2, 0x0, 0x7e, 0xa, 0xa, 0x2, 0x0])
-# }
+IMAGES = {
+    'heart': bytes([0x00, 0x00, 0x00, 0x0c, 0x1e, 0x3f, 0x7f, 0xfe, 0xfe, 0x7f, 0x3f, 0x1e, 0x0c, 0x00, 0x00, 0x00]),
+    'cross': bytes([0x81, 0x42, 0x24, 0x18, 0x18, 0x24, 0x42, 0x81, 0x81, 0x42, 0x24, 0x18, 0x18, 0x24, 0x42, 0x81]),
+    'ok': bytes([0x0, 0x0, 0x0, 0x38, 0x44, 0x44, 0x38, 0x0, 0x0, 0x7c, 0x10, 0x28, 0x44, 0x0, 0x0, 0x0]),
+    'warning': bytes([0x0, 0x0, 0x5e, 0x5e, 0x0, 0x0, 0x0, 0x5e, 0x5e, 0x0, 0x0, 0x0, 0x5e, 0x5e, 0x0, 0x0]),
+    'smile': bytes([0x00, 0x00, 0x00, 0x10, 0x20, 0x40, 0x46, 0x40, 0x40, 0x46, 0x40, 0x20, 0x10, 0x00, 0x00, 0x00]),
+    'sad': bytes([0x00, 0x00, 0x00, 0x00, 0x40, 0x24, 0x20, 0x20, 0x20, 0x20, 0x24, 0x40, 0x00, 0x00, 0x00, 0x00]),
+    'neutral': bytes([0x0, 0x0, 0x0, 0x3c, 0x42, 0x95, 0x81, 0x42, 0x42, 0x81, 0x91, 0x42, 0x3c, 0x0, 0x0, 0x0]),
+    'arrow_up': bytes([0x0, 0x10, 0x38, 0x7c, 0xfe, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x0, 0x0, 0x0]),
+    'arrow_down': bytes([0x0, 0x0, 0x0, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0xfe, 0x7c, 0x38, 0x10, 0x0, 0x0]),
+    'arrow_left': bytes([0x0, 0x0, 0x10, 0x30, 0x78, 0xfe, 0x78, 0x30, 0x10, 0x10, 0x10, 0x10, 0x10, 0x0, 0x0, 0x0]),
+    'arrow_right': bytes([0x0, 0x0, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x78, 0xfe, 0x78, 0x30, 0x10, 0x0, 0x0, 0x0]),
+    'stop': bytes([0x0, 0x0, 0x0, 0x7e, 0x7e, 0x7e, 0x7e, 0x7e, 0x7e, 0x7e, 0x7e, 0x7e, 0x0, 0x0, 0x0, 0x0]),
+    'off': bytes([0x0, 0x3c, 0x42, 0x42, 0x3c, 0x0, 0x7e, 0xa, 0xa, 0x2, 0x0, 0x7e, 0xa, 0xa, 0x2, 0x0])
+}
+
+
+def reconnect_delay(
+    attempt: int,
+    base_s: float = Config.BLE_RECONNECT_BASE_S,
+    max_s: float = Config.BLE_RECONNECT_MAX_S
+) -> float:
+    """
+    Délai avant une tentative de reconnexion (backoff exponentiel avec gigue)
+    La gigue (50 à 100 % du délai) évite que toute la flotte se reconnecte au même instant
+
+    Args:
+        attempt: Numéro de la tentative (0 = première)
+        base_s: Délai de la première tentative
+        max_s: Plafond du délai
+
+    Returns:
+        Délai en secondes
+    """
+    return min(max_s, base_s * 2 ** min(attempt, 16)) * random.uniform(0.5, 1.0)
 
 
 class BLEConnectionManager:
@@ -54,75 +96,300 @@ class BLEConnectionManager:
             address: Adresse MAC du device Bluetooth
             uuid_write: UUID de la caractéristique GATT pour écriture
         """
-        self.address = address
+        # Adresse normalisée : c'est elle qui est stockée (device_address) et filtrée par les exports
+        self.address = normalize_address(address)
         self.uuid_write = uuid_write
         self.uuid_notify = uuid_notify
         self.client: Optional[BleakClient] = None
         self.is_connected = False
-        self._connecting = False  # Flag simple pour éviter les connexions multiples
+        self.name: Optional[str] = None  # Nom annoncé (scan)
+        self.rssi: Optional[int] = None  # Dernier RSSI connu (scan)
+        # Tentative de connexion en cours, partagée par les appelants concurrents
+        self._connect_future: Optional[asyncio.Future] = None
+        # Superviseur de liaison (reconnexion automatique) et signal de perte de liaison
+        self._supervisor: Optional[asyncio.Task] = None
+        self._link_down = asyncio.Event()
+        self._advertised = asyncio.Event()  # Advertising reçu (scanner continu)
+        self._disconnecting = False
+        self.connected_at: Optional[float] = None
+        self.down_since: Optional[float] = None
+        self.disconnects = 0
+        self.reconnects = 0
+        self.reconnect_attempts = 0
+        self.framer = PacketFramer()  # Réassemblage des paquets fragmentés
+        self._log_sampler = LogSampler(logger)  # Journalisation par paquet échantillonnée
+        # File de commandes (priorités, fusion, cadence) : seul chemin d'écriture vers le robot
+        self.commands = CommandScheduler(self.address, self._write_gatt)
+        self.write_with_response = True  # Résolu à la connexion (BLE_WRITE_MODE)
+        # Disposition GATT (cache disque) : caractéristiques désignées par handle une fois résolues
+        self.gatt_layout: Optional[Dict[str, any]] = None
+        self._notify_char = uuid_notify
+        self._write_char = uuid_write
+        
+        # Séries de métriques du robot (résolues une fois, hors du chemin critique)
+        self._m_notifications = BLE_NOTIFICATIONS.labels(self.address)
+        self._m_bytes = BLE_NOTIFICATION_BYTES.labels(self.address)
+        self._m_handler = BLE_HANDLER_SECONDS.labels(self.address)
+        self._m_write = BLE_WRITE_SECONDS.labels(self.address)
+        self._m_write_failures = BLE_WRITE_FAILURES.labels(self.address)
     
     async def connect(self) -> Dict[str, any]:
         """
         Établit la connexion avec le device BLE
+        Les appels concurrents attendent la même tentative ; une fois connecté,
+        le superviseur rétablit la liaison en cas de perte (BLE_AUTO_RECONNECT)
         
         Returns:
             Dict avec status et message
         """
-        if self._connecting or self.is_connected:
-            if self.is_connected:
-                logger.info("Déjà connecté au device")
-                return {"success": True, "message": "Déjà connecté", "address": self.address}
-            else:
-                return {"success": False, "message": "Connexion en cours..."}
-        
-        self._connecting = True
+        if self.is_connected:
+            logger.info("Déjà connecté au device")
+            return {"success": True, "message": "Déjà connecté", "address": self.address}
+        
+        result = await self._attempt_connect('connect')
+        if result["success"] and Config.BLE_AUTO_RECONNECT:
+            self._start_supervisor()
+        return result
+    
+    async def _attempt_connect(self, event: str) -> Dict[str, any]:
+        """Lance une tentative de connexion, ou attend celle déjà en cours"""
+        if self._connect_future is None:
+            self._connect_future = asyncio.ensure_future(self._connect_once(event))
+        # shield : l'annulation d'un appelant n'interrompt pas la tentative des autres
+        return await asyncio.shield(self._connect_future)
+    
+    async def _connect_once(self, event: str) -> Dict[str, any]:
+        """
+        Tentative de connexion unique
         
+        Args:
+            event: 'connect' (demandée) ou 'reconnect' (superviseur), pour le journal de connexion
+        """
+        layout = gatt_cache.get(self.address, self.uuid_notify, self.uuid_write)
         try:
-            self.client = BleakClient(self.address)
-            await self.client.connect()
-            self.is_connected = True
-            self._connecting = False
-            logger.info(f"✓ Connecté au device {self.address}")
-            await self.start_notifications()
+            try:
+                opened, failure = await self._open(layout), None
+            except Exception as e:
+                if layout is None:
+                    raise
+                opened, failure = False, e
+            if not opened and layout is not None:
+                # Disposition en cache périmée (firmware, module remplacé), qu'elle fasse échouer la connexion
+                # (filtre services=) ou les notifications (handle) : invalidée, puis découverte complète
+                detail = f" ({failure})" if failure is not None else ""
+                logger.warning(f"⚠️ Disposition GATT en cache invalide pour {self.address}{detail}, nouvelle découverte")
+                gatt_cache.invalidate(self.address)
+                self.is_connected = False
+                try:
+                    await self.client.disconnect()
+                except Exception as e:
+                    logger.debug(f"Fermeture du client après échec de la disposition en cache: {e}")
+                if not await self._open(None):
+                    # Découverte complète sans notifications actives : la connexion échoue aussi
+                    self.is_connected = False
+                    try:
+                        await self.client.disconnect()
+                    except Exception as e:
+                        logger.debug(f"Fermeture du client après échec de la découverte: {e}")
+                    raise RuntimeError("notifications inactives après découverte complète des services")
+            
+            reason = None
+            if self.down_since is not None:
+                reason = f"{time.monotonic() - self.down_since:.1f} s sans liaison"
+                self.down_since = None
+            self._log_connection(event, reason=reason)
             return {"success": True, "message": "Connexion réussie", "address": self.address}
         
         except Exception as e:
             error_msg = f"Erreur de connexion : {str(e)}"
             logger.error(f"✗ {error_msg}")
             self.is_connected = False
-            self._connecting = False
+            if event == 'connect':
+                self._log_connection('error', reason="échec de connexion", error_message=str(e))
             return {"success": False, "message": error_msg}
+        
+        finally:
+            self._connect_future = None
+    
+    async def _open(self, layout: Optional[Dict[str, any]]) -> bool:
+        """
+        Connexion du client BLE et activation des notifications
+        
+        Args:
+            layout: Disposition GATT en cache (None = découverte complète des services)
+        
+        Returns:
+            True si les notifications sont actives
+        """
+        start = time.perf_counter()
+        options = {'services': layout['services']} if layout is not None else {}
+        self.client = BleakClient(self.address, disconnected_callback=self._on_disconnected, **options)
+        await self.client.connect()
+        self.framer.reset()
+        self.is_connected = True
+        self.connected_at = time.monotonic()
+        logger.info(f"✓ Connecté au device {self.address}")
+        
+        cached = layout is not None
+        if not cached:
+            layout = self._discover_layout()
+        self._apply_layout(layout)
+        active = (await self.start_notifications())["success"]
+        BLE_CONNECT_SECONDS.labels(self.address, 'cached' if cached else 'discovered').observe(time.perf_counter() - start)
+        return active
+    
+    def _discover_layout(self) -> Optional[Dict[str, any]]:
+        """Parcourt les services une fois et met la disposition GATT en cache"""
+        layout = resolve_layout(self.client.services, self.uuid_notify, self.uuid_write)
+        if layout is None:
+            logger.warning(f"⚠️ Caractéristiques {self.uuid_notify} / {self.uuid_write} non trouvées. Services disponibles:")
+            for service in self.client.services:
+                logger.warning(f"  Service: {service.uuid}")
+                for characteristic in service.characteristics:
+                    logger.warning(f"    - {characteristic.uuid}")
+            return None
+        gatt_cache.store(self.address, layout)
+        return layout
+    
+    def _apply_layout(self, layout: Optional[Dict[str, any]]):
+        """Désigne les caractéristiques par handle (ou par UUID sans disposition) et résout le mode d'écriture"""
+        self.gatt_layout = layout
+        if layout is not None:
+            self._notify_char = layout['notify']['handle']
+            self._write_char = layout['write']['handle']
+            self.write_with_response = self._resolve_write_mode(layout['write']['properties'])
+        else:
+            self._notify_char = self.uuid_notify
+            self._write_char = self.uuid_write
+            self.write_with_response = self._resolve_write_mode(None)
     
     async def disconnect(self) -> Dict[str, any]:
         """
-        Ferme la connexion BLE
+        Ferme la connexion BLE (et arrête la reconnexion automatique)
         
         Returns:
             Dict avec status et message
         """
+        await self._stop_supervisor()
+        self.down_since = None
         if not self.client or not self.is_connected:
             return {"success": True, "message": "Déjà déconnecté"}
         
+        self._disconnecting = True
+        duration = self._connection_duration()
         try:
+            await self.commands.stop()
             await self.stop_notifications()
             await self.client.disconnect()
-            self.is_connected = False
-            self._connecting = False
             logger.info("✓ Déconnecté")
             return {"success": True, "message": "Déconnexion réussie"}
         
         except Exception as e:
             error_msg = f"Erreur lors de la déconnexion : {str(e)}"
             logger.error(f"✗ {error_msg}")
-            self.is_connected = False
             return {"success": False, "message": error_msg}
+        
+        finally:
+            self.is_connected = False
+            self.connected_at = None
+            self._disconnecting = False
+            self._log_connection('disconnect', reason="demandée", duration_seconds=duration)
+    
+    def _on_disconnected(self, client):
+        """Callback bleak : déconnexion du client (demandée ou subie)"""
+        if client is not self.client or self._disconnecting:
+            return
+        self._link_lost("perte de liaison")
+    
+    def _link_lost(self, reason: str):
+        """
+        Liaison perdue sans déconnexion demandée : commandes en attente abandonnées,
+        déconnexion journalisée et superviseur réveillé
+        
+        Args:
+            reason: Cause de la perte (journal de connexion)
+        """
+        if not self.is_connected:
+            return
+        duration = self._connection_duration()
+        self.is_connected = False
+        self.connected_at = None
+        self.down_since = time.monotonic()
+        self.disconnects += 1
+        self.commands.cancel_pending()
+        logger.warning(f"⚠️ Liaison perdue avec {self.address} ({reason}) après {duration} s")
+        self._log_connection('disconnect', reason=reason, duration_seconds=duration)
+        self._link_down.set()
+    
+    def _start_supervisor(self):
+        """Démarre le superviseur de liaison (idempotent)"""
+        if self._supervisor is None or self._supervisor.done():
+            self._supervisor = asyncio.create_task(self._supervise())
+    
+    async def _stop_supervisor(self):
+        """Arrête le superviseur de liaison"""
+        if self._supervisor is not None:
+            # wait_for (Python < 3.12) peut absorber une annulation concomitante : annuler jusqu'à l'arrêt
+            while not self._supervisor.done():
+                self._supervisor.cancel()
+                await asyncio.wait({self._supervisor}, timeout=0.1)
+            self._supervisor = None
+        self._link_down.clear()
     
-    async def send_data(self, data: bytes) -> bool:
+    async def _supervise(self):
         """
-        Envoie des données via BLE
+        Superviseur de liaison : reconnexion après chaque perte, backoff exponentiel avec gigue
+        Avec le scanner continu, un robot absent de la table n'est pas sollicité :
+        la tentative suivante part dès son prochain advertising
+        """
+        while True:
+            await self._link_down.wait()
+            self._link_down.clear()
+            attempt = 0
+            while not self.is_connected:
+                delay = reconnect_delay(attempt)
+                if device_scanner.is_running and not device_scanner.is_present(self.address):
+                    self._advertised.clear()
+                    try:
+                        await asyncio.wait_for(self._advertised.wait(), delay)
+                    except asyncio.TimeoutError:
+                        logger.debug(f"{self.address} absent du scan, reconnexion différée")
+                        continue
+                else:
+                    logger.info(f"🔄 Reconnexion à {self.address} dans {delay:.1f} s (tentative {attempt + 1})")
+                    await asyncio.sleep(delay)
+                if self.is_connected:
+                    break  # Reconnecté entre-temps par un appel explicite
+                attempt += 1
+                self.reconnect_attempts += 1
+                result = await self._attempt_connect('reconnect')
+                if result["success"]:
+                    self.reconnects += 1
+                    logger.info(f"✓ Liaison rétablie avec {self.address} après {attempt} tentative(s)")
+    
+    def _connection_duration(self) -> Optional[int]:
+        """Durée de la connexion courante en secondes"""
+        return int(time.monotonic() - self.connected_at) if self.connected_at is not None else None
+    
+    def _log_connection(self, event: str, **fields):
+        """
+        Journalise un événement de connexion (table connection_log, écrite par la file d'ingestion)
+        
+        Args:
+            event: 'connect', 'reconnect', 'disconnect' ou 'error'
+            **fields: reason, error_message, duration_seconds
+        """
+        entry = {'event': event, 'device_name': self.name, 'signal_strength': self.rssi, **fields}
+        if not ingestion_queue.submit_connection(entry, self.address):
+            logger.error(f"✗ Événement de connexion {event} non journalisé pour {self.address}")
+    
+    async def send_data(self, data: bytes, lane: Optional[str] = None) -> bool:
+        """
+        Envoie des données via BLE (file de commandes du robot)
         
         Args:
             data: Données à envoyer (bytes)
+            lane: Voie de priorité imposée ('emergency', 'control', 'display' ; défaut: d'après l'opcode)
         
         Returns:
             True si envoi réussi, False sinon
@@ -130,23 +397,90 @@ class BLEConnectionManager:
         if not self.is_connected:
             logger.error("✗ Non connecté. Connexion requise.")
             return False
+        return await self.commands.submit(data, lane=lane)
+    
+    async def _write_gatt(self, data: bytes) -> bool:
+        """
+        Écrit une commande sur la caractéristique GATT (appelé par la file de commandes uniquement)
+        
+        Args:
+            data: Commande brute
+        
+        Returns:
+            True si l'écriture a réussi
+        """
+        if not self.is_connected:
+            return False
+        
+        # Trame conservée pour /api/diagnostic/frames ; détail formaté seulement en DEBUG
+        frame_capture.record(self.address, 'tx', data)
+        logger.debug("📤 Envoi de %d bytes via BLE (%s): %s", len(data), self.uuid_write, HexDump(data))
         
         try:
-            # Logs détaillés pour diagnostic
-            hex_str = ' '.join(f'{b:02X}' for b in data)
-            logger.info(f"📤 Envoi de {len(data)} bytes via BLE ({self.uuid_write})")
-            logger.info(f"   Données (hex): {hex_str}")
-            logger.info(f"   Données (ascii): {repr(data)}")
-            
-            await self.client.write_gatt_char(self.uuid_write, data)
-            logger.info(f"✓ Données envoyées avec succès")
+            start = time.perf_counter()
+            await self.client.write_gatt_char(self._write_char, data, response=self.write_with_response)
+            self._m_write.observe(time.perf_counter() - start)
             return True
         
         except Exception as e:
-            logger.error(f"✗ Erreur lors de l'envoi : {str(e)}")
-            self.is_connected = False
+            self._m_write_failures.inc()
+            logger.error(f"✗ Erreur lors de l'envoi de {len(data)} bytes ({HexDump(data)}) : {str(e)}")
+            # Une écriture en échec ne coupe la liaison que si bleak la signale fermée
+            if not self.client.is_connected:
+                self._link_lost("échec d'écriture")
             return False
     
+    def _resolve_write_mode(self, properties: Optional[List[str]]) -> bool:
+        """
+        Choisit l'écriture avec ou sans réponse GATT (BLE_WRITE_MODE)
+        En mode 'auto', l'écriture sans réponse est utilisée si la caractéristique la propose
+        
+        Args:
+            properties: Propriétés de la caractéristique d'écriture (None si inconnues)
+        
+        Returns:
+            True si les écritures attendent la réponse du robot
+        """
+        if Config.BLE_WRITE_MODE in ('response', 'without-response'):
+            return Config.BLE_WRITE_MODE == 'response'
+        if properties is None:
+            return True
+        with_response = 'write-without-response' not in properties
+        logger.info(f"✓ Écriture {'avec' if with_response else 'sans'} réponse sur {self.uuid_write}")
+        return with_response
+    
+    async def send_message(self, message: str) -> bool:
+        """
+        Envoie un message texte à la matrice LED du robot
+        
+        Args:
+            message: Texte à afficher (max 15 caractères)
+        
+        Returns:
+            True si envoi réussi
+        """
+        # Protocole : 0x01 + message (padded à 15 bytes)
+        message_bytes = message.encode('utf-8')[:15]
+        message_buffer = bytes([0x01]) + message_bytes.ljust(15, b'\x00')
+        
+        result = await self.send_data(message_buffer)
+        if result:
+            logger.info(f"✓ Message envoyé à {self.address} : '{message}'")
+        return result
+    
+    async def send_image(self, image: bytes) -> bool:
+        """
+        Envoie une image (16 bytes) à la matrice LED du robot
+        
+        Args:
+            image: Motif de la matrice LED
+        
+        Returns:
+            True si envoi réussi
+        """
+        # Protocole : 0x02 + image
+        return await self.send_data(bytes([0x02]) + image)
+    
     # async def send_message(self, message: str) -> bool:
     #     """
     #     Envoie un message texte à la matrice LED
@@ -199,32 +533,6 @@ class BLEConnectionManager:
     #         logger.info(f"✓ Image envoyee avec succès")
     #     return result
     
-    # async def control_motor(self, command: str, speed: int = 255) -> bool:
-    #     """
-    #     Envoie une commande aux moteurs
-        
-    #     Args:
-    #         command: 'forward', 'backward', 'left', 'right', 'stop'
-    #         speed: Vitesse (0-255)
-        
-    #     Returns:
-    #         True si envoi reussi
-    #     """
-    #     valid_commands = ['forward', 'backward', 'left', 'right', 'stop']
-    #     if command not in valid_commands:
-    #         logger.error(f"✗ Commande invalide : {command}")
-    #         return False
-        
-    #     # Protocole moteur: 0x03 + command_byte + speed
-    #     command_map = {'forward': 0x01, 'backward': 0x02, 'left': 0x03, 'right': 0x04, 'stop': 0x00}
-    #     motor_data = bytes([0x03, command_map[command], speed])
-        
-    #     result = await self.send_data(motor_data)
-        
-    #     if result:
-    #         logger.info(f"✓ Moteur : {command} (speed={speed})")
-    #     return result
-    
     async def get_status(self) -> Dict[str, any]:
         """
         Récupère le statut de la connexion
@@ -234,13 +542,25 @@ class BLEConnectionManager:
         """
         return {
             "connected": self.is_connected,
+            "connecting": self._connect_future is not None,
             "address": self.address,
-            "uuid_write": self.uuid_write
+            "name": self.name,
+            "rssi": self.rssi,
+            "connected_for_s": self._connection_duration(),
+            "auto_reconnect": self._supervisor is not None and not self._supervisor.done(),
+            "disconnects": self.disconnects,
+            "reconnects": self.reconnects,
+            "reconnect_attempts": self.reconnect_attempts,
+            "uuid_write": self.uuid_write,
+            "write_with_response": self.write_with_response,
+            "gatt_layout": self.gatt_layout,
+            "framer": self.framer.get_stats(),
+            "commands": self.commands.get_stats()
         }
     
     async def scan_devices(self, timeout: float = 5.0) -> list:
         """
-        Scanne les devices BLE à proximité
+        Scanne les devices BLE à proximité (scanner partagé, voir DeviceScanner.scan)
         
         Args:
             timeout: Durée du scan en secondes
@@ -249,107 +569,110 @@ class BLEConnectionManager:
             Liste des devices trouvés
         """
         try:
-            logger.info(f"Scan BLE en cours ({timeout}s)...")
-            devices = await BleakScanner.discover(timeout=timeout)
-            
-            device_list = []
-            for device in devices:
-                device_list.append({
-                    "address": device.address,
-                    "name": device.name or "Unknown",
-                    "rssi": device.rssi
-                })
-            
-            logger.info(f"✓ {len(device_list)} device(s) trouvé(s)")
-            return device_list
-        
+            return await device_scanner.scan(timeout)
         except Exception as e:
             logger.error(f"✗ Erreur lors du scan : {str(e)}")
             return []
         
     async def _notification_handler(self, sender, data):
         """
-        Gère les notifications BLE entrantes et les diffuse via WebSocket.
+        Gère les notifications BLE entrantes.
+        Les notifications sont des fragments de 20 octets : le framer les réassemble
+        en paquets complets, chacun étant ensuite traité par _handle_packet.
+        """
+        start = time.perf_counter()
+        self._m_notifications.inc()
+        self._m_bytes.inc(len(data))
+        frame_capture.record(self.address, 'rx', data)
+        for packet in self.framer.feed(data):
+            await self._handle_packet(sender, packet)
+        self._m_handler.observe(time.perf_counter() - start)
+
+    async def _handle_packet(self, sender, packet: bytes):
+        """
+        Traite un paquet complet et le diffuse via WebSocket.
         Parse les paquets de télémétrie et événements pour stockage en BDD.
         """
-        hex_str = ' '.join(f'{b:02X}' for b in data)
-        logger.info(f"🔔 Notification BLE reçue (sender {sender}): {hex_str}")
+        # Journalisation par paquet : tous en DEBUG, un sur LOG_PACKET_SAMPLE en INFO
+        # (arguments formatés par le module logging seulement si la ligne est émise)
+        verbose = self._log_sampler.sample()
+        if verbose:
+            logger.info("🔔 Paquet BLE reçu de %s (sender %s): %s", self.address, sender, HexDump(packet))
+        
+        # Trame binaire (opcode + disposition fixe) : pas de texte à décoder
+        binary = frame_size(packet[0]) is not None if packet else False
         
         # Décoder le texte
         text = None
-        try:
-            text = data.decode('utf-8', errors='ignore').strip()
-            if text:
-                logger.info(f"   ASCII: {text}")
-        except:
-            pass
+        if not binary:
+            text = packet.decode('utf-8', errors='ignore').strip()
+            if text and verbose:
+                logger.info("   ASCII: %s", text)
         
         # Préparer les données de notification
+        # (champs "hex" et "bytes" formatés à la sérialisation, pour les seuls clients en encodage 'json')
         notification_data = {
             "type": "ble_notification",
+            "device": self.address,
             "sender": str(sender),
-            "hex": hex_str,
-            "bytes": [int(b) for b in data],
-            "timestamp": __import__('datetime').datetime.now().isoformat()
+            "timestamp": datetime.now().isoformat()
         }
         
-        if text:
+        if binary:
+            # Parser les trames de télémétrie binaires (firmware récent)
+            try:
+                telemetry = decode_telemetry(packet)
+            except ValueError as e:
+                BLE_PARSE_FAILURES.labels(self.address, 'binary').inc()
+                logger.warning("⚠️ %s: %s", e, HexDump(packet))
+            else:
+                await self._accept_telemetry(telemetry, notification_data, verbose)
+        
+        elif text:
             notification_data["text"] = text
             
-            # Parser les paquets de télémétrie (JSON)
+            # Parser les paquets de télémétrie (JSON, anciens firmwares)
             if text.startswith('{') and text.endswith('}'):
                 try:
                     telemetry = json.loads(text)
                     if 'uptime_s' in telemetry or 'mode' in telemetry:
                         # C'est un paquet de télémétrie
-                        await self._store_telemetry(telemetry)
-                        notification_data["telemetry"] = telemetry
-                        logger.info(f"📊 Télémétrie stockée: {telemetry}")
+                        await self._accept_telemetry(telemetry, notification_data, verbose)
                 except json.JSONDecodeError:
-                    pass
+                    BLE_PARSE_FAILURES.labels(self.address, 'json').inc()
+                    logger.warning(f"⚠️ Paquet JSON invalide: {text}")
             
-            # Parser les événements spéciaux
-            elif any(keyword in text.lower() for keyword in ['auto', 'manual', 'lights', 'obstacle', 'emergency', 'stop']):
-                await self._store_event(text)
-                notification_data["event"] = text
-                logger.info(f"⚡ Événement détecté: {text}")
-        
-        # Diffuser via WebSocket
-        await connection_manager.broadcast(json.dumps(notification_data))
+            # Parser les événements spéciaux (classifieur compilé, une seule passe)
+            else:
+                event = event_classifier.classify(text)
+                if event is not None:
+                    await self._store_event(event, verbose)
+                    notification_data["event"] = text
+                    if verbose:
+                        logger.info("⚡ Événement détecté: %s", text)
+        
+        # Diffuser via WebSocket (topics et encodage choisis par chaque client)
+        await connection_manager.broadcast_notification(notification_data, packet)
+
+    async def _accept_telemetry(self, telemetry: dict, notification_data: dict, verbose: bool = False):
+        """Stocke une télémétrie décodée (JSON ou binaire) et met à jour l'état en direct"""
+        await self._store_telemetry(telemetry)
+        await live_state.update_telemetry(self.address, telemetry)
+        notification_data["telemetry"] = telemetry
+        if verbose:
+            logger.info("📊 Télémétrie stockée: %s", telemetry)
 
     async def start_notifications(self):
         """
-        Active les notifications pour la caractéristique spécifiée.
+        Active les notifications pour la caractéristique spécifiée (par handle si la disposition GATT est connue).
         """
         if not self.client or not self.is_connected:
             logger.warning("Non connecté, impossible d'activer les notifications.")
             return {"success": False, "message": "Non connecté."}
 
         try:
-            logger.info(f"💡 Activation des notifications pour {self.uuid_notify}")
-            
-            # Vérifier que la caractéristique existe
-            char = None
-            try:
-                for service in self.client.services:
-                    for characteristic in service.characteristics:
-                        if characteristic.uuid.lower() == self.uuid_notify.lower():
-                            char = characteristic
-                            logger.info(f"✓ Caractéristique trouvée: {characteristic.uuid}")
-                            break
-                    if char:
-                        break
-                
-                if not char:
-                    logger.warning(f"⚠️ Caractéristique {self.uuid_notify} non trouvée. Services disponibles:")
-                    for service in self.client.services:
-                        logger.warning(f"  Service: {service.uuid}")
-                        for char in service.characteristics:
-                            logger.warning(f"    - {char.uuid}")
-            except Exception as e:
-                logger.warning(f"⚠️ Erreur lors de l'énumération des caractéristiques: {str(e)}")
-            
-            await self.client.start_notify(self.uuid_notify, self._notification_handler)
+            logger.info(f"💡 Activation des notifications pour {self.uuid_notify} ({self._notify_char})")
+            await self.client.start_notify(self._notify_char, self._notification_handler)
             logger.info("✓ Notifications activées.")
             return {"success": True, "message": "Notifications activées."}
         except Exception as e:
@@ -364,7 +687,7 @@ class BLEConnectionManager:
             return {"success": True, "message": "Déjà déconnecté ou notifications non actives."}
         try:
             logger.info(f"🔕 Désactivation des notifications pour {self.uuid_notify}")
-            await self.client.stop_notify(self.uuid_notify)
+            await self.client.stop_notify(self._notify_char)
             logger.info("✓ Notifications désactivées.")
             return {"success": True, "message": "Notifications désactivées."}
         except Exception as e:
@@ -373,137 +696,128 @@ class BLEConnectionManager:
         
 
     async def _store_telemetry(self, telemetry: dict):
-        """Stocke un paquet de télémétrie en base de données"""
-        try:
-            from app.models.database import SessionLocal
-            from app.models.telemetry import Telemetry
-            import hashlib
-            import uuid
-            from datetime import datetime
-            
-            db = SessionLocal()
-            try:
-                # Générer un ID unique et checksum
-                packet_str = json.dumps(telemetry, sort_keys=True)
-                packet_id = str(uuid.uuid4())
-                checksum = hashlib.sha256(packet_str.encode()).hexdigest()
-                
-                telem = Telemetry(
-                    packet_id=packet_id,
-                    timestamp=datetime.utcnow(),
-                    uptime_s=telemetry.get('uptime_s'),
-                    mode=telemetry.get('mode'),
-                    distance_cm=telemetry.get('distance_cm'),
-                    obstacle_events=telemetry.get('obstacle_events'),
-                    last_ir_cmd=telemetry.get('last_ir_cmd'),
-                    speed_pwm=telemetry.get('speed_pwm'),
-                    dist_traveled_cm=telemetry.get('dist_traveled_cm'),
-                    battery_level=telemetry.get('battery_level'),
-                    signal_strength=telemetry.get('signal_strength'),
-                    packet_raw=packet_str,
-                    checksum=checksum,
-                    processed=True
-                )
-                db.add(telem)
-                db.commit()
-                logger.info(f"✓ Télémétrie enregistrée (ID: {telem.id}, Checksum: {checksum[:8]}...)")
-            finally:
-                db.close()
-        except Exception as e:
-            logger.error(f"✗ Erreur stockage télémétrie: {e}")
+        """Met un paquet de télémétrie en file d'ingestion (écrit par lot en tâche de fond)"""
+        if not ingestion_queue.submit_telemetry(telemetry, device_address=self.address):
+            logger.error("✗ Télémétrie non mise en file (file d'ingestion pleine)")
     
-    async def _store_event(self, event_text: str):
-        """Stocke un événement en base de données"""
+    async def _store_event(self, event: dict, verbose: bool = False):
+        """Met un événement classifié (EventClassifier.classify) en file d'ingestion"""
         try:
-            from app.models.database import SessionLocal
-            from app.models.telemetry import Event
-            from datetime import datetime
-            import uuid
-            
-            # Déterminer le type d'événement et sa sévérité
-            event_type = "unknown"
-            description = event_text
-            value = None
-            new_value = None
-            category = "info"
-            severity = 1
-            
-            text_lower = event_text.lower()
-            
-            if 'auto' in text_lower:
-                event_type = "mode_change"
-                value = "manual"
-                new_value = "auto"
-                description = "Passage en mode automatique"
-                category = "info"
-                severity = 1
-            elif 'manual' in text_lower or 'manuel' in text_lower:
-                event_type = "mode_change"
-                value = "auto"
-                new_value = "manual"
-                description = "Passage en mode manuel"
-                category = "info"
-                severity = 1
-            elif 'lights' in text_lower or 'lumière' in text_lower:
-                event_type = "lights_toggle"
-                value = "off" if 'on' in text_lower else "on"
-                new_value = "on" if 'on' in text_lower else "off"
-                description = f"Lumières {new_value}"
-                category = "info"
-                severity = 1
-            elif 'obstacle' in text_lower:
-                event_type = "obstacle_detected"
-                description = "Obstacle détecté"
-                category = "warning"
-                severity = 2
-            elif 'emergency' in text_lower or 'urgence' in text_lower:
-                event_type = "emergency_stop"
-                description = "Arrêt d'urgence"
-                category = "critical"
-                severity = 4
-            elif 'battery' in text_lower or 'batterie' in text_lower:
-                event_type = "battery_low"
-                description = "Batterie faible"
-                category = "warning"
-                severity = 2
-            elif 'disconnect' in text_lower or 'connection' in text_lower:
-                event_type = "connection"
-                description = event_text
-                category = "warning"
-                severity = 2
-            
-            db = SessionLocal()
-            try:
-                event = Event(
-                    event_id=str(uuid.uuid4()),
-                    timestamp=datetime.utcnow(),
-                    event_type=event_type,
-                    category=category,
-                    description=description,
-                    value=value,
-                    new_value=new_value,
-                    source="bluetooth",
-                    raw_data=event_text,
-                    severity_level=severity,
-                    processed=True
+            if ingestion_queue.submit_event(event, device_address=self.address) and verbose:
+                logger.info(
+                    "✓ Événement mis en file: %s [%s] - %s",
+                    event['event_type'], event['category'], event['description']
                 )
-                db.add(event)
-                db.commit()
-                logger.info(f"✓ Événement enregistré: {event_type} [{category}] - {description}")
-            finally:
-                db.close()
         except Exception as e:
             logger.error(f"✗ Erreur stockage événement: {e}")
 
 
-# Instance globale du gestionnaire
-ble_manager = BLEConnectionManager()
+def normalize_address(address: str) -> str:
+    """Normalise une adresse MAC (majuscules, sans espaces) : clé du pool et device_address stocké"""
+    return address.strip().upper()
+
+
+class BLEConnectionPool:
+    """
+    Pool de connexions BLE indexé par adresse MAC
+    Chaque robot de la flotte dispose de son propre BLEConnectionManager
+    (session BleakClient, framer et pipeline de notifications)
+    """
+    
+    def __init__(self, default_address: str = ADDRESS, addresses: Optional[List[str]] = None):
+        """
+        Initialise le pool
+        
+        Args:
+            default_address: Adresse utilisée quand aucune adresse n'est précisée
+            addresses: Adresses à enregistrer dès le démarrage
+        """
+        self.default_address = default_address
+        self._managers: Dict[str, BLEConnectionManager] = {}
+        device_scanner.add_listener(self._on_advertisement)
+        self.get(default_address)
+        for address in addresses or []:
+            self.get(address)
+    
+    def get(self, address: Optional[str] = None, create: bool = True) -> Optional[BLEConnectionManager]:
+        """
+        Récupère le gestionnaire d'un device (le crée si nécessaire)
+        
+        Args:
+            address: Adresse MAC du device (défaut: device par défaut)
+            create: Créer le gestionnaire s'il n'existe pas encore
+        
+        Returns:
+            BLEConnectionManager du device, ou None si absent et create=False
+        """
+        address = address or self.default_address
+        key = normalize_address(address)
+        manager = self._managers.get(key)
+        if manager is None and create:
+            manager = BLEConnectionManager(address=address)
+            self._managers[key] = manager
+            logger.info(f"✓ Device {manager.address} ajouté au pool ({len(self._managers)} device(s))")
+        return manager
+    
+    async def remove(self, address: str) -> bool:
+        """
+        Déconnecte et retire un device du pool
+        
+        Args:
+            address: Adresse MAC du device
+        
+        Returns:
+            True si le device était présent
+        """
+        manager = self._managers.pop(normalize_address(address), None)
+        if manager is None:
+            return False
+        await manager.disconnect()
+        return True
+    
+    def _on_advertisement(self, entry: DeviceEntry):
+        """Advertising d'un appareil (scanner) : nom et RSSI du robot, réveil de son superviseur"""
+        manager = self._managers.get(normalize_address(entry.address))
+        if manager is not None:
+            manager.name = entry.name or manager.name
+            manager.rssi = entry.rssi
+            manager._advertised.set()
+    
+    def managers(self) -> List[BLEConnectionManager]:
+        """Liste les gestionnaires du pool"""
+        return list(self._managers.values())
+    
+    async def connect_all(self) -> Dict[str, Dict[str, any]]:
+        """Connecte tous les devices du pool en parallèle"""
+        managers = self.managers()
+        results = await asyncio.gather(*(m.connect() for m in managers))
+        return {m.address: r for m, r in zip(managers, results)}
+    
+    async def disconnect_all(self) -> Dict[str, Dict[str, any]]:
+        """Déconnecte tous les devices du pool en parallèle"""
+        managers = self.managers()
+        results = await asyncio.gather(*(m.disconnect() for m in managers))
+        return {m.address: r for m, r in zip(managers, results)}
+    
+    async def get_status(self) -> List[Dict[str, any]]:
+        """Récupère le statut de chaque device du pool"""
+        return [await m.get_status() for m in self.managers()]
+
+
+# Instance globale du pool (flotte d'AGV, ou robots virtuels du simulateur)
+ble_pool = BLEConnectionPool(
+    default_address=ADDRESS,
+    addresses=[a for a in Config.BLE_DEVICE_ADDRESSES.split(',') if a.strip()]
+    + (list(simulator.robots) if Config.BLE_BACKEND == 'simulator' else [])
+)
+
+# Gestionnaire du device par défaut (compatibilité mono-robot)
+ble_manager = ble_pool.get()
 
 
 async def send_image(image) -> bool:
     """ Envoie une image à la matrice LED """
-    image_data = bytes([0x02]) + image
-    if await ble_manager.send_data(image_data):
+    if await ble_manager.send_image(image):
         print("✓ Image envoyée !")
     return True
 
@@ -518,17 +832,7 @@ async def send_message(message: str) -> bool:
     Returns:
         True si envoi réussi
     """
-    # Tronquer à 15 caractères et encoder en UTF-8
-    message_bytes = message.encode('utf-8')[:15]
-    
-    # Protocole : 0x01 + message (padded à 15 bytes)
-    message_buffer = bytes([0x01]) + message_bytes.ljust(15, b'\x00')
-    
-    result = await ble_manager.send_data(message_buffer)
-    
-    if result:
-        logger.info(f"✓ Message envoyé : '{message}'")
-    return result
+    return await ble_manager.send_message(message)
 
 async def read_notif(sender: int, data: bytearray):
     """ Callback pour les notifications reçues """
@@ -0,0 +1,267 @@
+"""
+Scanner BLE continu et table des appareils à proximité
+
+Un seul scan occupe l'adaptateur à la fois :
+- scanner continu (BLE_SCANNER_ENABLED) : les advertisings alimentent une table
+  (adresse, nom, dernier RSSI, dernière réception, données d'advertising) dont
+  les entrées expirent après BLE_SCAN_EXPIRY_S ; /api/ble/scan y répond sans attendre
+- scan ponctuel (ancien comportement) : les appels concurrents partagent le même
+  BleakScanner.discover, dont les résultats alimentent aussi la table
+
+Les auditeurs (pool BLE) sont prévenus de chaque advertising : nom et RSSI des
+robots, reconnexion dès qu'un robot déconnecté émet de nouveau.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+
+# Backend BLE : robots physiques (bleak) ou robots virtuels (simulateur)
+if Config.BLE_BACKEND == 'simulator':
+    from app.services.ble_simulator import SimulatedBleakScanner as BleakScanner
+else:
+    from bleak import BleakScanner
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceEntry:
+    """Appareil vu par le scanner (dernier advertising reçu)"""
+
+    __slots__ = ('address', 'name', 'rssi', 'first_seen', 'last_seen', 'seen_count',
+                 'manufacturer_data', 'service_uuids', 'service_data', 'tx_power')
+
+    def __init__(self, address: str):
+        self.address = address
+        self.name: Optional[str] = None
+        self.rssi: Optional[int] = None
+        self.first_seen = time.time()
+        self.last_seen = self.first_seen
+        self.seen_count = 0
+        self.manufacturer_data: Dict[int, bytes] = {}
+        self.service_uuids: List[str] = []
+        self.service_data: Dict[str, bytes] = {}
+        self.tx_power: Optional[int] = None
+
+    def update(self, device, advertisement=None):
+        """
+        Met à jour l'entrée à partir d'un résultat de scan
+
+        Args:
+            device: BLEDevice (address, name)
+            advertisement: AdvertisementData (None pour un résultat de discover sans return_adv)
+        """
+        self.last_seen = time.time()
+        self.seen_count += 1
+        if advertisement is not None:
+            self.name = advertisement.local_name or device.name or self.name
+            self.rssi = advertisement.rssi
+            self.manufacturer_data = dict(advertisement.manufacturer_data)
+            self.service_uuids = list(advertisement.service_uuids)
+            self.service_data = dict(advertisement.service_data)
+            self.tx_power = advertisement.tx_power
+        else:
+            self.name = device.name or self.name
+            self.rssi = getattr(device, 'rssi', self.rssi)
+
+    def to_dict(self) -> Dict[str, any]:
+        """Convertit l'entrée en dictionnaire (données d'advertising en hexadécimal)"""
+        return {
+            'address': self.address,
+            'name': self.name or "Unknown",
+            'rssi': self.rssi,
+            'first_seen': datetime.fromtimestamp(self.first_seen).isoformat(),
+            'last_seen': datetime.fromtimestamp(self.last_seen).isoformat(),
+            'age_s': round(time.time() - self.last_seen, 1),
+            'seen_count': self.seen_count,
+            'manufacturer_data': {str(company): data.hex() for company, data in self.manufacturer_data.items()},
+            'service_uuids': self.service_uuids,
+            'service_data': {uuid: data.hex() for uuid, data in self.service_data.items()},
+            'tx_power': self.tx_power
+        }
+
+
+class DeviceScanner:
+    """
+    Scanner BLE partagé : scan continu en tâche de fond ou scans ponctuels regroupés
+    """
+
+    def __init__(self, expiry_s: float = Config.BLE_SCAN_EXPIRY_S):
+        """
+        Args:
+            expiry_s: Délai sans advertising au-delà duquel un appareil sort de la table
+        """
+        self.expiry_s = max(1.0, expiry_s)
+        self._devices: Dict[str, DeviceEntry] = {}
+        self._scanner = None
+        self._scan_future: Optional[asyncio.Future] = None
+        self._listeners: List[Callable[[DeviceEntry], None]] = []
+
+        # Statistiques
+        self.advertisements = 0
+        self.scans = 0
+        self.shared_scans = 0
+        self.started_at: Optional[float] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._scanner is not None
+
+    def add_listener(self, listener: Callable[[DeviceEntry], None]):
+        """
+        Enregistre un auditeur appelé à chaque appareil vu
+
+        Args:
+            listener: Fonction appelée avec l'entrée mise à jour
+        """
+        self._listeners.append(listener)
+
+    async def start(self) -> bool:
+        """
+        Démarre le scan continu (idempotent)
+
+        Returns:
+            True si le scanner tourne
+        """
+        if self.is_running:
+            return True
+        try:
+            scanner = BleakScanner(detection_callback=self._on_advertisement)
+            await scanner.start()
+        except Exception as e:
+            logger.error(f"✗ Démarrage du scanner BLE impossible: {e}")
+            return False
+        self._scanner = scanner
+        self.started_at = time.time()
+        logger.info(f"✓ Scanner BLE continu démarré (expiration {self.expiry_s:.0f} s)")
+        return True
+
+    async def stop(self):
+        """Arrête le scan continu (la table est conservée jusqu'à expiration)"""
+        if not self.is_running:
+            return
+        scanner, self._scanner = self._scanner, None
+        self.started_at = None
+        try:
+            await scanner.stop()
+        except Exception as e:
+            logger.warning(f"⚠️ Arrêt du scanner BLE: {e}")
+        logger.info("✓ Scanner BLE continu arrêté")
+
+    def _on_advertisement(self, device, advertisement):
+        """Callback bleak : advertising reçu"""
+        self.advertisements += 1
+        self._record(device, advertisement)
+
+    def _record(self, device, advertisement=None) -> DeviceEntry:
+        """Met à jour la table et prévient les auditeurs"""
+        key = device.address.upper()
+        entry = self._devices.get(key)
+        if entry is None:
+            entry = DeviceEntry(device.address)
+            self._devices[key] = entry
+        entry.update(device, advertisement)
+        for listener in self._listeners:
+            try:
+                listener(entry)
+            except Exception as e:
+                logger.error(f"✗ Auditeur du scanner BLE: {e}")
+        return entry
+
+    def _expire(self):
+        """Retire les appareils sans advertising depuis expiry_s"""
+        cutoff = time.time() - self.expiry_s
+        for key in [key for key, entry in self._devices.items() if entry.last_seen < cutoff]:
+            del self._devices[key]
+
+    def get(self, address: str) -> Optional[DeviceEntry]:
+        """
+        Entrée d'un appareil encore présent dans la table
+
+        Args:
+            address: Adresse MAC
+        """
+        entry = self._devices.get(address.strip().upper())
+        if entry is None or entry.last_seen < time.time() - self.expiry_s:
+            return None
+        return entry
+
+    def is_present(self, address: str) -> bool:
+        """True si l'appareil a émis un advertising depuis moins de expiry_s"""
+        return self.get(address) is not None
+
+    def devices(self, since: Optional[float] = None) -> List[Dict[str, any]]:
+        """
+        Appareils de la table, du signal le plus fort au plus faible
+
+        Args:
+            since: Ne garder que les appareils vus depuis cet instant (epoch)
+
+        Returns:
+            Liste d'appareils (dict)
+        """
+        self._expire()
+        entries = [e for e in self._devices.values() if since is None or e.last_seen >= since]
+        entries.sort(key=lambda e: e.rssi if e.rssi is not None else -999, reverse=True)
+        return [e.to_dict() for e in entries]
+
+    async def scan(self, timeout: float = 5.0) -> List[Dict[str, any]]:
+        """
+        Scan ponctuel de timeout secondes (ancien comportement de /api/ble/scan)
+        Scanner continu actif : attend timeout secondes et lit la table, sans second scan ;
+        sinon les appels concurrents partagent le même discover
+
+        Args:
+            timeout: Durée du scan en secondes
+
+        Returns:
+            Appareils vus pendant le scan
+        """
+        if self.is_running:
+            started = time.time()
+            await asyncio.sleep(timeout)
+            return self.devices(since=started)
+
+        if self._scan_future is None:
+            self._scan_future = asyncio.ensure_future(self._discover(timeout))
+        else:
+            self.shared_scans += 1
+        return await asyncio.shield(self._scan_future)
+
+    async def _discover(self, timeout: float) -> List[Dict[str, any]]:
+        """Scan ponctuel unique, résultats versés dans la table"""
+        try:
+            logger.info(f"Scan BLE en cours ({timeout}s)...")
+            found = await BleakScanner.discover(timeout=timeout, return_adv=True)
+            self.scans += 1
+            entries = [self._record(device, adv) for device, adv in found.values()]
+            entries.sort(key=lambda e: e.rssi if e.rssi is not None else -999, reverse=True)
+            logger.info(f"✓ {len(entries)} device(s) trouvé(s)")
+            return [e.to_dict() for e in entries]
+        finally:
+            self._scan_future = None
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Récupère l'état du scanner
+
+        Returns:
+            Dict avec mode, taille de la table et compteurs
+        """
+        self._expire()
+        return {
+            'running': self.is_running,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat() if self.started_at else None,
+            'expiry_s': self.expiry_s,
+            'devices': len(self._devices),
+            'advertisements': self.advertisements,
+            'scans': self.scans,
+            'shared_scans': self.shared_scans
+        }
+
+
+# Instance globale du scanner
+device_scanner = DeviceScanner()
@@ -0,0 +1,505 @@
+"""
+Simulateur de robots BLE (BLE_BACKEND=simulator)
+Remplace BleakClient / BleakScanner pour exercer ingestion, stockage et
+WebSocket sans le robot physique, à la cadence réelle ou bien au-delà.
+
+Chaque robot virtuel émet de la télémétrie (trame binaire ou JSON) et des
+événements texte comme le firmware, découpés en notifications de MTU octets,
+avec gigue, pertes de notifications et déconnexions configurables.
+Les commandes écrites par l'application sont enregistrées par robot.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import random
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+from app.services.telemetry_protocol import encode_telemetry
+
+logger = logging.getLogger(__name__)
+
+# GATT du module DX-BT24 (service FFE0, caractéristiques FFE1 notify/write et FFE2 write)
+SERVICE_UUID = "0000ffe0-0000-1000-8000-00805f9b34fb"
+CHARACTERISTIC_UUIDS = (
+    "0000ffe1-0000-1000-8000-00805f9b34fb",
+    "0000ffe2-0000-1000-8000-00805f9b34fb"
+)
+UART_PROPERTIES = ['read', 'write', 'write-without-response', 'notify']
+
+# Table GATT complète du module : (service, [(caractéristique, handle, propriétés)])
+GATT_TABLE = (
+    ("00001800-0000-1000-8000-00805f9b34fb", [
+        ("00002a00-0000-1000-8000-00805f9b34fb", 3, ['read']),
+        ("00002a01-0000-1000-8000-00805f9b34fb", 5, ['read'])
+    ]),
+    ("00001801-0000-1000-8000-00805f9b34fb", [
+        ("00002a05-0000-1000-8000-00805f9b34fb", 8, ['indicate'])
+    ]),
+    ("0000180a-0000-1000-8000-00805f9b34fb", [
+        ("00002a29-0000-1000-8000-00805f9b34fb", 12, ['read'])
+    ]),
+    (SERVICE_UUID, [
+        (CHARACTERISTIC_UUIDS[0], 16, UART_PROPERTIES),
+        (CHARACTERISTIC_UUIDS[1], 20, UART_PROPERTIES)
+    ])
+)
+
+# Durée de découverte d'un service à la connexion (secondes)
+SERVICE_DISCOVERY_S = 0.05
+
+# Intervalle d'advertising d'un robot non connecté (secondes)
+ADVERTISING_INTERVAL_S = 1.0
+
+# Événements envoyés par le firmware (Robot.cpp)
+EVENTS = (
+    'event:manual_mode', 'event:auto_mode', 'event:obstacle_detected',
+    'event:headlights_on', 'event:headlights_off', 'event:lights_on',
+    'event:lights_off', 'event:emergency_stop'
+)
+
+
+class SimulatedCharacteristic:
+    """Caractéristique GATT (surface utilisée : uuid, handle, properties)"""
+
+    def __init__(self, uuid: str, handle: int, properties: List[str]):
+        self.uuid = uuid
+        self.handle = handle
+        self.properties = list(properties)
+
+
+class SimulatedService:
+    """Service GATT (surface utilisée : uuid, characteristics)"""
+
+    def __init__(self, uuid: str, characteristics: List[SimulatedCharacteristic]):
+        self.uuid = uuid
+        self.characteristics = characteristics
+
+
+class SimulatedDevice:
+    """Résultat de scan (surface utilisée : address, name, rssi)"""
+
+    def __init__(self, address: str, name: str, rssi: int):
+        self.address = address
+        self.name = name
+        self.rssi = rssi
+
+
+class SimulatedAdvertisementData:
+    """Données d'advertising (surface de bleak.backends.scanner.AdvertisementData)"""
+
+    def __init__(self, local_name: str, rssi: int):
+        self.local_name = local_name
+        self.manufacturer_data: Dict[int, bytes] = {}
+        self.service_data: Dict[str, bytes] = {}
+        self.service_uuids = [SERVICE_UUID]
+        self.tx_power: Optional[int] = None
+        self.rssi = rssi
+        self.platform_data = ()
+
+
+class SimulatedRobot:
+    """
+    Robot virtuel : état du firmware (MetricsManager) et commandes reçues
+    """
+
+    def __init__(self, address: str, seed: Optional[int] = None):
+        """
+        Args:
+            address: Adresse MAC du robot virtuel
+            seed: Graine du générateur (reproductibilité des scénarios)
+        """
+        self.address = address.upper()
+        self.name = f"SIM-{self.address[-5:].replace(':', '')}"
+        self.rng = random.Random(seed)
+        self.booted_at = time.monotonic() - self.rng.uniform(0, 3600)
+        self.mode = 'MANUAL'
+        self.distance_cm = 100.0
+        self.light_level = 500
+        self.speed_pwm = 0
+        self.dist_traveled_cm = 0.0
+        self.last_ir_cmd = 0
+        self.commands: deque = deque(maxlen=Config.BLE_SIMULATOR_MAX_COMMANDS)
+        # Un robot connecté n'émet plus d'advertising (module HM-10)
+        self.connected = False
+
+        # Statistiques
+        self.telemetry_sent = 0
+        self.events_sent = 0
+        self.notifications_sent = 0
+        self.notifications_dropped = 0
+        self.disconnects = 0
+
+    @property
+    def rssi(self) -> int:
+        """Puissance du signal simulée"""
+        return self.rng.randint(-85, -45)
+
+    def advertisement(self):
+        """Résultat de scan et données d'advertising courantes"""
+        rssi = self.rssi
+        return SimulatedDevice(self.address, self.name, rssi), SimulatedAdvertisementData(self.name, rssi)
+
+    def step(self, elapsed_s: float) -> dict:
+        """
+        Fait évoluer l'état et renvoie la télémétrie courante
+
+        Args:
+            elapsed_s: Temps écoulé depuis le paquet précédent
+
+        Returns:
+            Télémétrie au format du firmware
+        """
+        rng = self.rng
+        self.distance_cm = min(max(self.distance_cm + rng.uniform(-15, 15), 2.0), 400.0)
+        self.light_level = min(max(self.light_level + rng.randint(-40, 40), 0), 1023)
+        if self.mode == 'OBSTACLE' and self.distance_cm > 30:
+            self.mode = 'AUTO'
+        self.speed_pwm = {
+            'AUTO': rng.randint(120, 180),
+            'MANUAL': rng.choice((0, 0, 100, 150, 200))
+        }.get(self.mode, 0)
+        self.dist_traveled_cm += self.speed_pwm / 255 * 15.0 * elapsed_s
+        return {
+            'uptime_s': int(time.monotonic() - self.booted_at),
+            'mode': self.mode,
+            'distance_cm': round(self.distance_cm, 2),
+            'last_ir_cmd': f"0x{self.last_ir_cmd:x}",
+            'light_level': self.light_level,
+            'speed_pwm': self.speed_pwm,
+            'dist_traveled_cm': round(self.dist_traveled_cm, 2)
+        }
+
+    def next_event(self) -> str:
+        """Choisit un événement et applique son effet sur l'état"""
+        event = self.rng.choice(EVENTS)
+        if event == 'event:auto_mode':
+            self.mode = 'AUTO'
+        elif event == 'event:manual_mode':
+            self.mode = 'MANUAL'
+        elif event == 'event:obstacle_detected':
+            self.mode = 'OBSTACLE'
+            self.distance_cm = self.rng.uniform(5, 15)
+        elif event == 'event:emergency_stop':
+            self.mode = 'MANUAL'
+            self.speed_pwm = 0
+        return event
+
+    def record_command(self, uuid: str, data: bytes, response: bool):
+        """Enregistre une commande écrite par l'application"""
+        self.commands.append({
+            'timestamp': time.time(),
+            'uuid': uuid,
+            'data': bytes(data).hex(),
+            'response': response
+        })
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Récupère les statistiques du robot virtuel
+
+        Returns:
+            Dict avec paquets émis, notifications perdues et commandes reçues
+        """
+        return {
+            'address': self.address,
+            'mode': self.mode,
+            'telemetry_sent': self.telemetry_sent,
+            'events_sent': self.events_sent,
+            'notifications_sent': self.notifications_sent,
+            'notifications_dropped': self.notifications_dropped,
+            'connected': self.connected,
+            'disconnects': self.disconnects,
+            'commands': len(self.commands)
+        }
+
+
+class SimulatorHub:
+    """
+    Registre des robots virtuels (adresses configurées + robots créés à la demande)
+    """
+
+    def __init__(self):
+        self.robots: Dict[str, SimulatedRobot] = {}
+        self._seed = Config.BLE_SIMULATOR_SEED
+
+    def robot(self, address: str) -> SimulatedRobot:
+        """
+        Robot virtuel d'une adresse (créé au premier accès)
+
+        Args:
+            address: Adresse MAC
+        """
+        key = address.strip().upper()
+        robot = self.robots.get(key)
+        if robot is None:
+            seed = None if self._seed is None else self._seed + len(self.robots)
+            robot = SimulatedRobot(key, seed)
+            self.robots[key] = robot
+        return robot
+
+    def populate(self, addresses: List[str], count: int):
+        """
+        Crée les robots configurés et complète jusqu'à count robots virtuels
+
+        Args:
+            addresses: Adresses de la configuration (BLE_DEVICE_ADDRESS, BLE_DEVICE_ADDRESSES)
+            count: Nombre minimal de robots virtuels
+        """
+        for address in addresses:
+            self.robot(address)
+        index = 0
+        while len(self.robots) < count:
+            self.robot(f"5A:00:00:00:{index >> 8:02X}:{index & 0xFF:02X}")
+            index += 1
+
+    def commands(self, address: str) -> List[dict]:
+        """Commandes reçues par un robot virtuel (plus ancienne en premier)"""
+        robot = self.robots.get(address.strip().upper())
+        return list(robot.commands) if robot else []
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Récupère la configuration et les statistiques de tous les robots virtuels
+        """
+        return {
+            'telemetry_hz': Config.BLE_SIMULATOR_TELEMETRY_HZ,
+            'event_hz': Config.BLE_SIMULATOR_EVENT_HZ,
+            'format': Config.BLE_SIMULATOR_FORMAT,
+            'mtu': Config.BLE_SIMULATOR_MTU,
+            'jitter_ms': Config.BLE_SIMULATOR_JITTER_MS,
+            'drop_rate': Config.BLE_SIMULATOR_DROP_RATE,
+            'disconnect_rate': Config.BLE_SIMULATOR_DISCONNECT_RATE,
+            'robots': [robot.get_stats() for robot in self.robots.values()]
+        }
+
+
+class SimulatedBleakClient:
+    """
+    Remplaçant de bleak.BleakClient pour un robot virtuel
+    Surface : connect, disconnect, is_connected, services, start_notify,
+    stop_notify, write_gatt_char
+    """
+
+    def __init__(
+        self,
+        address_or_ble_device,
+        disconnected_callback: Optional[Callable] = None,
+        services: Optional[List[str]] = None,
+        **kwargs
+    ):
+        """
+        Args:
+            address_or_ble_device: Adresse MAC ou device issu du scan
+            disconnected_callback: Appelé avec le client lors d'une déconnexion subie
+            services: UUID des services à découvrir (défaut: tous)
+        """
+        self.address = getattr(address_or_ble_device, 'address', address_or_ble_device)
+        self.robot = simulator.robot(self.address)
+        self._disconnected_callback = disconnected_callback
+        self._requested_services = {uuid.lower() for uuid in services} if services else None
+        self._connected = False
+        self._callbacks: Dict[str, Callable] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.services: List[SimulatedService] = []
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self, **kwargs) -> bool:
+        """Connexion simulée : établissement puis découverte des services (demandés)"""
+        await asyncio.sleep(self.robot.rng.uniform(0.01, 0.05))
+        self.services = [
+            SimulatedService(service, [SimulatedCharacteristic(*char) for char in characteristics])
+            for service, characteristics in GATT_TABLE
+            if self._requested_services is None or service in self._requested_services
+        ]
+        await asyncio.sleep(SERVICE_DISCOVERY_S * len(self.services))
+        self._connected = True
+        self.robot.connected = True
+        logger.info(f"🤖 Robot simulé connecté: {self.robot.address}")
+        return True
+
+    async def disconnect(self) -> bool:
+        """Déconnexion demandée par l'application"""
+        self._stop()
+        self._connected = False
+        self.robot.connected = False
+        return True
+
+    async def start_notify(self, char_specifier, callback: Callable, **kwargs):
+        """Démarre l'émission de notifications vers callback(sender, data)"""
+        self._require_connected()
+        self._callbacks[self._uuid(char_specifier)] = callback
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop_notify(self, char_specifier):
+        """Arrête l'émission de notifications"""
+        self._callbacks.pop(self._uuid(char_specifier), None)
+        if not self._callbacks:
+            self._stop()
+
+    async def write_gatt_char(self, char_specifier, data, response: bool = False):
+        """Enregistre la commande écrite sur le robot virtuel"""
+        self._require_connected()
+        if response:
+            await asyncio.sleep(self.robot.rng.uniform(0.005, 0.02))
+        self.robot.record_command(self._uuid(char_specifier), data, response)
+
+    def _uuid(self, char_specifier) -> str:
+        """UUID d'une caractéristique désignée par objet, UUID ou handle"""
+        if isinstance(char_specifier, int):
+            for service in self.services:
+                for characteristic in service.characteristics:
+                    if characteristic.handle == char_specifier:
+                        return characteristic.uuid
+            raise ValueError(f"Caractéristique de handle {char_specifier} introuvable")
+        return str(getattr(char_specifier, 'uuid', char_specifier)).lower()
+
+    def _require_connected(self):
+        if not self._connected:
+            raise ConnectionError(f"Robot simulé {self.robot.address} non connecté")
+
+    def _stop(self):
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self):
+        """Boucle d'émission : télémétrie et événements aux cadences configurées"""
+        robot = self.robot
+        rng = robot.rng
+        telemetry_period = 1.0 / Config.BLE_SIMULATOR_TELEMETRY_HZ if Config.BLE_SIMULATOR_TELEMETRY_HZ > 0 else None
+        event_hz = Config.BLE_SIMULATOR_EVENT_HZ
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        next_telemetry = now + rng.uniform(0, telemetry_period) if telemetry_period else None
+        next_event = now + rng.expovariate(event_hz) if event_hz > 0 else None
+        last_step = last_check = now
+
+        try:
+            while self._connected:
+                deadlines = [t for t in (next_telemetry, next_event) if t is not None]
+                due = min(deadlines) if deadlines else now + 1.0
+                await asyncio.sleep(max(0.0, due - loop.time()))
+                now = loop.time()
+
+                if self._should_disconnect(now - last_check):
+                    return
+                last_check = now
+
+                if next_telemetry is not None and now >= next_telemetry:
+                    telemetry = robot.step(now - last_step)
+                    last_step = now
+                    if Config.BLE_SIMULATOR_FORMAT == 'json':
+                        packet = (json.dumps(telemetry, separators=(',', ':')) + '\r\n').encode()
+                    else:
+                        packet = encode_telemetry(telemetry)
+                    await self._emit(packet)
+                    robot.telemetry_sent += 1
+                    next_telemetry += telemetry_period
+                    if next_telemetry < now:
+                        next_telemetry = now + telemetry_period  # Retard : ne pas rattraper en rafale
+
+                if next_event is not None and now >= next_event:
+                    await self._emit((robot.next_event() + '\r\n').encode())
+                    robot.events_sent += 1
+                    next_event = now + rng.expovariate(event_hz)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"✗ Robot simulé {robot.address}: {e}")
+
+    def _should_disconnect(self, elapsed_s: float) -> bool:
+        """Tire une déconnexion subie (BLE_SIMULATOR_DISCONNECT_RATE par minute)"""
+        rate = Config.BLE_SIMULATOR_DISCONNECT_RATE
+        if rate <= 0 or self.robot.rng.random() >= rate * elapsed_s / 60:
+            return False
+        self._connected = False
+        self.robot.connected = False
+        self._callbacks.clear()
+        self.robot.disconnects += 1
+        logger.warning(f"🤖 Robot simulé {self.robot.address}: perte de connexion simulée")
+        if self._disconnected_callback is not None:
+            self._disconnected_callback(self)
+        return True
+
+    async def _emit(self, packet: bytes):
+        """Découpe un paquet en notifications MTU et les livre (gigue, pertes)"""
+        robot = self.robot
+        rng = robot.rng
+        mtu = Config.BLE_SIMULATOR_MTU
+        jitter = Config.BLE_SIMULATOR_JITTER_MS / 1000
+        for start in range(0, len(packet), mtu):
+            if jitter:
+                await asyncio.sleep(rng.uniform(0, jitter))
+            if not self._connected:
+                return
+            if rng.random() < Config.BLE_SIMULATOR_DROP_RATE:
+                robot.notifications_dropped += 1
+                continue
+            data = bytearray(packet[start:start + mtu])
+            for uuid, callback in list(self._callbacks.items()):
+                result = callback(uuid, data)
+                if inspect.isawaitable(result):
+                    await result
+            robot.notifications_sent += 1
+
+
+class SimulatedBleakScanner:
+    """
+    Remplaçant de bleak.BleakScanner
+    Surface : discover (scan ponctuel), detection_callback + start/stop (scan continu)
+    """
+
+    def __init__(self, detection_callback: Optional[Callable] = None, **kwargs):
+        """
+        Args:
+            detection_callback: Appelé avec (device, advertisement_data) à chaque advertising reçu
+        """
+        self._detection_callback = detection_callback
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    async def discover(timeout: float = 5.0, return_adv: bool = False, **kwargs):
+        """Renvoie les robots virtuels non connectés (scan raccourci)"""
+        await asyncio.sleep(min(timeout, 0.2))
+        found = [robot.advertisement() for robot in simulator.robots.values() if not robot.connected]
+        if return_adv:
+            return {device.address: (device, adv) for device, adv in found}
+        return [device for device, _ in found]
+
+    async def start(self):
+        """Démarre la réception des advertisings"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Arrête la réception des advertisings"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        """Un advertising par robot non connecté et par ADVERTISING_INTERVAL_S"""
+        try:
+            while True:
+                for robot in list(simulator.robots.values()):
+                    if not robot.connected and self._detection_callback is not None:
+                        self._detection_callback(*robot.advertisement())
+                await asyncio.sleep(ADVERTISING_INTERVAL_S)
+        except asyncio.CancelledError:
+            pass
+
+
+# Registre global des robots virtuels
+simulator = SimulatorHub()
+simulator.populate(
+    [Config.BLE_DEVICE_ADDRESS] + [a for a in Config.BLE_DEVICE_ADDRESSES.split(',') if a.strip()],
+    Config.BLE_SIMULATOR_ROBOTS
+)
@@ -0,0 +1,316 @@
+"""
+Ordonnanceur des commandes BLE d'un robot
+
+Les endpoints HTTP n'écrivent plus directement sur la caractéristique GATT :
+chaque commande passe par la file du robot, servie par une seule tâche d'envoi.
+- Voies de priorité : 'emergency' (arrêt moteur) > 'control' (moteurs) > 'display'
+  (texte et images de la matrice LED) ; une commande en attente d'une voie
+  supérieure passe toujours devant
+- Fusion : une commande remplacée avant son envoi (nouvelle image, nouvelle
+  vitesse) n'est pas envoyée, seule la plus récente l'est ; un arrêt annule
+  les commandes moteur encore en attente
+- Cadence : une écriture par intervalle de connexion et par fragment de
+  20 octets (BLE_COMMAND_INTERVAL_MS), pour ne pas saturer la liaison
+  ni la liaison série du module HM-10 ; l'arrêt d'urgence n'attend pas
+
+Protocole (octet d'opcode) :
+    0x01 + texte (15 octets)            matrice LED, texte
+    0x02 + motif (16 octets)            matrice LED, image
+    0x03 + commande + vitesse           moteurs (commande 0x00 = arrêt)
+
+L'opcode 0x03 est réservé : le firmware ne lit pas encore les commandes
+moteur, aucun endpoint ne les envoie tant que le robot ne les exécute pas
+(un arrêt signalé comme envoyé alors que le robot continue de rouler).
+"""
+import asyncio
+import logging
+import math
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from app.metrics import BLE_COMMAND_WAIT_SECONDS
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Voies, de la plus prioritaire à la moins prioritaire
+LANES = ('emergency', 'control', 'display')
+
+# Opcodes des commandes
+OPCODE_TEXT = 0x01
+OPCODE_IMAGE = 0x02
+OPCODE_MOTOR = 0x03
+
+# Commandes moteur (octet suivant l'opcode 0x03)
+MOTOR_COMMANDS = {'stop': 0x00, 'forward': 0x01, 'backward': 0x02, 'left': 0x03, 'right': 0x04}
+
+# Charge utile d'une notification/écriture BLE (HM-10)
+CHUNK_SIZE = 20
+
+
+def classify_command(data: bytes) -> Tuple[str, Optional[str]]:
+    """
+    Voie et clé de fusion d'une commande d'après son opcode
+
+    Args:
+        data: Commande brute
+
+    Returns:
+        (voie, clé de fusion ou None si la commande ne remplace aucune autre)
+    """
+    opcode = data[0] if data else None
+    if opcode == OPCODE_MOTOR:
+        if len(data) > 1 and data[1] == MOTOR_COMMANDS['stop']:
+            return 'emergency', 'motor'
+        return 'control', 'motor'
+    if opcode == OPCODE_TEXT:
+        return 'display', 'text'
+    if opcode == OPCODE_IMAGE:
+        return 'display', 'image'
+    # Trame brute (diagnostic) : envoyée telle quelle, dans l'ordre
+    return 'display', None
+
+
+class Command:
+    """Commande en attente et appelants à notifier de son envoi"""
+
+    __slots__ = ('data', 'lane', 'key', 'futures', 'enqueued_at')
+
+    def __init__(self, data: bytes, lane: str, key: Optional[str], future: asyncio.Future, enqueued_at: float):
+        self.data = data
+        self.lane = lane
+        self.key = key
+        self.futures = [future]
+        self.enqueued_at = enqueued_at
+
+
+class CommandScheduler:
+    """
+    File de commandes d'un robot : voies de priorité, fusion, cadence
+    Une seule tâche d'envoi par robot : les écritures ne s'entrelacent jamais
+    """
+
+    def __init__(
+        self,
+        address: str,
+        write: Callable[[bytes], Awaitable[bool]],
+        interval_ms: float = Config.BLE_COMMAND_INTERVAL_MS,
+        max_pending: int = Config.BLE_COMMAND_MAX_PENDING
+    ):
+        """
+        Args:
+            address: Adresse MAC du robot
+            write: Écriture GATT effective (retourne True si l'écriture a réussi)
+            interval_ms: Délai minimal entre deux écritures, par fragment de 20 octets
+            max_pending: Commandes en attente maximum par voie (au-delà, rejet)
+        """
+        self.address = address
+        self._write = write
+        self.interval = max(0.0, interval_ms) / 1000.0
+        self.max_pending = max(1, max_pending)
+
+        self._lanes: Dict[str, Deque[Command]] = {lane: deque() for lane in LANES}
+        # (voie, clé) -> commande en attente, pour la fusion
+        self._keyed: Dict[Tuple[str, str], Command] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._next_write_at = 0.0
+
+        # Métriques
+        self._m_wait = {lane: BLE_COMMAND_WAIT_SECONDS.labels(address, lane) for lane in LANES}
+
+        # Statistiques
+        self.submitted = 0
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.cancelled = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def submit(self, data: bytes, lane: Optional[str] = None, key: Optional[str] = None) -> bool:
+        """
+        Met une commande en file et attend son envoi
+
+        Args:
+            data: Commande brute
+            lane: Voie imposée (défaut: d'après l'opcode)
+            key: Clé de fusion imposée (défaut: d'après l'opcode)
+
+        Returns:
+            True si la commande (ou celle qui l'a remplacée) a été écrite
+        """
+        default_lane, default_key = classify_command(data)
+        lane = lane or default_lane
+        key = key if key is not None else default_key
+        if lane not in self._lanes:
+            raise ValueError(f"Voie inconnue: {lane} ({', '.join(LANES)})")
+
+        loop = asyncio.get_running_loop()
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+
+        future = loop.create_future()
+        if not self._enqueue(Command(bytes(data), lane, key, future, loop.time())):
+            self.rejected += 1
+            logger.warning(f"⚠️ File de commandes {lane} pleine pour {self.address}, commande rejetée")
+            return False
+        self.submitted += 1
+        self._wakeup.set()
+        return await future
+
+    def _enqueue(self, command: Command) -> bool:
+        """Ajoute la commande, ou la fusionne avec celle qu'elle remplace"""
+        if command.key is not None:
+            # Même clé dans la même voie : seule la plus récente est envoyée, à la place de l'ancienne
+            pending = self._keyed.get((command.lane, command.key))
+            if pending is not None:
+                pending.data = command.data
+                pending.futures += command.futures
+                self.coalesced += 1
+                return True
+
+        queue = self._lanes[command.lane]
+        if len(queue) >= self.max_pending:
+            return False
+
+        if command.key is not None:
+            # Même clé dans une voie moins prioritaire : remplacée (ex: arrêt -> mouvements en attente)
+            for lane in LANES[LANES.index(command.lane) + 1:]:
+                superseded = self._keyed.pop((lane, command.key), None)
+                if superseded is not None:
+                    self._lanes[lane].remove(superseded)
+                    command.futures += superseded.futures
+                    self.coalesced += 1
+
+        queue.append(command)
+        if command.key is not None:
+            self._keyed[(command.lane, command.key)] = command
+        return True
+
+    def _peek(self) -> Optional[Command]:
+        """Prochaine commande à envoyer (voie la plus prioritaire)"""
+        for lane in LANES:
+            if self._lanes[lane]:
+                return self._lanes[lane][0]
+        return None
+
+    async def _run(self):
+        """Tâche d'envoi : une écriture à la fois, dans l'ordre des priorités"""
+        loop = asyncio.get_running_loop()
+        while True:
+            command = self._peek()
+            if command is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Cadence de la liaison ; l'attente est interrompue par toute nouvelle commande
+            delay = self._next_write_at - loop.time()
+            if delay > 0 and command.lane != 'emergency':
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._lanes[command.lane].popleft()
+            if command.key is not None:
+                self._keyed.pop((command.lane, command.key), None)
+            self._m_wait[command.lane].observe(loop.time() - command.enqueued_at)
+
+            try:
+                success = await self._write(command.data)
+            except asyncio.CancelledError:
+                # Arrêt pendant l'écriture (déconnexion) : les appelants ne restent pas en attente
+                for future in command.futures:
+                    if not future.done():
+                        future.set_result(False)
+                raise
+            except Exception as e:
+                logger.error(f"✗ Erreur d'écriture de commande vers {self.address}: {e}")
+                success = False
+            self._next_write_at = loop.time() + self.interval * max(1, math.ceil(len(command.data) / CHUNK_SIZE))
+
+            if success:
+                self.sent += 1
+            else:
+                self.failed += 1
+            for future in command.futures:
+                if not future.done():
+                    future.set_result(success)
+
+    def cancel_pending(self) -> int:
+        """
+        Abandonne les commandes en attente (déconnexion) ; leurs appelants reçoivent False
+
+        Returns:
+            Nombre de commandes abandonnées
+        """
+        count = 0
+        for queue in self._lanes.values():
+            while queue:
+                command = queue.popleft()
+                count += 1
+                for future in command.futures:
+                    if not future.done():
+                        future.set_result(False)
+        self._keyed.clear()
+        self.cancelled += count
+        return count
+
+    async def stop(self):
+        """Arrête la tâche d'envoi et abandonne les commandes en attente"""
+        cancelled = self.cancel_pending()
+        if self._task is not None:
+            # wait_for (Python < 3.12) peut absorber une annulation concomitante au réveil : annuler jusqu'à l'arrêt
+            while not self._task.done():
+                self._task.cancel()
+                await asyncio.wait({self._task}, timeout=0.1)
+            self._task = None
+        if cancelled:
+            logger.warning(f"⚠️ {cancelled} commande(s) abandonnée(s) pour {self.address}")
+
+    def pending(self) -> Dict[str, int]:
+        """Commandes en attente par voie"""
+        return {lane: len(queue) for lane, queue in self._lanes.items()}
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Récupère l'état de la file de commandes
+
+        Returns:
+            Dict avec commandes en attente par voie et compteurs
+        """
+        return {
+            'running': self.is_running,
+            'pending': self.pending(),
+            'interval_ms': round(self.interval * 1000, 3),
+            'max_pending': self.max_pending,
+            'submitted': self.submitted,
+            'sent': self.sent,
+            'failed': self.failed,
+            'coalesced': self.coalesced,
+            'rejected': self.rejected,
+            'cancelled': self.cancelled
+        }
+
+
+def motor_command(command: str, speed: int = 255) -> bytes:
+    """
+    Construit une commande moteur (opcode réservé, non interprété par le firmware actuel)
+
+    Args:
+        command: 'forward', 'backward', 'left', 'right' ou 'stop'
+        speed: Vitesse PWM (0-255)
+
+    Returns:
+        Trame 0x03 + commande + vitesse
+    """
+    if command not in MOTOR_COMMANDS:
+        raise ValueError(f"Commande moteur invalide: {command} ({', '.join(MOTOR_COMMANDS)})")
+    return bytes([OPCODE_MOTOR, MOTOR_COMMANDS[command], max(0, min(255, int(speed)))])
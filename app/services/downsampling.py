@@ -0,0 +1,138 @@
+"""
+Sous-échantillonnage des séries temporelles de télémétrie pour les graphiques
+Calculs vectorisés avec numpy sur des tableaux de colonnes (temps, valeur)
+"""
+from typing import Tuple
+
+import numpy as np
+
+# Méthodes disponibles
+METHODS = ('lttb', 'minmax', 'avg', 'min', 'max')
+
+
+def _drop_missing(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Retire les points sans valeur (NULL -> NaN)"""
+    mask = ~np.isnan(y)
+    if mask.all():
+        return x, y
+    return x[mask], y[mask]
+
+
+def _time_buckets(x: np.ndarray, n_buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Découpe une série triée en buckets de durée égale
+
+    Returns:
+        (bucket_id de chaque point, indices de début des buckets non vides)
+    """
+    edges = np.linspace(x[0], x[-1], n_buckets + 1)
+    bucket_id = np.clip(np.searchsorted(edges, x, side='right') - 1, 0, n_buckets - 1)
+    starts = np.flatnonzero(np.diff(bucket_id, prepend=-1))
+    return bucket_id, starts
+
+
+def bucket_aggregate(x: np.ndarray, y: np.ndarray, n_buckets: int, method: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Agrège une série par buckets de temps (min, max ou moyenne)
+
+    Args:
+        x: Temps (triés, secondes)
+        y: Valeurs
+        n_buckets: Nombre de buckets
+        method: 'min', 'max' ou 'avg'
+
+    Returns:
+        (temps, valeurs) : un point par bucket non vide, au temps moyen du bucket
+    """
+    _, starts = _time_buckets(x, n_buckets)
+    counts = np.diff(np.append(starts, len(x)))
+    x_out = np.add.reduceat(x, starts) / counts
+    if method == 'min':
+        y_out = np.minimum.reduceat(y, starts)
+    elif method == 'max':
+        y_out = np.maximum.reduceat(y, starts)
+    else:
+        y_out = np.add.reduceat(y, starts) / counts
+    return x_out, y_out
+
+
+def bucket_minmax(x: np.ndarray, y: np.ndarray, n_buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Conserve le minimum et le maximum de chaque bucket, à leurs temps réels
+    (préserve les pics, 2 points par bucket)
+    """
+    bucket_id, starts = _time_buckets(x, n_buckets)
+    ends = np.append(starts[1:], len(x)) - 1
+    # Tri par bucket puis par valeur : premier = min, dernier = max de chaque bucket
+    order = np.lexsort((y, bucket_id))
+    picks = np.unique(np.concatenate([order[starts], order[ends]]))
+    return x[picks], y[picks]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets : conserve la forme visuelle de la courbe
+
+    Args:
+        x: Temps (triés)
+        y: Valeurs
+        n_out: Nombre de points en sortie (>= 3)
+
+    Returns:
+        (temps, valeurs) sélectionnés parmi les points d'origine
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    # Bornes des n_out - 2 buckets intermédiaires (premier et dernier points conservés)
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Point moyen du bucket suivant
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        if next_end <= next_start:
+            next_end = next_start + 1
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Aire des triangles (a, candidat, moyenne suivante), vectorisée sur le bucket
+        bx = x[start:end]
+        by = y[start:end]
+        areas = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas)) if len(areas) else start
+        selected[i + 1] = a
+
+    return x[selected], y[selected]
+
+
+def downsample(x: np.ndarray, y: np.ndarray, max_points: int, method: str = 'lttb') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Réduit une série à au plus max_points points
+
+    Args:
+        x: Temps (triés, secondes)
+        y: Valeurs (NaN pour les valeurs manquantes)
+        max_points: Nombre maximum de points retournés
+        method: Une des METHODS
+
+    Returns:
+        (temps, valeurs)
+    """
+    if method not in METHODS:
+        raise ValueError(f"Méthode inconnue: {method}")
+
+    x, y = _drop_missing(x, y)
+    if len(x) <= max_points or len(x) < 3:
+        return x, y
+
+    if method == 'lttb':
+        return lttb(x, y, max_points)
+    if method == 'minmax':
+        return bucket_minmax(x, y, max(1, max_points // 2))
+    return bucket_aggregate(x, y, max_points, method)
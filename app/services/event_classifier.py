@@ -0,0 +1,209 @@
+"""
+Classification des notifications texte du robot en événements
+Table de règles déclarative compilée une seule fois en un index de mots :
+le texte est découpé en mots par une seule expression régulière, puis chaque
+mot (et chaque groupe de mots consécutifs) est cherché dans une table de
+hachage. Le coût dépend de la longueur du texte, pas du nombre de règles.
+
+Chaque règle associe des mots-clés à un type d'événement, une catégorie, une
+sévérité et une transition de valeur (value -> new_value). Les mots-clés sont
+reconnus comme des mots entiers ('_', ':', espaces et tirets séparent les mots) :
+"connection" ne contient plus "on", "autonomy" ne déclenche plus "auto".
+Plusieurs règles correspondent : la priorité la plus haute gagne, puis la plus à gauche.
+
+La table par défaut peut être remplacée par un fichier JSON (EVENT_RULES_FILE) :
+    [{"name": "lights_on", "keywords": ["lights on", "headlights on"],
+      "event_type": "lights_toggle", "value": "off", "new_value": "on",
+      "description": "Lumières on", "priority": 10}, ...]
+"""
+import json
+import logging
+import re
+from typing import Dict, Iterable, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Mots des notifications du firmware ("event:headlights_on" -> event, headlights, on)
+_WORD = re.compile(r'[^\W_]+')
+
+RULE_DEFAULTS = {
+    'category': 'info',
+    'severity': 1,
+    'value': None,
+    'new_value': None,
+    'description': '{text}',
+    'priority': 0,
+    'prefix': False
+}
+
+# Règles par défaut (messages du firmware et variantes françaises)
+DEFAULT_RULES: List[dict] = [
+    {'name': 'emergency_stop', 'keywords': ['emergency', 'urgence'], 'event_type': 'emergency_stop',
+     'category': 'critical', 'severity': 4, 'description': "Arrêt d'urgence", 'priority': 100},
+    {'name': 'obstacle', 'keywords': ['obstacle'], 'event_type': 'obstacle_detected',
+     'category': 'warning', 'severity': 2, 'description': 'Obstacle détecté', 'priority': 50},
+    {'name': 'battery_low', 'keywords': ['batter'], 'prefix': True, 'event_type': 'battery_low',
+     'category': 'warning', 'severity': 2, 'description': 'Batterie faible', 'priority': 50},
+    {'name': 'connection', 'keywords': ['disconnect', 'disconnected', 'connection'], 'event_type': 'connection',
+     'category': 'warning', 'severity': 2, 'priority': 40},
+    {'name': 'lights_on', 'keywords': ['lights on', 'headlights on', 'lumière on', 'lumières on'],
+     'event_type': 'lights_toggle', 'value': 'off', 'new_value': 'on', 'description': 'Lumières on', 'priority': 20},
+    {'name': 'lights_off', 'keywords': ['lights off', 'headlights off', 'lumière off', 'lumières off'],
+     'event_type': 'lights_toggle', 'value': 'on', 'new_value': 'off', 'description': 'Lumières off', 'priority': 20},
+    {'name': 'lights', 'keywords': ['lights', 'headlights', 'lumière', 'lumières'],
+     'event_type': 'lights_toggle', 'description': 'Lumières', 'priority': 10},
+    {'name': 'mode_auto', 'keywords': ['auto', 'automatic', 'automatique'], 'event_type': 'mode_change',
+     'value': 'manual', 'new_value': 'auto', 'description': 'Passage en mode automatique', 'priority': 10},
+    {'name': 'mode_manual', 'keywords': ['manual', 'manuel'], 'event_type': 'mode_change',
+     'value': 'auto', 'new_value': 'manual', 'description': 'Passage en mode manuel', 'priority': 10},
+    {'name': 'stop', 'keywords': ['stop'], 'event_type': 'stop', 'description': 'Arrêt', 'priority': 0},
+]
+
+
+class EventClassifier:
+    """
+    Classifieur compilé : index des mots-clés (n-grammes de mots et préfixes) vers les règles
+    """
+
+    def __init__(self, rules: Iterable[dict] = DEFAULT_RULES):
+        """
+        Compile la table de règles
+
+        Args:
+            rules: Règles (name, keywords, event_type et champs optionnels de RULE_DEFAULTS)
+
+        Raises:
+            ValueError: Règle incomplète ou nom en double
+        """
+        self.rules: List[dict] = []
+        for rule in rules:
+            rule = {**RULE_DEFAULTS, **rule}
+            if not rule.get('name') or not rule.get('keywords') or not rule.get('event_type'):
+                raise ValueError(f"Règle d'événement incomplète (name, keywords, event_type): {rule}")
+            self.rules.append(rule)
+
+        names = [rule['name'] for rule in self.rules]
+        if len(names) != len(set(names)):
+            raise ValueError("Noms de règles d'événement en double")
+
+        # Mots-clés ("mot1 mot2") -> règle ; un mot-clé partagé revient à la règle la plus prioritaire
+        self._words: Dict[str, dict] = {}
+        self._prefixes: Dict[str, dict] = {}
+        # Premiers mots des mots-clés de plusieurs mots
+        self._heads: Dict[str, int] = {}
+        for rule in self.rules:
+            for keyword in rule['keywords']:
+                words = tuple(_WORD.findall(keyword.lower()))
+                if not words:
+                    raise ValueError(f"Mot-clé vide dans la règle {rule['name']}")
+                if rule['prefix']:
+                    if len(words) > 1:
+                        raise ValueError(f"Mot-clé préfixe d'un seul mot attendu ({rule['name']})")
+                    index, key = self._prefixes, words[0]
+                else:
+                    index, key = self._words, ' '.join(words)
+                    if len(words) > 1:
+                        self._heads[words[0]] = max(self._heads.get(words[0], 0), len(words))
+                if key not in index or rule['priority'] > index[key]['priority']:
+                    index[key] = rule
+
+        self._prefix_lengths = sorted({len(key) for key in self._prefixes})
+
+    def match(self, text: str) -> Optional[dict]:
+        """
+        Règle correspondant au texte (priorité la plus haute, puis la plus à gauche)
+
+        Args:
+            text: Notification texte
+
+        Returns:
+            Règle, ou None si aucune ne correspond
+        """
+        words = _WORD.findall(text.lower())
+        get = self._words.get
+        best = None
+        for i, word in enumerate(words):
+            rule = get(word)
+            if rule is not None and (best is None or rule['priority'] > best['priority']):
+                best = rule
+            # Mots-clés de plusieurs mots commençant par ce mot
+            span = self._heads.get(word)
+            if span:
+                key = word
+                for following in words[i + 1:i + span]:
+                    key = f"{key} {following}"
+                    rule = get(key)
+                    if rule is not None and (best is None or rule['priority'] > best['priority']):
+                        best = rule
+            for length in self._prefix_lengths:
+                if length > len(word):
+                    break
+                rule = self._prefixes.get(word[:length])
+                if rule is not None and (best is None or rule['priority'] > best['priority']):
+                    best = rule
+        return best
+
+    def classify(self, text: str) -> Optional[dict]:
+        """
+        Classifie une notification texte
+
+        Args:
+            text: Notification texte
+
+        Returns:
+            Champs de l'événement (event_type, category, description, value, ...)
+            ou None si le texte n'est pas un événement
+        """
+        rule = self.match(text)
+        if rule is None:
+            return None
+        return {
+            'event_type': rule['event_type'],
+            'category': rule['category'],
+            'description': rule['description'].replace('{text}', text),
+            'value': rule['value'],
+            'new_value': rule['new_value'],
+            'source': 'bluetooth',
+            'raw_data': text,
+            'severity_level': rule['severity']
+        }
+
+
+def load_rules(path: str) -> List[dict]:
+    """
+    Charge une table de règles depuis un fichier JSON
+
+    Args:
+        path: Chemin du fichier (liste de règles)
+
+    Returns:
+        Liste de règles
+    """
+    with open(path, encoding='utf-8') as f:
+        rules = json.load(f)
+    if not isinstance(rules, list):
+        raise ValueError(f"{path}: liste de règles attendue")
+    return rules
+
+
+def create_classifier(path: Optional[str] = Config.EVENT_RULES_FILE) -> EventClassifier:
+    """
+    Construit le classifieur depuis EVENT_RULES_FILE, ou la table par défaut
+
+    Args:
+        path: Fichier JSON de règles (None = DEFAULT_RULES)
+    """
+    if path:
+        try:
+            classifier = EventClassifier(load_rules(path))
+            logger.info(f"✓ {len(classifier.rules)} règle(s) d'événement chargée(s) depuis {path}")
+            return classifier
+        except (OSError, ValueError) as e:
+            logger.error(f"✗ Règles d'événement invalides ({path}): {e}, utilisation des règles par défaut")
+    return EventClassifier(DEFAULT_RULES)
+
+
+# Instance globale du classifieur
+event_classifier = create_classifier()
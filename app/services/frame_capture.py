@@ -0,0 +1,163 @@
+"""
+Capture des trames BLE brutes et journalisation échantillonnée des paquets
+
+Le chemin critique (notification BLE, écriture GATT) ne fait qu'ajouter un
+tuple (instant, robot, sens, octets) à un tampon circulaire borné ; le vidage
+hexadécimal n'est calculé qu'à la lecture (/api/diagnostic/frames) ou si la
+ligne de journal est réellement émise.
+
+Journalisation par paquet :
+- niveau DEBUG : tous les paquets
+- niveau INFO : un paquet sur LOG_PACKET_SAMPLE (0 = aucun)
+"""
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from config import Config
+
+# Sens des trames capturées
+DIRECTIONS = ('rx', 'tx')
+
+
+class HexDump:
+    """
+    Vidage hexadécimal paresseux, pour les arguments de journalisation :
+    logger.debug("Paquet: %s", HexDump(packet)) ne formate rien si la ligne n'est pas émise
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __str__(self) -> str:
+        return self.data.hex(' ').upper()
+
+
+class LogSampler:
+    """
+    Décide si le paquet courant doit être journalisé
+    Tous les paquets en DEBUG, un sur `every` en INFO
+    """
+
+    def __init__(self, logger: logging.Logger, every: int = Config.LOG_PACKET_SAMPLE):
+        """
+        Args:
+            logger: Journal du composant
+            every: Période d'échantillonnage en INFO (0 = aucun paquet, 1 = tous)
+        """
+        self.logger = logger
+        self.every = max(0, every)
+        # Le premier paquet est journalisé
+        self._countdown = 1
+        self.skipped = 0
+
+    def sample(self) -> bool:
+        """
+        Returns:
+            True si le paquet courant doit être journalisé
+        """
+        if self.logger.isEnabledFor(logging.DEBUG):
+            return True
+        if not self.every or not self.logger.isEnabledFor(logging.INFO):
+            return False
+        self._countdown -= 1
+        if self._countdown > 0:
+            self.skipped += 1
+            return False
+        self._countdown = self.every
+        return True
+
+
+class FrameCapture:
+    """
+    Tampon circulaire des dernières trames BLE reçues et envoyées
+    """
+
+    def __init__(self, size: int = Config.FRAME_CAPTURE_SIZE):
+        """
+        Args:
+            size: Nombre de trames conservées (0 = capture désactivée)
+        """
+        self.size = max(0, size)
+        # (instant epoch, adresse du robot, 'rx'/'tx', octets)
+        self._frames: Deque[Tuple[float, str, str, bytes]] = deque(maxlen=self.size or 1)
+        self.captured = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def record(self, device: str, direction: str, data: bytes):
+        """
+        Ajoute une trame au tampon (sans formatage)
+
+        Args:
+            device: Adresse MAC du robot
+            direction: 'rx' (notification reçue) ou 'tx' (écriture)
+            data: Octets de la trame
+        """
+        if self.size:
+            self._frames.append((time.time(), device, direction, bytes(data)))
+            self.captured += 1
+
+    def snapshot(
+        self,
+        limit: Optional[int] = None,
+        device: Optional[str] = None,
+        direction: Optional[str] = None
+    ) -> List[Dict[str, any]]:
+        """
+        Dernières trames capturées, de la plus ancienne à la plus récente
+
+        Args:
+            limit: Nombre maximum de trames retournées (les plus récentes)
+            device: Filtre sur l'adresse MAC du robot
+            direction: Filtre sur le sens ('rx' ou 'tx')
+
+        Returns:
+            Liste de trames (horodatage, robot, sens, taille, hex, ascii)
+        """
+        if not self.size:
+            return []
+        device = device.upper() if device else None
+        frames = [
+            frame for frame in list(self._frames)
+            if (device is None or frame[1].upper() == device) and (direction is None or frame[2] == direction)
+        ]
+        if limit is not None:
+            frames = frames[-limit:] if limit > 0 else []
+        return [
+            {
+                'timestamp': datetime.fromtimestamp(at).isoformat(),
+                'device': address,
+                'direction': sens,
+                'size': len(data),
+                'hex': data.hex(' ').upper(),
+                'ascii': ''.join(chr(b) if 32 <= b < 127 else '.' for b in data)
+            }
+            for at, address, sens, data in frames
+        ]
+
+    def clear(self):
+        """Vide le tampon"""
+        self._frames.clear()
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Returns:
+            Dict avec taille du tampon, trames conservées et capturées depuis le démarrage
+        """
+        return {
+            'enabled': self.enabled,
+            'size': self.size,
+            'buffered': len(self._frames) if self.size else 0,
+            'captured': self.captured
+        }
+
+
+# Instance globale de la capture
+frame_capture = FrameCapture()
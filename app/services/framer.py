@@ -0,0 +1,153 @@
+"""
+Reconstitution des paquets à partir du flux de notifications BLE
+Le module DX-BT24 découpe chaque paquet en notifications de 20 octets :
+le framer réassemble les fragments et sépare les paquets concaténés
+"""
+from typing import Dict, List
+
+from app.services.telemetry_protocol import FRAME_SIZES, frame_size, is_valid_frame
+
+# Délimiteurs et octets de bourrage ignorés entre deux paquets
+_SEPARATORS = b'\r\n\x00 '
+_JSON_START = 0x7B  # '{'
+# Octets de début de paquet : '{' et opcodes des trames binaires
+_FRAME_STARTS = bytes([_JSON_START, *FRAME_SIZES])
+
+
+class PacketFramer:
+    """
+    Framer incrémental (une instance par connexion)
+
+    Frontières de paquets :
+    - un paquet JSON commence par '{' et se termine au premier '}' (objet plat)
+    - un paquet texte (événement) se termine par un retour à la ligne (Serial.println)
+    - une trame binaire commence par un opcode et a une taille fixe (telemetry_protocol)
+    """
+
+    def __init__(self, max_frame_size: int = 512):
+        """
+        Initialise le framer
+
+        Args:
+            max_frame_size: Taille maximale d'un paquet ; au-delà le tampon est resynchronisé
+        """
+        self.max_frame_size = max_frame_size
+        self._buffer = bytearray()
+
+        # Statistiques
+        self.bytes_in = 0
+        self.frames = 0
+        self.resyncs = 0
+        self.discarded_bytes = 0
+
+    def reset(self):
+        """Vide le tampon (nouvelle connexion) sans réinitialiser les compteurs"""
+        del self._buffer[:]
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """
+        Ajoute une notification au tampon et extrait les paquets complets
+
+        Args:
+            data: Contenu brut de la notification
+
+        Returns:
+            Liste des paquets complets (sans délimiteur)
+        """
+        self.bytes_in += len(data)
+        buf = self._buffer
+        buf += data
+
+        frames = []
+        pos = 0
+        size = len(buf)
+
+        while pos < size:
+            if buf[pos] in _SEPARATORS:
+                pos += 1
+                continue
+
+            binary_size = frame_size(buf[pos])
+            if binary_size is not None:
+                if size - pos < binary_size:
+                    break  # Trame binaire incomplète : attendre la suite
+                if not is_valid_frame(buf, pos):
+                    # Opcode sans trame valide derrière : avancer d'un octet
+                    self._discard(1)
+                    pos += 1
+                    continue
+                frames.append(bytes(buf[pos:pos + binary_size]))
+                pos += binary_size
+                continue
+
+            newline = buf.find(b'\n', pos)
+
+            if buf[pos] == _JSON_START:
+                end = buf.find(b'}', pos)
+                if end < 0 or (0 <= newline < end):
+                    if newline < 0:
+                        break  # Paquet JSON incomplet : attendre la suite
+                    # Fin de ligne avant l'accolade fermante : paquet tronqué
+                    self._discard(newline - pos)
+                    pos = newline + 1
+                    continue
+                frames.append(bytes(buf[pos:end + 1]))
+                pos = end + 1
+                continue
+
+            start = self._find_start(buf, pos, newline if newline >= 0 else size)
+            if start >= 0:
+                # Octets orphelins avant un début de paquet (fin d'un paquet perdu)
+                self._discard(start - pos)
+                pos = start
+                continue
+
+            if newline < 0:
+                break  # Ligne texte incomplète : attendre la suite
+
+            line = bytes(buf[pos:newline]).rstrip(b'\r')
+            if b'}' in line:
+                # Fin d'un paquet JSON dont le début a été perdu
+                self._discard(newline - pos)
+            elif line:
+                frames.append(line)
+            pos = newline + 1
+
+        if pos:
+            del buf[:pos]
+
+        if len(buf) > self.max_frame_size:
+            # Aucun délimiteur dans une fenêtre raisonnable : repartir du prochain début de paquet
+            restart = self._find_start(buf, 1, len(buf))
+            drop = restart if restart > 0 else len(buf)
+            self._discard(drop)
+            del buf[:drop]
+
+        self.frames += len(frames)
+        return frames
+
+    @staticmethod
+    def _find_start(buf: bytearray, start: int, end: int) -> int:
+        """Position du premier début de paquet ('{' ou opcode binaire) dans buf[start:end], -1 sinon"""
+        positions = [p for p in (buf.find(byte, start, end) for byte in _FRAME_STARTS) if p >= 0]
+        return min(positions) if positions else -1
+
+    def _discard(self, count: int):
+        """Comptabilise une resynchronisation"""
+        self.resyncs += 1
+        self.discarded_bytes += count
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Récupère les statistiques du framer
+
+        Returns:
+            Dict avec octets reçus, paquets extraits, resynchronisations et octets rejetés
+        """
+        return {
+            'bytes_in': self.bytes_in,
+            'frames': self.frames,
+            'resyncs': self.resyncs,
+            'discarded_bytes': self.discarded_bytes,
+            'buffered_bytes': len(self._buffer)
+        }
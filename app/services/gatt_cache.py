@@ -0,0 +1,196 @@
+"""
+Cache disque de la disposition GATT des robots
+
+À la première connexion, les services sont énumérés une fois pour trouver les
+caractéristiques de notification et d'écriture ; leur service, handle et
+propriétés sont conservés par adresse MAC dans GATT_CACHE_FILE (JSON).
+Aux connexions suivantes :
+- la découverte est limitée au service du module (BleakClient(services=...))
+- notifications et écritures désignent directement la caractéristique par handle
+- le mode d'écriture (avec ou sans réponse) vient des propriétés en cache
+
+Une disposition qui ne fonctionne plus (firmware ou module remplacé) est
+invalidée et la connexion refaite avec une découverte complète.
+"""
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Version du format d'une disposition (une disposition d'un autre format est ignorée)
+LAYOUT_VERSION = 1
+
+
+def _characteristic(service, characteristic) -> Dict[str, any]:
+    return {
+        'service': str(service.uuid).lower(),
+        'uuid': str(characteristic.uuid).lower(),
+        'handle': characteristic.handle,
+        'properties': list(characteristic.properties)
+    }
+
+
+def resolve_layout(services, uuid_notify: str, uuid_write: str) -> Optional[Dict[str, any]]:
+    """
+    Trouve les caractéristiques de notification et d'écriture en un seul parcours des services
+
+    Args:
+        services: Services GATT du client (client.services)
+        uuid_notify: UUID de la caractéristique de notification
+        uuid_write: UUID de la caractéristique d'écriture
+
+    Returns:
+        Disposition (services, notify, write) ou None si une caractéristique manque
+    """
+    uuid_notify, uuid_write = uuid_notify.lower(), uuid_write.lower()
+    notify = write = None
+    for service in services:
+        for characteristic in service.characteristics:
+            uuid = str(characteristic.uuid).lower()
+            if notify is None and uuid == uuid_notify:
+                notify = _characteristic(service, characteristic)
+            if write is None and uuid == uuid_write:
+                write = _characteristic(service, characteristic)
+    if notify is None or write is None:
+        return None
+    return {
+        'version': LAYOUT_VERSION,
+        'services': sorted({notify['service'], write['service']}),
+        'notify': notify,
+        'write': write,
+        'resolved_at': datetime.utcnow().isoformat()
+    }
+
+
+class GattLayoutCache:
+    """
+    Dispositions GATT par robot, persistées dans un fichier JSON
+    """
+
+    def __init__(self, path: str = Config.GATT_CACHE_FILE, enabled: bool = Config.GATT_CACHE_ENABLED):
+        """
+        Args:
+            path: Fichier JSON du cache
+            enabled: Cache actif (sinon chaque connexion énumère les services)
+        """
+        self.path = path
+        self.enabled = enabled
+        self._layouts: Optional[Dict[str, dict]] = None
+
+        # Statistiques
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _load(self) -> Dict[str, dict]:
+        """Charge le fichier au premier accès (fichier absent ou illisible = cache vide)"""
+        if self._layouts is None:
+            self._layouts = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._layouts = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"⚠️ Cache GATT illisible ({self.path}), ignoré: {e}")
+        return self._layouts
+
+    def _save(self):
+        """Écrit le fichier (remplacement atomique)"""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._layouts, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Écriture du cache GATT impossible ({self.path}): {e}")
+
+    def get(self, address: str, uuid_notify: str, uuid_write: str) -> Optional[Dict[str, any]]:
+        """
+        Disposition en cache d'un robot
+
+        Args:
+            address: Adresse MAC
+            uuid_notify: UUID de notification attendu
+            uuid_write: UUID d'écriture attendu
+
+        Returns:
+            Disposition, ou None (cache inactif, absente, ou pour d'autres caractéristiques)
+        """
+        if not self.enabled:
+            return None
+        layout = self._load().get(address.strip().upper())
+        if (
+            layout is None
+            or layout.get('version') != LAYOUT_VERSION
+            or layout['notify']['uuid'] != uuid_notify.lower()
+            or layout['write']['uuid'] != uuid_write.lower()
+        ):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return layout
+
+    def store(self, address: str, layout: Dict[str, any]):
+        """
+        Enregistre la disposition d'un robot
+
+        Args:
+            address: Adresse MAC
+            layout: Disposition issue de resolve_layout
+        """
+        if not self.enabled:
+            return
+        key = address.strip().upper()
+        layouts = self._load()
+        if layouts.get(key, {}).get('notify') == layout['notify'] and layouts[key].get('write') == layout['write']:
+            return
+        layouts[key] = layout
+        self._save()
+        logger.info(
+            f"✓ Disposition GATT de {key} en cache "
+            f"(notify handle {layout['notify']['handle']}, write handle {layout['write']['handle']})"
+        )
+
+    def invalidate(self, address: Optional[str] = None) -> int:
+        """
+        Supprime la disposition d'un robot, ou de tous les robots
+
+        Args:
+            address: Adresse MAC (None = toutes)
+
+        Returns:
+            Nombre de dispositions supprimées
+        """
+        layouts = self._load()
+        if address is None:
+            count = len(layouts)
+            layouts.clear()
+        else:
+            count = 1 if layouts.pop(address.strip().upper(), None) is not None else 0
+        if count:
+            self.invalidations += count
+            self._save()
+        return count
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Returns:
+            Dict avec fichier, robots en cache et compteurs
+        """
+        return {
+            'enabled': self.enabled,
+            'path': self.path,
+            'devices': len(self._load()) if self.enabled else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations
+        }
+
+
+# Instance globale du cache
+gatt_cache = GattLayoutCache()
@@ -0,0 +1,527 @@
+"""
+File d'ingestion à écriture différée (write-behind) pour la télémétrie BLE
+Les paquets décodés sont mis en file en mémoire puis écrits par lots
+dans une seule transaction par un writer en tâche de fond
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.metrics import INGESTION_BATCH_ROWS, INGESTION_COMMIT_SECONDS
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Signal d'arrêt du writer (mis en file derrière les enregistrements en attente)
+_STOP = object()
+
+# Délai avant le premier nouvel essai d'un lot en échec (doublé à chaque essai)
+RETRY_BASE_DELAY_S = 0.1
+
+# Espace de noms des packet_id : identifiant déterministe dérivé de (robot, uptime_s, checksum)
+PACKET_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'urn:robot-agv:telemetry')
+
+
+class DedupeWindow:
+    """
+    Fenêtre glissante (LRU) des dernières clés de télémétrie écrites
+    Utilisée par le seul thread d'écriture : pas de verrou
+    """
+
+    def __init__(self, size: int):
+        """
+        Args:
+            size: Nombre de clés conservées (0 = fenêtre désactivée)
+        """
+        self.size = max(0, size)
+        self._keys: OrderedDict = OrderedDict()
+
+    def __contains__(self, key) -> bool:
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key):
+        """Ajoute une clé, en évinçant les plus anciennes au-delà de size"""
+        if not self.size:
+            return
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.size:
+            self._keys.popitem(last=False)
+
+
+class IngestionQueue:
+    """
+    File d'ingestion asynchrone avec writer en tâche de fond
+    Vide la file en une transaction tous les N enregistrements ou toutes les T millisecondes
+    """
+
+    def __init__(
+        self,
+        batch_size: int = Config.INGEST_BATCH_SIZE,
+        flush_interval_ms: int = Config.INGEST_FLUSH_INTERVAL_MS,
+        max_queue: int = Config.INGEST_MAX_QUEUE,
+        dedupe_window: int = Config.INGEST_DEDUPE_WINDOW,
+        retry_attempts: int = Config.INGEST_RETRY_ATTEMPTS
+    ):
+        """
+        Initialise la file d'ingestion
+
+        Args:
+            batch_size: Nombre maximum d'enregistrements par transaction
+            flush_interval_ms: Délai maximum avant écriture d'un lot entamé
+            max_queue: Taille maximale de la file (au-delà, les paquets sont rejetés)
+            dedupe_window: Clés (robot, uptime_s, checksum) récentes gardées en mémoire pour écarter les doublons
+            retry_attempts: Nouveaux essais d'un lot en échec avant de le compter perdu
+        """
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(1, flush_interval_ms) / 1000.0
+        self.max_queue = max_queue
+        self.retry_attempts = max(0, retry_attempts)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # Un seul thread d'écriture : les transactions restent sérialisées
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingestion-writer")
+        # Arrêt demandé : plus aucune soumission acceptée (pas de writer orphelin créé après stop())
+        self._stopping = False
+        # Paquets déjà écrits (retransmissions, rejeux après reconnexion, notifications en double)
+        self._dedupe = DedupeWindow(dedupe_window)
+
+        # Statistiques
+        self.enqueued = 0
+        self.dropped = 0
+        self.rejected_stopped = 0  # Soumis après stop()
+        self.rows_written = 0
+        self.failed_rows = 0
+        self.retries = 0
+        self.duplicates = 0  # Écartés par la fenêtre en mémoire (ou dans le même lot)
+        self.duplicates_db = 0  # Écartés car déjà en base (hors fenêtre)
+        self.batches = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+        self.last_flush_at: Optional[datetime] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._writer_task is not None and not self._writer_task.done()
+
+    async def start(self):
+        """Démarre le writer en tâche de fond (idempotent)"""
+        if self.is_running:
+            return
+        if self._stopping:
+            # Redémarrage après stop() : le thread d'écriture précédent a été libéré
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingestion-writer")
+            self._stopping = False
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._writer_task = asyncio.create_task(self._run())
+        logger.info(f"✓ Writer d'ingestion démarré (lot={self.batch_size}, intervalle={int(self.flush_interval * 1000)} ms)")
+
+    async def stop(self):
+        """Arrête le writer après avoir écrit les enregistrements encore en file"""
+        self._stopping = True
+        if self.is_running:
+            # Pas d'annulation : le writer écrit son lot entamé à la lecture du signal, puis s'arrête
+            await self._queue.put(_STOP)
+            await self._writer_task
+        self._writer_task = None
+
+        # Enregistrements restés en file sans writer actif (writer jamais démarré ou interrompu)
+        if self._queue is not None:
+            while not self._queue.empty():
+                batch = []
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is not _STOP:
+                        batch.append(item)
+                await self._flush(batch)
+        self._executor.shutdown(wait=True)
+        logger.info("✓ Writer d'ingestion arrêté")
+
+    def submit_telemetry(
+        self,
+        telemetry: dict,
+        device_address: Optional[str] = None,
+        received_at: Optional[datetime] = None
+    ) -> bool:
+        """
+        Met un paquet de télémétrie décodé en file
+
+        Args:
+            telemetry: Paquet de télémétrie (dict issu du JSON)
+            device_address: Adresse MAC du robot émetteur
+            received_at: Horodatage de réception (défaut: maintenant)
+
+        Returns:
+            True si mis en file, False si la file est pleine ou l'ingestion arrêtée
+        """
+        return self._submit(('telemetry', telemetry, device_address, received_at or datetime.utcnow()))
+
+    def submit_event(
+        self,
+        event: dict,
+        device_address: Optional[str] = None,
+        received_at: Optional[datetime] = None
+    ) -> bool:
+        """
+        Met un événement classifié en file
+
+        Args:
+            event: Champs de l'événement (event_type, category, description, ...)
+            device_address: Adresse MAC du robot émetteur
+            received_at: Horodatage de réception (défaut: maintenant)
+
+        Returns:
+            True si mis en file, False si la file est pleine ou l'ingestion arrêtée
+        """
+        return self._submit(('event', event, device_address, received_at or datetime.utcnow()))
+
+    def submit_connection(
+        self,
+        entry: dict,
+        device_address: str,
+        received_at: Optional[datetime] = None
+    ) -> bool:
+        """
+        Met un événement de connexion BLE (journal connection_log) en file
+
+        Args:
+            entry: Champs du journal (event, reason, duration_seconds, signal_strength, ...)
+            device_address: Adresse MAC du robot
+            received_at: Horodatage de l'événement (défaut: maintenant)
+
+        Returns:
+            True si mis en file, False si la file est pleine ou l'ingestion arrêtée
+        """
+        return self._submit(('connection', entry, device_address, received_at or datetime.utcnow()))
+
+    def _submit(self, item: Tuple[str, dict, Optional[str], datetime]) -> bool:
+        """Ajoute un élément à la file sans jamais bloquer l'appelant"""
+        if self._stopping:
+            self.rejected_stopped += 1
+            if self.rejected_stopped % 1000 == 1:
+                logger.warning(f"⚠️ Ingestion arrêtée, {self.rejected_stopped} élément(s) rejeté(s) ({item[0]} de {item[2]})")
+            return False
+        if not self.is_running:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                logger.error("✗ Ingestion impossible hors d'une boucle asyncio")
+                return False
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._writer_task = asyncio.create_task(self._run())
+
+        try:
+            self._queue.put_nowait(item)
+            self.enqueued += 1
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"⚠️ File d'ingestion pleine, {self.dropped} paquet(s) rejeté(s)")
+            return False
+
+    async def _run(self):
+        """Boucle du writer : regroupe les éléments en lots puis les écrit, jusqu'au signal d'arrêt"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size and not stopping:
+                # Vider ce qui est déjà disponible sans attendre
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[str, dict, Optional[str], datetime]]):
+        """Écrit un lot dans le thread d'écriture, hors de la boucle asyncio"""
+        if not batch:
+            return
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            attempt = 0
+            while True:
+                try:
+                    totals, event_rows, duplicates, duplicates_db = await loop.run_in_executor(
+                        self._executor, self._write_batch, batch
+                    )
+                    break
+                except Exception as e:
+                    # Transaction annulée : le lot entier peut être réécrit (erreur passagère, base verrouillée)
+                    if attempt >= self.retry_attempts:
+                        self.failed_rows += len(batch)
+                        logger.error(f"✗ Erreur écriture lot d'ingestion ({len(batch)} enregistrements): {e}")
+                        return
+                    attempt += 1
+                    self.retries += 1
+                    logger.warning(f"⚠️ Écriture du lot d'ingestion échouée ({e}), essai {attempt}/{self.retry_attempts}")
+                    await asyncio.sleep(RETRY_BASE_DELAY_S * 2 ** (attempt - 1))
+            # Compteurs mis à jour une fois le lot validé (un lot réessayé n'est compté qu'une fois)
+            self.duplicates += duplicates
+            self.duplicates_db += duplicates_db
+            self.rows_written += len(batch) - duplicates - duplicates_db
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.batches += 1
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+            self.last_flush_at = datetime.utcnow()
+            INGESTION_COMMIT_SECONDS.observe(elapsed_ms / 1000)
+            INGESTION_BATCH_ROWS.observe(len(batch))
+
+        # État en direct du dashboard : compteurs et événements une fois écrits
+        from app.services.live_state import event_to_dict, live_state
+        try:
+            await live_state.update_batch(totals, [event_to_dict(row) for row in event_rows])
+        except Exception as e:
+            logger.error(f"✗ Erreur diffusion de l'état en direct: {e}")
+
+    def _write_batch(
+        self,
+        batch: List[Tuple[str, dict, Optional[str], datetime]]
+    ) -> Tuple[Optional[dict], List[dict], int, int]:
+        """
+        Insère un lot de télémétrie et d'événements en une seule transaction
+
+        Returns:
+            (compteurs cumulés après le lot ou None sans télémétrie, lignes d'événements insérées,
+            doublons écartés par la fenêtre, doublons déjà en base)
+        """
+        from sqlalchemy import func
+        from sqlalchemy.dialects.sqlite import insert
+        from app.models.database import SessionLocal
+        from app.models.statistics import apply_rollups, apply_totals, totals_summary
+        from app.models.telemetry import ConnectionLog, Telemetry, Event
+        from app.services.response_cache import response_cache
+
+        telemetry_rows = []
+        event_rows = []
+        connection_rows = []
+        batch_keys = set()
+        duplicates = duplicates_db = 0
+        for kind, fields, device_address, received_at in batch:
+            if kind == 'telemetry':
+                row = build_telemetry_row(fields, device_address, received_at)
+                key = telemetry_key(row)
+                if key in batch_keys or key in self._dedupe:
+                    duplicates += 1
+                    continue
+                batch_keys.add(key)
+                telemetry_rows.append(row)
+            elif kind == 'event':
+                event_rows.append(build_event_row(fields, device_address, received_at))
+            elif kind == 'connection':
+                connection_rows.append(build_connection_row(fields, device_address, received_at))
+
+        db = SessionLocal()
+        telemetry_id = event_id = None
+        totals = None
+        try:
+            if telemetry_rows:
+                # Doublons sortis de la fenêtre (redémarrage, rejeu, ligne antérieure au packet_id déterministe) :
+                # ignorés par l'index unique, seules les lignes insérées alimentent agrégats et compteurs
+                inserted = {
+                    packet_id for (packet_id,) in db.execute(
+                        insert(Telemetry).on_conflict_do_nothing().returning(Telemetry.packet_id),
+                        telemetry_rows
+                    )
+                }
+                if len(inserted) < len(telemetry_rows):
+                    duplicates_db = len(telemetry_rows) - len(inserted)
+                    telemetry_rows = [row for row in telemetry_rows if row['packet_id'] in inserted]
+            if telemetry_rows:
+                # Agrégats horaires/journaliers et compteurs cumulés dans la même transaction
+                apply_rollups(db, telemetry_rows)
+                totals = totals_summary(apply_totals(db, telemetry_rows))
+                telemetry_id = db.query(func.max(Telemetry.id)).scalar()
+            if event_rows:
+                db.bulk_insert_mappings(Event, event_rows)
+                event_id = db.query(func.max(Event.id)).scalar()
+            if connection_rows:
+                db.bulk_insert_mappings(ConnectionLog, connection_rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        # Clés ajoutées à la fenêtre une fois en base (un lot en échec est réessayé tel quel)
+        for key in batch_keys:
+            self._dedupe.add(key)
+
+        # Filigrane d'ingestion : les réponses en cache calculées avant ce lot sont périmées
+        response_cache.advance(telemetry_id=telemetry_id, event_id=event_id)
+        return totals, event_rows, duplicates, duplicates_db
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Récupère les statistiques de la file d'ingestion
+
+        Returns:
+            Dict avec profondeur de file et latences d'écriture
+        """
+        return {
+            'running': self.is_running,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue': self.max_queue,
+            'batch_size': self.batch_size,
+            'flush_interval_ms': int(self.flush_interval * 1000),
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'rejected_stopped': self.rejected_stopped,
+            'rows_written': self.rows_written,
+            'failed_rows': self.failed_rows,
+            'retries': self.retries,
+            'duplicates': self.duplicates,
+            'duplicates_db': self.duplicates_db,
+            'dedupe_window': self._dedupe.size,
+            'batches': self.batches,
+            'last_flush_ms': round(self.last_flush_ms, 3),
+            'max_flush_ms': round(self.max_flush_ms, 3),
+            'avg_flush_ms': round(self._total_flush_ms / self.batches, 3) if self.batches else 0,
+            'last_flush_at': self.last_flush_at.isoformat() if self.last_flush_at else None
+        }
+
+
+def build_telemetry_row(telemetry: dict, device_address: Optional[str], received_at: datetime) -> dict:
+    """
+    Construit la ligne `telemetry` à partir d'un paquet décodé
+
+    Args:
+        telemetry: Paquet de télémétrie (dict)
+        device_address: Adresse MAC du robot émetteur
+        received_at: Horodatage de réception
+
+    Returns:
+        Dict des colonnes de la table telemetry
+    """
+    # Checksum du paquet canonique et packet_id déterministe : un même paquet reçu deux fois a le même identifiant
+    packet_str = json.dumps(telemetry, sort_keys=True)
+    checksum = hashlib.sha256(packet_str.encode()).hexdigest()
+    uptime_s = telemetry.get('uptime_s')
+
+    return {
+        'packet_id': str(uuid.uuid5(PACKET_ID_NAMESPACE, f"{device_address}|{uptime_s}|{checksum}")),
+        'device_address': device_address,
+        'timestamp': received_at,
+        'received_at': received_at,
+        'uptime_s': uptime_s,
+        'mode': telemetry.get('mode'),
+        'distance_cm': telemetry.get('distance_cm'),
+        'obstacle_events': telemetry.get('obstacle_events'),
+        'last_ir_cmd': telemetry.get('last_ir_cmd'),
+        'speed_pwm': telemetry.get('speed_pwm'),
+        'dist_traveled_cm': telemetry.get('dist_traveled_cm'),
+        'battery_level': telemetry.get('battery_level'),
+        'signal_strength': telemetry.get('signal_strength'),
+        'packet_raw': packet_str,
+        'checksum': checksum,
+        'processed': True,
+        'archived': False
+    }
+
+
+def telemetry_key(row: dict) -> Tuple[Optional[str], Optional[int], str]:
+    """Clé d'idempotence d'une ligne de télémétrie : (robot, uptime_s, checksum)"""
+    return row['device_address'], row['uptime_s'], row['checksum']
+
+
+def build_event_row(event: dict, device_address: Optional[str], received_at: datetime) -> dict:
+    """
+    Construit la ligne `events` à partir d'un événement classifié
+
+    Args:
+        event: Champs de l'événement
+        device_address: Adresse MAC du robot émetteur
+        received_at: Horodatage de réception
+
+    Returns:
+        Dict des colonnes de la table events
+    """
+    return {
+        'event_id': str(uuid.uuid4()),
+        'device_address': device_address,
+        'timestamp': received_at,
+        'received_at': received_at,
+        'event_type': event.get('event_type', 'unknown'),
+        'category': event.get('category', 'info'),
+        'description': event.get('description'),
+        'value': event.get('value'),
+        'new_value': event.get('new_value'),
+        'source': event.get('source', 'bluetooth'),
+        'raw_data': event.get('raw_data'),
+        'severity_level': event.get('severity_level', 1),
+        'acknowledged': False,
+        'processed': True
+    }
+
+
+def build_connection_row(entry: dict, device_address: str, received_at: datetime) -> dict:
+    """
+    Construit la ligne `connection_log` à partir d'un événement de connexion
+
+    Args:
+        entry: Champs du journal
+        device_address: Adresse MAC du robot
+        received_at: Horodatage de l'événement
+
+    Returns:
+        Dict des colonnes de la table connection_log
+    """
+    return {
+        'timestamp': received_at,
+        'device_address': device_address,
+        'device_name': entry.get('device_name'),
+        'event': entry.get('event', 'error'),
+        'reason': entry.get('reason'),
+        'error_message': entry.get('error_message'),
+        'duration_seconds': entry.get('duration_seconds'),
+        'signal_strength': entry.get('signal_strength')
+    }
+
+
+# Instance globale de la file d'ingestion
+ingestion_queue = IngestionQueue()
@@ -0,0 +1,209 @@
+"""
+État en direct du dashboard, poussé sur le topic WebSocket 'live'
+Dernière télémétrie par robot, compteurs cumulés et derniers événements :
+les changements sont diffusés dès qu'ils se produisent, et un client qui
+souscrit reçoit immédiatement l'état courant (snapshot), sans polling HTTP
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional
+
+from app.api.websocket_manager import manager as connection_manager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_TYPE = 'live_state'
+
+# Champs de télémétrie repris de la base au démarrage
+TELEMETRY_FIELDS = (
+    'uptime_s', 'mode', 'distance_cm', 'obstacle_events', 'last_ir_cmd',
+    'speed_pwm', 'dist_traveled_cm', 'battery_level', 'signal_strength'
+)
+
+
+class LiveState:
+    """
+    État courant du dashboard tenu en mémoire
+    - télémétrie : mise à jour à la réception du paquet (avant l'écriture en base)
+    - compteurs cumulés et événements : mis à jour après le commit du lot d'ingestion
+    """
+
+    def __init__(self, max_events: int = Config.LIVE_STATE_EVENTS):
+        """
+        Initialise l'état vide
+
+        Args:
+            max_events: Nombre d'événements récents conservés pour le snapshot
+        """
+        self.telemetry: Dict[str, dict] = {}
+        self.totals: Optional[dict] = None
+        self.events: deque = deque(maxlen=max(1, max_events))
+        self.version = 0
+        self.loaded = False
+
+        # Statistiques
+        self.pushed = 0
+        self.unchanged = 0
+        self.snapshots = 0
+
+        connection_manager.register_snapshot('live', self.snapshot)
+
+    async def start(self):
+        """Charge l'état initial depuis la base (hors de la boucle asyncio)"""
+        loop = asyncio.get_running_loop()
+        try:
+            telemetry, totals, events = await loop.run_in_executor(None, self._load)
+        except Exception as e:
+            logger.error(f"✗ Chargement de l'état en direct impossible: {e}")
+            return
+        # Ne pas écraser ce qui a été reçu pendant le chargement
+        for device, entry in telemetry.items():
+            self.telemetry.setdefault(device, entry)
+        if self.totals is None:
+            self.totals = totals
+        if not self.events:
+            self.events.extend(events)
+        self.loaded = True
+        logger.info(f"✓ État en direct chargé ({len(self.telemetry)} robot(s), {len(self.events)} événement(s))")
+
+    def _load(self):
+        """Lit la dernière télémétrie par robot, les compteurs et les derniers événements"""
+        from sqlalchemy import desc, func
+        from app.models.database import ReadSessionLocal
+        from app.models.statistics import get_totals, totals_summary
+        from app.models.telemetry import Event, Telemetry
+
+        db = ReadSessionLocal()
+        try:
+            latest_ids = db.query(func.max(Telemetry.id)).group_by(Telemetry.device_address)
+            telemetry = {}
+            for row in db.query(Telemetry).filter(Telemetry.id.in_(latest_ids)):
+                device = (row.device_address or '').upper() or None
+                telemetry[device] = {
+                    'device': device,
+                    'telemetry': {
+                        field: getattr(row, field)
+                        for field in TELEMETRY_FIELDS if getattr(row, field) is not None
+                    },
+                    'received_at': row.received_at.isoformat() if row.received_at else None
+                }
+            totals = totals_summary(get_totals(db))
+            events = [
+                e.to_dict() for e in
+                db.query(Event).order_by(desc(Event.timestamp)).limit(self.events.maxlen)
+            ]
+            events.reverse()
+            return telemetry, totals, events
+        finally:
+            db.close()
+
+    async def update_telemetry(self, device: Optional[str], telemetry: dict, received_at: Optional[datetime] = None):
+        """
+        Met à jour la dernière télémétrie d'un robot et la diffuse si elle a changé
+
+        Args:
+            device: Adresse MAC du robot émetteur
+            telemetry: Paquet de télémétrie décodé
+            received_at: Horodatage de réception (défaut: maintenant)
+        """
+        device = device.upper() if device else None
+        previous = self.telemetry.get(device)
+        if previous is not None and previous['telemetry'] == telemetry:
+            self.unchanged += 1
+            return
+        entry = {
+            'device': device,
+            'telemetry': telemetry,
+            'received_at': (received_at or datetime.utcnow()).isoformat()
+        }
+        self.telemetry[device] = entry
+        await self._push('telemetry', entry, device)
+
+    async def update_batch(self, totals: Optional[dict], events: List[dict]):
+        """
+        Diffuse les compteurs cumulés et les événements d'un lot d'ingestion écrit
+
+        Args:
+            totals: Compteurs cumulés après le lot (None si le lot n'avait pas de télémétrie)
+            events: Événements du lot (format Event.to_dict)
+        """
+        if totals is not None and totals != self.totals:
+            self.totals = totals
+            await self._push('totals', {'totals': totals})
+        elif totals is not None:
+            self.unchanged += 1
+        if events:
+            self.events.extend(events)
+            await self._push('events', {'events': events})
+
+    async def _push(self, kind: str, body: dict, device: Optional[str] = None):
+        """Publie un changement d'état sur le topic 'live'"""
+        self.version += 1
+        self.pushed += 1
+        await connection_manager.broadcast_live(
+            {'type': MESSAGE_TYPE, 'kind': kind, 'version': self.version, **body},
+            device
+        )
+
+    def snapshot(self, devices: Optional[FrozenSet[str]] = None) -> dict:
+        """
+        État courant complet, envoyé à un client qui souscrit au topic 'live'
+
+        Args:
+            devices: Robots souscrits par le client (None = tous)
+
+        Returns:
+            Message {"type": "live_state", "kind": "snapshot", ...}
+        """
+        self.snapshots += 1
+        return {
+            'type': MESSAGE_TYPE,
+            'kind': 'snapshot',
+            'version': self.version,
+            'telemetry': [
+                entry for device, entry in self.telemetry.items()
+                if devices is None or device in devices
+            ],
+            'totals': self.totals,
+            'events': [
+                event for event in self.events
+                if devices is None or (event.get('device_address') or '').upper() in devices
+            ]
+        }
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Récupère les statistiques de l'état en direct
+
+        Returns:
+            Dict avec version, robots suivis et messages poussés
+        """
+        return {
+            'loaded': self.loaded,
+            'version': self.version,
+            'devices': len(self.telemetry),
+            'events': len(self.events),
+            'pushed': self.pushed,
+            'unchanged': self.unchanged,
+            'snapshots': self.snapshots
+        }
+
+
+def event_to_dict(row: dict) -> dict:
+    """
+    Convertit une ligne d'événement du lot d'ingestion au format Event.to_dict
+
+    Args:
+        row: Colonnes de la table events (build_event_row)
+    """
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in row.items() if key != 'raw_data'
+    }
+
+
+# Instance globale de l'état en direct
+live_state = LiveState()
@@ -0,0 +1,174 @@
+"""
+Cache des réponses des endpoints de lecture du dashboard
+Les entrées sont invalidées par un filigrane d'ingestion (dernier id de télémétrie
+et d'événement écrit) plutôt que par un TTL aveugle, et les requêtes identiques
+concurrentes sont regroupées (single-flight) : un seul calcul par nouveau paquet,
+quel que soit le nombre d'écrans ouverts
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Cache LRU de réponses indexé par (clé de requête, filigrane)
+    Les endpoints GET s'exécutent dans le pool de threads de FastAPI :
+    l'état est protégé par un verrou et les calculs en cours sont partagés via des Future
+    """
+
+    def __init__(
+        self,
+        max_entries: int = Config.RESPONSE_CACHE_MAX_ENTRIES,
+        max_age_s: float = Config.RESPONSE_CACHE_MAX_AGE_S
+    ):
+        """
+        Initialise le cache
+
+        Args:
+            max_entries: Nombre maximum de réponses conservées (LRU)
+            max_age_s: Âge maximum d'une entrée en secondes, pour les fenêtres
+                glissantes ("X dernières heures") ; 0 = sans limite
+        """
+        self.max_entries = max(1, max_entries)
+        self.max_age_s = max_age_s
+
+        self._lock = threading.Lock()
+        # clé -> (filigrane, instant de calcul, réponse)
+        self._entries: 'OrderedDict[Hashable, Tuple[tuple, float, object]]' = OrderedDict()
+        # (clé, filigrane) -> calcul en cours
+        self._inflight: Dict[Tuple[Hashable, tuple], Future] = {}
+
+        # Filigrane : derniers ids écrits + époque des invalidations explicites
+        self.telemetry_id = 0
+        self.event_id = 0
+        self.epoch = 0
+
+        # Statistiques
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @property
+    def watermark(self) -> tuple:
+        return (self.telemetry_id, self.event_id, self.epoch)
+
+    def advance(self, telemetry_id: Optional[int] = None, event_id: Optional[int] = None):
+        """
+        Avance le filigrane après une écriture d'ingestion
+
+        Args:
+            telemetry_id: Dernier id de télémétrie écrit
+            event_id: Dernier id d'événement écrit
+        """
+        with self._lock:
+            if telemetry_id is not None:
+                self.telemetry_id = max(self.telemetry_id, telemetry_id)
+            if event_id is not None:
+                self.event_id = max(self.event_id, event_id)
+
+    def invalidate(self):
+        """Invalide toutes les entrées (suppression, archivage, acquittement...)"""
+        with self._lock:
+            self.epoch += 1
+            self._entries.clear()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], object]) -> object:
+        """
+        Renvoie la réponse en cache pour la clé, ou la calcule une seule fois
+
+        Args:
+            key: Clé de la requête (route et paramètres)
+            compute: Fonction sans argument produisant la réponse
+
+        Returns:
+            Réponse (partagée entre les appelants : ne pas la modifier)
+        """
+        with self._lock:
+            watermark = self.watermark
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_watermark, computed_at, value = entry
+                if entry_watermark == watermark and not self._is_stale(computed_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if entry_watermark == watermark:
+                    self.expired += 1
+                del self._entries[key]
+
+            flight_key = (key, watermark)
+            future = self._inflight.get(flight_key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[flight_key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(flight_key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(flight_key, None)
+            # Ne pas réinsérer un résultat déjà dépassé par une écriture ou une invalidation
+            if watermark == self.watermark:
+                self._entries[key] = (watermark, time.monotonic(), value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        future.set_result(value)
+        return value
+
+    def _is_stale(self, computed_at: float) -> bool:
+        return bool(self.max_age_s) and time.monotonic() - computed_at > self.max_age_s
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Récupère les statistiques du cache
+
+        Returns:
+            Dict avec filigrane, taux de succès et calculs regroupés
+        """
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'max_age_s': self.max_age_s,
+                'inflight': len(self._inflight),
+                'watermark': {
+                    'telemetry_id': self.telemetry_id,
+                    'event_id': self.event_id,
+                    'epoch': self.epoch
+                },
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'hit_ratio': round((self.hits + self.coalesced) / lookups, 3) if lookups else 0
+            }
+
+
+# Instance globale du cache des réponses
+response_cache = ResponseCache()
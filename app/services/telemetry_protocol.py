@@ -0,0 +1,140 @@
+"""
+Trame binaire de télémétrie (firmware récent)
+Remplace le paquet JSON (~150 octets, plusieurs notifications de 20 octets)
+par une trame à disposition fixe qui tient dans une seule notification.
+Les firmwares plus anciens continuent d'envoyer du JSON, toujours accepté.
+
+Disposition v1 (little-endian, 20 octets) :
+    octet  0      opcode 0x11 (télémétrie, version 1)
+    octets 1-4    uptime_s          uint32
+    octet  5      mode              uint8  (index dans MODES)
+    octets 6-7    distance_cm       uint16 (centièmes de cm)
+    octets 8-11   last_ir_cmd       uint32
+    octets 12-13  light_level       uint16
+    octet  14     speed_pwm         uint8
+    octets 15-18  dist_traveled_cm  float32
+    octet  19     checksum          XOR des octets 0 à 18
+
+L'opcode identifie la trame comme les commandes 0x01 (texte) et 0x02 (image)
+envoyées au robot : une nouvelle version de la disposition prend un nouvel opcode.
+"""
+import struct
+from typing import Dict, Optional, Union
+
+OPCODE_TELEMETRY_V1 = 0x11
+
+# Modes du firmware (Robot::updateMetrics), l'index est l'octet transmis
+MODES = ('UNKNOWN', 'STARTING', 'WAITING_BT', 'MANUAL', 'AUTO', 'OBSTACLE')
+_MODE_CODES = {mode: code for code, mode in enumerate(MODES)}
+
+_TELEMETRY_V1 = struct.Struct('<BIBHIHBfB')
+
+# Taille de trame par opcode (utilisé par le framer pour découper le flux)
+FRAME_SIZES: Dict[int, int] = {OPCODE_TELEMETRY_V1: _TELEMETRY_V1.size}
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def frame_size(opcode: int) -> Optional[int]:
+    """
+    Taille de la trame binaire annoncée par un opcode
+
+    Args:
+        opcode: Premier octet du paquet
+
+    Returns:
+        Taille en octets, ou None si l'octet n'est pas un opcode de trame binaire
+    """
+    return FRAME_SIZES.get(opcode)
+
+
+def checksum(buffer: Buffer, offset: int = 0, length: Optional[int] = None) -> int:
+    """
+    XOR des octets d'une trame (hors octet de checksum)
+
+    Args:
+        buffer: Tampon contenant la trame
+        offset: Début de la trame
+        length: Nombre d'octets couverts (défaut: jusqu'à la fin du tampon)
+    """
+    end = len(buffer) if length is None else offset + length
+    value = 0
+    for i in range(offset, end):
+        value ^= buffer[i]
+    return value
+
+
+def is_valid_frame(buffer: Buffer, offset: int = 0) -> bool:
+    """
+    Vérifie opcode, longueur et checksum d'une trame binaire
+
+    Args:
+        buffer: Tampon contenant la trame
+        offset: Début de la trame dans le tampon
+    """
+    if offset >= len(buffer):
+        return False
+    size = frame_size(buffer[offset])
+    if size is None or len(buffer) - offset < size:
+        return False
+    return checksum(buffer, offset, size - 1) == buffer[offset + size - 1]
+
+
+def decode_telemetry(buffer: Buffer, offset: int = 0) -> dict:
+    """
+    Décode une trame binaire de télémétrie sans copie du tampon (struct.unpack_from)
+
+    Args:
+        buffer: Tampon contenant la trame (bytes, bytearray ou memoryview)
+        offset: Début de la trame dans le tampon
+
+    Returns:
+        Télémétrie au même format que le paquet JSON du firmware
+
+    Raises:
+        ValueError: Opcode inconnu, trame tronquée ou checksum invalide
+    """
+    if not is_valid_frame(buffer, offset):
+        raise ValueError("Trame de télémétrie binaire invalide (opcode, longueur ou checksum)")
+
+    (_, uptime_s, mode, distance, last_ir_cmd, light_level,
+     speed_pwm, dist_traveled, _) = _TELEMETRY_V1.unpack_from(buffer, offset)
+
+    return {
+        'uptime_s': uptime_s,
+        'mode': MODES[mode] if mode < len(MODES) else MODES[0],
+        'distance_cm': distance / 100,
+        'last_ir_cmd': f"0x{last_ir_cmd:x}",
+        'light_level': light_level,
+        'speed_pwm': speed_pwm,
+        'dist_traveled_cm': round(dist_traveled, 2)
+    }
+
+
+def encode_telemetry(telemetry: dict) -> bytes:
+    """
+    Encode une télémétrie en trame binaire v1 (équivalent de l'encodeur du firmware)
+
+    Args:
+        telemetry: Télémétrie au format JSON du firmware
+
+    Returns:
+        Trame de 20 octets
+    """
+    last_ir_cmd = telemetry.get('last_ir_cmd') or 0
+    if isinstance(last_ir_cmd, str):
+        last_ir_cmd = int(last_ir_cmd, 16)
+
+    frame = bytearray(_TELEMETRY_V1.pack(
+        OPCODE_TELEMETRY_V1,
+        int(telemetry.get('uptime_s') or 0) & 0xFFFFFFFF,
+        _MODE_CODES.get(telemetry.get('mode'), 0),
+        min(max(round((telemetry.get('distance_cm') or 0) * 100), 0), 0xFFFF),
+        last_ir_cmd & 0xFFFFFFFF,
+        min(max(int(telemetry.get('light_level') or 0), 0), 0xFFFF),
+        min(max(int(telemetry.get('speed_pwm') or 0), 0), 0xFF),
+        float(telemetry.get('dist_traveled_cm') or 0),
+        0
+    ))
+    frame[-1] = checksum(frame, 0, len(frame) - 1)
+    return bytes(frame)
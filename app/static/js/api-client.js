@@ -5,6 +5,7 @@
 // Configuration de base
 const API_BASE_URL = '/api';
 let ws = null; // WebSocket pour les notifications BLE
+let liveStateVersion = null; // Version de l'état en direct reçu (topic 'live')
 
 // Helper pour afficher les logs
 function log(message, type = 'info') {
@@ -103,7 +104,8 @@ function initWebSocket() {
     }
     
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = `${protocol}//${window.location.host}/ws/ble-notifications`;
+    // Topics par défaut + 'live' : état du dashboard poussé par le serveur (snapshot à la connexion)
+    const wsUrl = `${protocol}//${window.location.host}/ws/ble-notifications?topics=telemetry,events,raw,live`;
     
     try {
         ws = new WebSocket(wsUrl);
@@ -116,7 +118,9 @@ function initWebSocket() {
             try {
                 const notification = JSON.parse(event.data);
                 
-                if (notification.type === 'ble_notification') {
+                if (notification.type === 'live_state') {
+                    applyLiveState(notification);
+                } else if (notification.type === 'ble_notification') {
                     // Formater le message
                     let message = `BLE NOTI: `;                    
                     if (notification.text) {
@@ -141,6 +145,7 @@ function initWebSocket() {
         ws.onclose = () => {
             log('## WebSocket déconnecté', 'error');
             ws = null;
+            liveStateVersion = null; // Retour au polling HTTP jusqu'à la reconnexion
             // Reconnecter après 3 secondes
             setTimeout(() => initWebSocket(), 3000);
         };
@@ -149,6 +154,41 @@ function initWebSocket() {
     }
 }
 
+/**
+ * Applique un message de l'état en direct (topic 'live') au dashboard
+ * kind: 'snapshot' (état complet), 'telemetry', 'totals' ou 'events'
+ */
+function applyLiveState(state) {
+    liveStateVersion = state.version;
+    
+    if (state.kind === 'snapshot') {
+        // Dernière télémétrie du robot le plus récent
+        const latest = (state.telemetry || []).reduce(
+            (a, b) => (!a || (b.received_at || '') > (a.received_at || '')) ? b : a, null
+        );
+        if (latest) {
+            updateDashboardMetrics(latest.telemetry);
+        }
+        if (state.totals) {
+            renderTotalMetrics(state.totals);
+        }
+    } else if (state.kind === 'telemetry') {
+        updateDashboardMetrics(state.telemetry);
+    } else if (state.kind === 'totals') {
+        renderTotalMetrics(state.totals);
+    }
+    
+    // Les graphiques (charts.js) se rafraîchissent sur les changements
+    window.dispatchEvent(new CustomEvent('live-state', { detail: state }));
+}
+
+/**
+ * Indique si l'état en direct est reçu par WebSocket (sinon polling HTTP)
+ */
+function isLiveStateActive() {
+    return ws !== null && ws.readyState === WebSocket.OPEN && liveStateVersion !== null;
+}
+
 // Fermer WebSocket
 function closeWebSocket() {
     if (ws) {
@@ -193,7 +233,7 @@ async function disconnectRobot() {
         
         if (response.ok && data.success) {
             log('Deconnecte du robot!', 'success');
-            closeWebSocket(); // Fermer WebSocket
+            // La WebSocket reste ouverte : elle porte aussi l'état en direct du dashboard
             updateUIConnected(false);
             return true;
         } else {
@@ -482,24 +522,7 @@ async function fetchTotalMetrics() {
         const data = await response.json();
         
         if (data.success) {
-            // Distance totale
-            const distEl = document.getElementById('metrique-distance');
-            if (distEl) {
-                distEl.textContent = `${data.total_distance_m} m`;
-            }
-            
-            // Temps total
-            const timeEl = document.getElementById('metrique-time');
-            if (timeEl) {
-                timeEl.textContent = `${data.total_uptime_hours} h`;
-            }
-            
-            // Obstacles totaux
-            const obstaclesEl = document.getElementById('metrique-obstacles');
-            if (obstaclesEl) {
-                obstaclesEl.textContent = `${data.total_obstacles}`;
-            }
-            
+            renderTotalMetrics(data);
             log(`Métriques totales mises à jour: ${data.total_distance_m}m, ${data.total_uptime_hours}h, ${data.total_obstacles} obstacles`, 'success');
         }
     } catch (error) {
@@ -507,6 +530,29 @@ async function fetchTotalMetrics() {
     }
 }
 
+/**
+ * Affiche les statistiques TOTALES (réponse de /telemetry/total-stats ou état en direct)
+ */
+function renderTotalMetrics(totals) {
+    // Distance totale
+    const distEl = document.getElementById('metrique-distance');
+    if (distEl) {
+        distEl.textContent = `${totals.total_distance_m} m`;
+    }
+    
+    // Temps total
+    const timeEl = document.getElementById('metrique-time');
+    if (timeEl) {
+        timeEl.textContent = `${totals.total_uptime_hours} h`;
+    }
+    
+    // Obstacles totaux
+    const obstaclesEl = document.getElementById('metrique-obstacles');
+    if (obstaclesEl) {
+        obstaclesEl.textContent = `${totals.total_obstacles}`;
+    }
+}
+
 // Export des fonctions globalement
 window.connectRobot = connectRobot;
 window.disconnectRobot = disconnectRobot;
@@ -521,6 +567,9 @@ window.closeWebSocket = closeWebSocket;
 window.updateDashboardMetrics = updateDashboardMetrics;
 window.fetchLatestTelemetry = fetchLatestTelemetry;
 window.fetchTotalMetrics = fetchTotalMetrics;
+window.renderTotalMetrics = renderTotalMetrics;
+window.applyLiveState = applyLiveState;
+window.isLiveStateActive = isLiveStateActive;
 window.updateIndicatorsFromEvent = updateIndicatorsFromEvent;
 window.testBLEEvent = testBLEEvent;
 
@@ -532,21 +581,25 @@ window.initDashboard = function() {
     console.log("=== INITIALISATION DASHBOARD ===");
     log("Dashboard initialise", "info");
 
+    // État en direct poussé par le serveur : le snapshot arrive dès l'ouverture de la WebSocket
+    initWebSocket();
+
     // Verifier le statut initial
     setTimeout(() => {
         getStatus();
-        fetchLatestTelemetry();
-        fetchTotalMetrics(); // Charger les métriques totales
     }, 500);
 
-    // Rafraîchir la télémétrie toutes les 5 secondes
+    // Repli : polling HTTP uniquement tant que l'état en direct n'est pas reçu
     setInterval(() => {
-        fetchLatestTelemetry();
+        if (!isLiveStateActive()) {
+            fetchLatestTelemetry();
+        }
     }, 5000);
     
-    // Rafraîchir les métriques totales toutes les 30 secondes
     setInterval(() => {
-        fetchTotalMetrics();
+        if (!isLiveStateActive()) {
+            fetchTotalMetrics();
+        }
     }, 30000);
     
     // Attacher les écouteurs d'événements boutons
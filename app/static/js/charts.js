@@ -762,14 +762,46 @@ function initChartListeners() {
   document.getElementById('refreshDetailedBtn')?.addEventListener('click', refreshAllCharts);
 }
 
+// Délai minimum entre deux rafraîchissements déclenchés par l'état en direct :
+// chaque rafraîchissement interroge tous les endpoints de graphiques, cadence de l'ancien polling (5 min)
+const LIVE_REFRESH_MIN_INTERVAL_MS = 300000;
+let lastChartsRefresh = 0;
+let pendingChartsRefresh = null;
+
+/**
+ * Planifie un rafraîchissement des graphiques (au plus un toutes les 5 minutes,
+ * seulement si de nouvelles données ont été écrites)
+ */
+function scheduleChartsRefresh() {
+  if (pendingChartsRefresh) {
+    return;
+  }
+  const wait = Math.max(0, lastChartsRefresh + LIVE_REFRESH_MIN_INTERVAL_MS - Date.now());
+  pendingChartsRefresh = setTimeout(() => {
+    pendingChartsRefresh = null;
+    lastChartsRefresh = Date.now();
+    refreshAllCharts();
+  }, wait);
+}
+
 // Initialiser les graphiques au chargement de la page
 window.addEventListener('load', () => {
   console.log("=== INITIALISATION DES GRAPHIQUES ===");
   initChartListeners();
+  lastChartsRefresh = Date.now();
   refreshAllCharts();
   
-  // Rafraîchir périodiquement les graphiques toutes les 5 minutes
+  // Rafraîchir quand de nouvelles données sont écrites (compteurs ou événements poussés)
+  window.addEventListener('live-state', (event) => {
+    if (event.detail.kind === 'totals' || event.detail.kind === 'events') {
+      scheduleChartsRefresh();
+    }
+  });
+  
+  // Repli : rafraîchissement périodique toutes les 5 minutes sans état en direct
   setInterval(() => {
-    refreshAllCharts();
+    if (!window.isLiveStateActive || !window.isLiveStateActive()) {
+      refreshAllCharts();
+    }
   }, 300000);
 });
@@ -0,0 +1,107 @@
+"""
+Comparaison de deux exécutions de la suite de benchmarks (benchmarks/run.py)
+
+Les mesures sont appariées par (benchmark, nom, paramètres) ; pour chaque
+métrique comparable (voir harness.py) l'écart relatif est affiché et une
+régression est signalée au-delà de --threshold pour cent. Les latences sous
+--min-ms sont ignorées (bruit de mesure).
+
+Code de sortie 1 si au moins une régression (utilisable en CI).
+
+Usage :
+    python benchmarks/compare.py benchmarks/results/<base>.json benchmarks/results/<head>.json --threshold 10
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from harness import record_key  # noqa: E402
+
+
+def load(path: str) -> dict:
+    """Charge une exécution (document run.py ou liste d'enregistrements d'un scénario)"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {'environment': {}, 'results': data}
+    return data
+
+
+def change(metric: str, base: float, head: float) -> float:
+    """Écart relatif en pour cent, positif = dégradation"""
+    if not base:
+        return 0.0
+    delta = (head - base) / base * 100
+    return -delta if metric.endswith('_per_s') else delta
+
+
+def compare(base: dict, head: dict, threshold: float, min_ms: float) -> int:
+    """
+    Affiche les écarts métrique par métrique
+
+    Args:
+        base: Exécution de référence
+        head: Exécution comparée
+        threshold: Dégradation tolérée (pour cent)
+        min_ms: Latence en dessous de laquelle l'écart est ignoré
+
+    Returns:
+        Nombre de régressions
+    """
+    head_index = {record_key(entry): entry for entry in head['results']}
+    regressions = 0
+    missing = 0
+
+    for entry in base['results']:
+        other = head_index.pop(record_key(entry), None)
+        if other is None:
+            missing += 1
+            continue
+        params = ' '.join(f"{k}={v}" for k, v in entry['params'].items())
+        for metric, value in entry['metrics'].items():
+            if not (metric.endswith('_ms') or metric.endswith('_per_s')) or metric not in other['metrics']:
+                continue
+            new = other['metrics'][metric]
+            delta = change(metric, value, new)
+            noise = metric.endswith('_ms') and max(value, new) < min_ms
+            status = '  '
+            if delta > threshold and not noise:
+                status = '✗ '
+                regressions += 1
+            elif delta < -threshold and not noise:
+                status = '✓ '
+            print(f"{status}{entry['benchmark']:<10} {entry['name']:<32} {params:<28} "
+                  f"{metric:<22} {value:>10} -> {new:<10} ({delta:+.1f}%)")
+
+    if missing or head_index:
+        print(f"⚠️  Mesures non appariées: {missing} absente(s) de la 2e exécution, "
+              f"{len(head_index)} nouvelle(s)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare deux exécutions de benchmarks/run.py")
+    parser.add_argument('base', help="Exécution de référence (JSON)")
+    parser.add_argument('head', help="Exécution comparée (JSON)")
+    parser.add_argument('--threshold', type=float, default=10.0, help="Dégradation tolérée (pour cent)")
+    parser.add_argument('--min-ms', type=float, default=0.5, help="Latences ignorées en dessous (ms)")
+    args = parser.parse_args()
+
+    base, head = load(args.base), load(args.head)
+    for label, run in (('base', base), ('head', head)):
+        env = run['environment']
+        print(f"{label}: commit {(env.get('commit') or '?')[:12]}{' (modifié)' if env.get('dirty') else ''} "
+              f"python {env.get('python', '?')} {env.get('platform', '')}")
+
+    regressions = compare(base, head, args.threshold, args.min_ms)
+    if regressions:
+        print(f"\n✗ {regressions} régression(s) au-delà de {args.threshold:.0f}%")
+        sys.exit(1)
+    print(f"\n✓ Aucune régression au-delà de {args.threshold:.0f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Latence des endpoints de lecture /api/telemetry/* et /api/events/* selon le volume
+
+Pour chaque volume (--sizes), une base synthétique est générée une fois
+(conservée dans --data-dir pour les exécutions suivantes), puis chaque endpoint
+est appelé --repeat fois :
+- cache 'cold' : cache des réponses vidé avant chaque appel (calcul complet)
+- cache 'warm' : appels répétés servis par le cache (filigrane inchangé),
+  pour les endpoints mis en cache seulement
+
+Chaque volume est mesuré dans un processus séparé (DB_PATH lu à l'import).
+
+Usage :
+    python benchmarks/endpoints.py --sizes 10000,1000000,10000000 --repeat 30 --json endpoints.json
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from harness import (  # noqa: E402
+    DATASET_VERSION, emit, isolated_env, percentiles, record, run_worker, seed_database, write_json
+)
+
+# (endpoint, paramètres, servi par le cache des réponses) : requêtes du dashboard
+ENDPOINTS = [
+    ('/api/telemetry/latest', {'limit': 50}, True),
+    ('/api/telemetry/history', {'limit': 100, 'hours': 24}, False),
+    ('/api/telemetry/stats', {'hours': 24}, True),
+    ('/api/telemetry/total-stats', {}, True),
+    ('/api/telemetry/trend', {'field': 'speed_pwm', 'minutes': 1440, 'max_points': 500}, False),
+    ('/api/events/latest', {'limit': 20}, False),
+    ('/api/events/types', {}, False),
+    ('/api/events/summary', {'hours': 24}, True),
+    ('/api/events/critical', {'hours': 24}, False),
+]
+
+
+def prepare_database(rows: int):
+    """Crée le schéma, insère les lignes et reconstruit agrégats et compteurs (base absente)"""
+    from app.models.database import DB_PATH, SessionLocal, init_db
+    from app.models.statistics import backfill_rollups, rebuild_totals
+
+    if os.path.exists(DB_PATH):
+        return
+    print(f"⏱️  Génération de {rows} lignes dans {DB_PATH}...")
+    start = time.perf_counter()
+    init_db()
+    seed_database(DB_PATH, rows)
+    backfill_rollups()
+    db = SessionLocal()
+    try:
+        rebuild_totals(db)
+    finally:
+        db.close()
+    print(f"✓ Base générée en {time.perf_counter() - start:.1f} s")
+
+
+def measure(rows: int, repeat: int) -> list:
+    """Mesure chaque endpoint sur la base courante (processus worker)"""
+    import logging
+    from fastapi.testclient import TestClient
+
+    prepare_database(rows)
+    logging.disable(logging.INFO)
+
+    from app import create_app
+    app = create_app()
+    from app.services.response_cache import response_cache
+
+    results = []
+    with TestClient(app) as client:
+        for path, params, cached in ENDPOINTS:
+            for cache in ('cold', 'warm') if cached else ('cold',):
+                client.get(path, params=params)  # Préchauffage (connexions, plans de requête)
+                latencies = []
+                for _ in range(repeat):
+                    if cache == 'cold':
+                        response_cache.invalidate()
+                    start = time.perf_counter()
+                    response = client.get(path, params=params)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{path}: HTTP {response.status_code}")
+                metrics = percentiles(latencies)
+                metrics['requests_per_s'] = round(1000 / metrics['mean_ms'], 1)
+                results.append(record('endpoints', path, {'rows': rows, 'cache': cache}, metrics))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence des endpoints de lecture selon le volume")
+    parser.add_argument('--sizes', default='10000,1000000,10000000', help="Volumes de télémétrie (lignes)")
+    parser.add_argument('--repeat', type=int, default=30, help="Appels par endpoint et par mode de cache")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'robot-bench'),
+                        help="Répertoire des bases générées (réutilisées)")
+    parser.add_argument('--rows', type=int, help=argparse.SUPPRESS)  # Mode worker
+    parser.add_argument('--json', help="Fichier JSON de sortie")
+    args = parser.parse_args()
+
+    if args.rows is not None:
+        emit(measure(args.rows, args.repeat), args.json)
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = []
+    for rows in (int(n) for n in args.sizes.split(',') if n):
+        print(f"⏱️  Endpoints sur {rows} lignes...")
+        with tempfile.TemporaryDirectory(prefix='endpoints-') as workdir:
+            env = isolated_env(workdir, DB_PATH=os.path.join(args.data_dir, f"telemetry-{rows}-v{DATASET_VERSION}.db"))
+            results += run_worker('endpoints.py', ['--rows', str(rows), '--repeat', str(args.repeat)], env)
+    if args.json:
+        write_json(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Micro-benchmark de la classification des notifications texte en événements
+
+Compare l'ancienne chaîne if/elif (lower() + tests 'in' successifs) au
+classifieur compilé (app.services.event_classifier), puis mesure le
+classifieur quand la table de règles grandit (règles synthétiques ajoutées).
+
+Usage :
+    python benchmarks/event_classifier.py --iterations 200000 --rules 10,100,1000
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.api  # noqa: E402,F401  (initialise app.api avant app.services : imports croisés)
+from app.services.event_classifier import DEFAULT_RULES, EventClassifier  # noqa: E402
+
+# Notifications du firmware, texte sans événement et télémétrie ignorée en amont
+SAMPLES = [
+    'event:auto_mode', 'event:manual_mode', 'event:obstacle_detected',
+    'event:headlights_on', 'event:headlights_off', 'event:lights_on',
+    'event:lights_off', 'event:emergency_stop', 'connection lost',
+    'ready', 'hello from robot', 'cmd:ack'
+]
+
+
+def legacy_classify(text: str):
+    """Ancienne classification (filtre any() puis chaîne if/elif), pour comparaison"""
+    if not any(keyword in text.lower() for keyword in ['auto', 'manual', 'lights', 'obstacle', 'emergency', 'stop']):
+        return None
+    event_type, category, severity, value, new_value = 'unknown', 'info', 1, None, None
+    text_lower = text.lower()
+    if 'auto' in text_lower:
+        event_type, value, new_value = 'mode_change', 'manual', 'auto'
+    elif 'manual' in text_lower or 'manuel' in text_lower:
+        event_type, value, new_value = 'mode_change', 'auto', 'manual'
+    elif 'lights' in text_lower or 'lumière' in text_lower:
+        event_type = 'lights_toggle'
+        value = 'off' if 'on' in text_lower else 'on'
+        new_value = 'on' if 'on' in text_lower else 'off'
+    elif 'obstacle' in text_lower:
+        event_type, category, severity = 'obstacle_detected', 'warning', 2
+    elif 'emergency' in text_lower or 'urgence' in text_lower:
+        event_type, category, severity = 'emergency_stop', 'critical', 4
+    elif 'battery' in text_lower or 'batterie' in text_lower:
+        event_type, category, severity = 'battery_low', 'warning', 2
+    elif 'disconnect' in text_lower or 'connection' in text_lower:
+        event_type, category, severity = 'connection', 'warning', 2
+    return {
+        'event_type': event_type, 'category': category, 'description': text,
+        'value': value, 'new_value': new_value, 'source': 'bluetooth',
+        'raw_data': text, 'severity_level': severity
+    }
+
+
+def synthetic_rules(count: int, seed: int = 42) -> list:
+    """Règles supplémentaires simulant de nouveaux messages du firmware"""
+    rng = random.Random(seed)
+    rules = []
+    for i in range(count):
+        word = ''.join(rng.choice(string.ascii_lowercase) for _ in range(8))
+        rules.append({
+            'name': f'synthetic_{i}',
+            'keywords': [f'{word} on', f'{word} off', word],
+            'event_type': f'synthetic_{i}'
+        })
+    return rules
+
+
+def measure(classify, iterations: int) -> dict:
+    """Débit et coût moyen d'un appel sur les échantillons"""
+    samples = (SAMPLES * (iterations // len(SAMPLES) + 1))[:iterations]
+    start = time.perf_counter()
+    for text in samples:
+        classify(text)
+    elapsed = time.perf_counter() - start
+    return {
+        'calls_per_s': round(iterations / elapsed),
+        'ns_per_call': round(elapsed / iterations * 1e9)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark du classifieur d'événements")
+    parser.add_argument('--iterations', type=int, default=200000, help="Appels par mesure")
+    parser.add_argument('--rules', default='10,100,1000', help="Tailles de table à mesurer (règles ajoutées)")
+    args = parser.parse_args()
+
+    rows = [{'variant': 'legacy if/elif', 'rules': 7, **measure(legacy_classify, args.iterations)}]
+    classifier = EventClassifier(DEFAULT_RULES)
+    rows.append({'variant': 'compiled', 'rules': len(classifier.rules), **measure(classifier.classify, args.iterations)})
+
+    for extra in (int(n) for n in args.rules.split(',') if n):
+        start = time.perf_counter()
+        classifier = EventClassifier(DEFAULT_RULES + synthetic_rules(extra))
+        compile_ms = (time.perf_counter() - start) * 1000
+        print(f"⏱️  {len(classifier.rules)} règles compilées en {compile_ms:.1f} ms")
+        rows.append({'variant': 'compiled', 'rules': len(classifier.rules), **measure(classifier.classify, args.iterations)})
+
+    columns = list(rows[0].keys())
+    print()
+    print(' | '.join(f"{c:>16}" for c in columns))
+    for row in rows:
+        print(' | '.join(f"{row[c]!s:>16}" for c in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+Outils communs de la suite de benchmarks (benchmarks/run.py)
+
+Chaque mesure est un enregistrement JSON :
+    {"benchmark": "endpoints", "name": "/api/telemetry/latest",
+     "params": {"rows": 10000, "cache": "cold"},
+     "metrics": {"p50_ms": 1.2, "p99_ms": 3.4, "requests_per_s": 812.0}}
+
+Conventions des métriques (utilisées par compare.py) :
+- suffixe '_ms' : latence, plus bas = mieux
+- suffixe '_per_s' : débit, plus haut = mieux
+- autres : informatives, non comparées
+"""
+import json
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Version du jeu de données généré (invalide les bases en cache si la génération change)
+DATASET_VERSION = 1
+
+
+def percentiles(values_ms: List[float]) -> Dict[str, float]:
+    """
+    Résumé d'une série de latences
+
+    Args:
+        values_ms: Latences en millisecondes
+
+    Returns:
+        Dict count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms
+    """
+    if not values_ms:
+        return {'count': 0}
+    values = sorted(values_ms)
+
+    def at(p: float) -> float:
+        return round(values[min(len(values) - 1, int(len(values) * p))], 3)
+
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values), 3),
+        'p50_ms': at(0.50),
+        'p95_ms': at(0.95),
+        'p99_ms': at(0.99),
+        'max_ms': round(values[-1], 3)
+    }
+
+
+def record(benchmark: str, name: str, params: dict, metrics: dict) -> dict:
+    """Construit un enregistrement de mesure"""
+    return {'benchmark': benchmark, 'name': name, 'params': params, 'metrics': metrics}
+
+
+def record_key(entry: dict) -> tuple:
+    """Clé d'appariement de deux mesures entre deux exécutions"""
+    return (entry['benchmark'], entry['name'], tuple(sorted(entry['params'].items())))
+
+
+def environment() -> dict:
+    """Commit, interpréteur et machine de l'exécution"""
+
+    def git(*args) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ['git', *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def emit(results: List[dict], output: Optional[str]):
+    """
+    Affiche les mesures en tableau et les écrit en JSON si un fichier est donné
+
+    Args:
+        results: Enregistrements (record)
+        output: Fichier JSON de sortie (liste d'enregistrements) ou None
+    """
+    for entry in results:
+        params = ' '.join(f"{k}={v}" for k, v in entry['params'].items())
+        metrics = ' '.join(f"{k}={v}" for k, v in entry['metrics'].items())
+        print(f"  {entry['benchmark']:<10} {entry['name']:<32} {params:<28} {metrics}")
+    if output:
+        write_json(results, output)
+
+
+def write_json(data, output: str):
+    """Écrit un document JSON (mesures ou exécution complète)"""
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def isolated_env(workdir: str, **overrides) -> Dict[str, str]:
+    """
+    Variables d'environnement d'une application isolée (base et archive dans workdir)
+
+    Args:
+        workdir: Répertoire de travail du benchmark
+        overrides: Variables supplémentaires (valeurs converties en str)
+    """
+    env = dict(os.environ)
+    env.update({
+        'DB_PATH': os.path.join(workdir, 'bench.db'),
+        'ARCHIVE_DIR': os.path.join(workdir, 'archive'),
+        'PYTHONPATH': REPO_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    })
+    env.update({key: str(value) for key, value in overrides.items()})
+    return env
+
+
+def run_worker(script: str, args: Iterable[str], env: Dict[str, str], timeout: Optional[float] = None) -> List[dict]:
+    """
+    Exécute une mesure dans un processus séparé (configuration lue à l'import)
+
+    Args:
+        script: Script de benchmarks/ à exécuter
+        args: Arguments du script
+        env: Environnement du processus
+        timeout: Durée maximale en secondes
+
+    Returns:
+        Enregistrements écrits par le worker
+    """
+    fd, output = tempfile.mkstemp(suffix='.json', prefix='bench-')
+    os.close(fd)
+    try:
+        subprocess.run(
+            [sys.executable, os.path.join(REPO_ROOT, 'benchmarks', script), *args, '--json', output],
+            env=env, cwd=REPO_ROOT, check=True, timeout=timeout
+        )
+        with open(output, encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+def free_port() -> int:
+    """Port TCP libre sur la boucle locale"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    """Attend qu'un serveur écoute sur le port"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Serveur non démarré sur le port {port}")
+
+
+def seed_database(db_path: str, rows: int, devices: int = 4, events_ratio: float = 0.05, seed: int = 42):
+    """
+    Remplit la table telemetry (et events) de lignes synthétiques réparties sur 30 jours
+
+    Insertion directe via sqlite3 (executemany par blocs) : plusieurs millions de
+    lignes en quelques minutes. Le schéma doit déjà exister (init_db).
+
+    Args:
+        db_path: Fichier SQLite
+        rows: Nombre de lignes de télémétrie
+        devices: Nombre de robots émetteurs
+        events_ratio: Événements générés par ligne de télémétrie
+        seed: Graine (jeu de données identique d'une exécution à l'autre)
+    """
+    import random
+
+    rng = random.Random(seed)
+    end = datetime.utcnow().replace(microsecond=0)
+    span_s = 30 * 24 * 3600
+    step = span_s / max(rows, 1)
+    addresses = [f"5A:00:00:00:00:{i:02X}" for i in range(devices)]
+    modes = ('AUTO', 'MANUAL', 'OBSTACLE')
+    event_types = (
+        ('mode_change', 'info', 1), ('lights_toggle', 'info', 1),
+        ('obstacle_detected', 'warning', 2), ('emergency_stop', 'critical', 4)
+    )
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = OFF')
+        chunk = 50000
+        for first in range(0, rows, chunk):
+            telemetry, events = [], []
+            for i in range(first, min(first + chunk, rows)):
+                ts = (end - timedelta(seconds=span_s - i * step)).strftime('%Y-%m-%d %H:%M:%S.%f')
+                device = addresses[i % devices]
+                telemetry.append((
+                    str(uuid.UUID(int=rng.getrandbits(128))), device, ts, ts, i // devices,
+                    modes[i % 7 % 3], round(rng.uniform(2, 400), 2), int(rng.random() < 0.02),
+                    '0x0', rng.randint(0, 255), round(rng.uniform(0, 20), 2), 1, 0
+                ))
+                if rng.random() < events_ratio:
+                    event_type, category, severity = event_types[i % len(event_types)]
+                    events.append((
+                        str(uuid.UUID(int=rng.getrandbits(128))), device, ts, ts, event_type,
+                        category, event_type, 'bluetooth', severity, 0, 1
+                    ))
+            conn.executemany(
+                'INSERT INTO telemetry (packet_id, device_address, timestamp, received_at, uptime_s, mode, '
+                'distance_cm, obstacle_events, last_ir_cmd, speed_pwm, dist_traveled_cm, processed, archived) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', telemetry
+            )
+            conn.executemany(
+                'INSERT INTO events (event_id, device_address, timestamp, received_at, event_type, category, '
+                'description, source, severity_level, acknowledged, processed) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', events
+            )
+            conn.commit()
+        conn.execute('PRAGMA synchronous = NORMAL')
+    finally:
+        conn.close()
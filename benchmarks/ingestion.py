@@ -0,0 +1,150 @@
+"""
+Débit et latence notification -> commit de la chaîne d'ingestion BLE
+
+Les paquets de télémétrie sont découpés en notifications de 20 octets et
+passés à BLEConnectionManager._notification_handler (framer, décodage,
+classification, diffusion WebSocket, file d'ingestion), comme les livrerait
+bleak. La latence est mesurée de l'entrée dans le handler jusqu'au commit
+du lot qui contient le paquet.
+
+Deux régimes par format :
+- 'max'    : notifications enchaînées au plus vite (débit maximal)
+- 'paced'  : cadence fixe --rate paquets/s (latence en régime établi)
+
+Chaque mesure tourne dans un processus séparé, sur une base vide.
+
+Usage :
+    python benchmarks/ingestion.py --packets 20000 --rate 500 --json ingestion.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from harness import emit, isolated_env, percentiles, record, run_worker, write_json  # noqa: E402
+
+NOTIFICATION_SIZE = 20
+DEVICE = '5A:00:00:00:00:01'
+SENDER = '0000ffe1-0000-1000-8000-00805f9b34fb'
+FORMATS = ('binary', 'json')
+
+
+def build_packets(count: int, packet_format: str) -> list:
+    """Paquets de télémétrie (uptime_s unique = identifiant) découpés en notifications"""
+    from app.services.telemetry_protocol import encode_telemetry
+
+    packets = []
+    for i in range(count):
+        telemetry = {
+            'uptime_s': i, 'mode': 'AUTO', 'distance_cm': round(20 + i % 300 * 0.5, 2),
+            'last_ir_cmd': '0x0', 'light_level': 400 + i % 200, 'speed_pwm': 100 + i % 100,
+            'dist_traveled_cm': round(i * 1.5, 2)
+        }
+        if packet_format == 'json':
+            packet = (json.dumps(telemetry, separators=(',', ':')) + '\r\n').encode()
+        else:
+            packet = encode_telemetry(telemetry)
+        packets.append([bytearray(packet[j:j + NOTIFICATION_SIZE]) for j in range(0, len(packet), NOTIFICATION_SIZE)])
+    return packets
+
+
+async def measure(packet_format: str, packets: int, rate: float) -> dict:
+    """Injecte les paquets et mesure débit du handler, débit de commit et latence"""
+    import app.api  # noqa: F401  (initialise app.api avant app.services : imports croisés)
+    from app.models.database import init_db
+    from app.services.ble_manager import BLEConnectionManager
+    from app.services.ingestion import ingestion_queue
+
+    init_db()
+    await ingestion_queue.start()
+
+    # Instant de commit de chaque paquet (uptime_s) : enveloppe du writer
+    committed = {}
+    write_batch = ingestion_queue._write_batch
+
+    def timed_write_batch(batch):
+        result = write_batch(batch)
+        now = time.perf_counter()
+        for kind, fields, _, _ in batch:
+            if kind == 'telemetry':
+                committed[fields['uptime_s']] = now
+        return result
+
+    ingestion_queue._write_batch = timed_write_batch
+
+    manager = BLEConnectionManager(address=DEVICE)
+    stream = build_packets(packets, packet_format)
+    sent = [0.0] * packets
+    handler = manager._notification_handler
+
+    start = time.perf_counter()
+    for i, notifications in enumerate(stream):
+        if rate:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        sent[i] = time.perf_counter()
+        for data in notifications:
+            await handler(SENDER, data)
+        await asyncio.sleep(0)  # bleak livre chaque notification depuis la boucle
+    handler_s = time.perf_counter() - start
+
+    expected = packets - ingestion_queue.dropped
+    deadline = time.monotonic() + 120
+    while len(committed) < expected and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    total_s = time.perf_counter() - start
+    await ingestion_queue.stop()
+
+    latencies = [(committed[i] - sent[i]) * 1000 for i in range(packets) if i in committed]
+    return {
+        'handler_packets_per_s': round(packets / handler_s, 1),
+        'commit_packets_per_s': round(len(committed) / total_s, 1),
+        **percentiles(latencies),
+        'dropped': ingestion_queue.dropped,
+        'batches': ingestion_queue.batches
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit et latence notification -> commit")
+    parser.add_argument('--packets', type=int, default=20000, help="Paquets de télémétrie par mesure")
+    parser.add_argument('--rate', type=float, default=500, help="Cadence du régime 'paced' (paquets/s)")
+    parser.add_argument('--formats', default=','.join(FORMATS), help="Formats de télémétrie mesurés")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)  # Mode worker : "format:régime"
+    parser.add_argument('--json', help="Fichier JSON de sortie")
+    args = parser.parse_args()
+
+    if args.worker:
+        packet_format, regime = args.worker.split(':')
+        # Journalisation active (coût réel du handler) mais sans sortie
+        logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+        rate = args.rate if regime == 'paced' else 0
+        metrics = asyncio.run(measure(packet_format, args.packets, rate))
+        params = {'format': packet_format, 'regime': regime, 'packets': args.packets}
+        if rate:
+            params['rate'] = rate
+        emit([record('ingestion', 'notification_to_commit', params, metrics)], args.json)
+        return
+
+    results = []
+    for packet_format in (f for f in args.formats.split(',') if f):
+        for regime in ('max', 'paced'):
+            print(f"⏱️  Ingestion {packet_format} ({regime})...")
+            with tempfile.TemporaryDirectory(prefix='ingestion-') as workdir:
+                results += run_worker('ingestion.py', [
+                    '--worker', f"{packet_format}:{regime}",
+                    '--packets', str(args.packets), '--rate', str(args.rate)
+                ], isolated_env(workdir))
+    if args.json:
+        write_json(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
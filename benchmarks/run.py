@@ -0,0 +1,78 @@
+"""
+Suite de benchmarks de bout en bout
+
+Enchaîne les scénarios et écrit un seul document JSON par exécution :
+- ingestion.py        : débit et latence notification -> commit (_notification_handler)
+- endpoints.py        : latence des endpoints /api/telemetry/* et /api/events/* à 10k/1M/10M lignes
+- websocket_fanout.py : latence de diffusion WebSocket vers 1/50/500 clients
+
+    {"environment": {"commit": "...", "python": "...", ...},
+     "results": [{"benchmark": ..., "name": ..., "params": {...}, "metrics": {...}}, ...]}
+
+Comparaison de deux exécutions : python benchmarks/compare.py base.json head.json
+
+Usage :
+    python benchmarks/run.py                  # suite complète (volumes du dashboard en production)
+    python benchmarks/run.py --quick          # volumes réduits (CI, poste de développement)
+    python benchmarks/run.py --only endpoints --output results.json
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from harness import REPO_ROOT, environment, run_worker, write_json  # noqa: E402
+
+# Arguments de chaque scénario : suite complète / --quick
+SCENARIOS = {
+    'ingestion': (
+        'ingestion.py',
+        ['--packets', '20000', '--rate', '500'],
+        ['--packets', '5000', '--rate', '500']
+    ),
+    'endpoints': (
+        'endpoints.py',
+        ['--sizes', '10000,1000000,10000000', '--repeat', '30'],
+        ['--sizes', '10000,100000', '--repeat', '10']
+    ),
+    'websocket': (
+        'websocket_fanout.py',
+        ['--clients', '1,50,500', '--duration', '10', '--rate', '10'],
+        ['--clients', '1,50', '--duration', '5', '--rate', '10']
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks (sortie JSON comparable entre commits)")
+    parser.add_argument('--quick', action='store_true', help="Volumes réduits")
+    parser.add_argument('--only', default=','.join(SCENARIOS), help="Scénarios à exécuter")
+    parser.add_argument('--output', help="Fichier JSON (défaut: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    env = environment()
+    output = args.output or os.path.join(
+        REPO_ROOT, 'benchmarks', 'results',
+        f"{(env['commit'] or 'unknown')[:12]}{'-dirty' if env['dirty'] else ''}{'-quick' if args.quick else ''}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    results = []
+    for name in (n for n in args.only.split(',') if n):
+        if name not in SCENARIOS:
+            sys.exit(f"✗ Scénario inconnu: {name} ({', '.join(SCENARIOS)})")
+        script, full, quick = SCENARIOS[name]
+        print(f"\n=== {name} ===")
+        start = time.perf_counter()
+        results += run_worker(script, quick if args.quick else full, dict(os.environ))
+        print(f"✓ {name} en {time.perf_counter() - start:.1f} s")
+
+    env['quick'] = args.quick
+    write_json({'environment': env, 'results': results}, output)
+    print(f"\n✓ {len(results)} mesure(s) écrite(s) dans {output}")
+
+
+if __name__ == '__main__':
+    main()
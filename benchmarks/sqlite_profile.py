@@ -0,0 +1,169 @@
+"""
+Benchmark lecture/écriture concurrentes sur SQLite : profil 'default' vs 'production'
+
+Un thread d'écriture simule l'ingestion (lots de télémétrie, une transaction
+par lot) pendant que des threads de lecture simulent le dashboard (dernier
+historique + agrégat sur la dernière heure).
+
+Usage :
+    python benchmarks/sqlite_profile.py --duration 10 --readers 4 --batch 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.models.database import Base, create_engines  # noqa: E402
+from app.models.telemetry import Telemetry  # noqa: E402
+
+
+def make_rows(count: int, start: datetime) -> list:
+    """Lignes de télémétrie synthétiques"""
+    return [
+        {
+            'packet_id': str(uuid.uuid4()),
+            'timestamp': start + timedelta(milliseconds=i * 100),
+            'received_at': start + timedelta(milliseconds=i * 100),
+            'uptime_s': i,
+            'mode': 'auto' if i % 3 else 'manual',
+            'distance_cm': float(i % 200),
+            'obstacle_events': i % 2,
+            'speed_pwm': i % 255,
+            'dist_traveled_cm': 1.5,
+            'processed': True,
+            'archived': False
+        }
+        for i in range(count)
+    ]
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run_profile(profile: str, duration: float, readers: int, batch: int, seed_rows: int) -> dict:
+    """Exécute le scénario pour un profil et retourne les mesures"""
+    tmpdir = tempfile.mkdtemp(prefix='sqlite-bench-')
+    db_path = os.path.join(tmpdir, 'bench.db')
+    writer_engine, reader_engine = create_engines(db_path, profile)
+    Base.metadata.create_all(bind=writer_engine)
+
+    Writer = sessionmaker(bind=writer_engine)
+    Reader = sessionmaker(bind=reader_engine)
+
+    start_ts = datetime.utcnow() - timedelta(hours=2)
+    db = Writer()
+    db.bulk_insert_mappings(Telemetry, make_rows(seed_rows, start_ts))
+    db.commit()
+    db.close()
+
+    stop = threading.Event()
+    results = {'writes': 0, 'write_errors': 0, 'write_ms': [], 'reads': 0, 'read_errors': 0, 'read_ms': []}
+    lock = threading.Lock()
+
+    def writer_loop():
+        ts = datetime.utcnow()
+        while not stop.is_set():
+            rows = make_rows(batch, ts)
+            ts += timedelta(seconds=batch)
+            t0 = time.perf_counter()
+            session = Writer()
+            try:
+                session.bulk_insert_mappings(Telemetry, rows)
+                session.commit()
+                elapsed = (time.perf_counter() - t0) * 1000
+                with lock:
+                    results['writes'] += len(rows)
+                    results['write_ms'].append(elapsed)
+            except OperationalError:
+                session.rollback()
+                with lock:
+                    results['write_errors'] += 1
+            finally:
+                session.close()
+
+    def reader_loop():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            session = Reader()
+            try:
+                session.query(Telemetry).order_by(Telemetry.timestamp.desc()).limit(100).all()
+                cutoff = datetime.utcnow() - timedelta(hours=1)
+                session.query(
+                    func.count(Telemetry.id), func.avg(Telemetry.speed_pwm), func.max(Telemetry.distance_cm)
+                ).filter(Telemetry.timestamp >= cutoff).one()
+                # Parcours complet (analyse type dashboard)
+                session.query(func.sum(Telemetry.dist_traveled_cm)).scalar()
+                elapsed = (time.perf_counter() - t0) * 1000
+                with lock:
+                    results['reads'] += 1
+                    results['read_ms'].append(elapsed)
+            except OperationalError:
+                with lock:
+                    results['read_errors'] += 1
+            finally:
+                session.close()
+
+    threads = [threading.Thread(target=writer_loop)] + [threading.Thread(target=reader_loop) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    writer_engine.dispose()
+    reader_engine.dispose()
+    for name in os.listdir(tmpdir):
+        os.remove(os.path.join(tmpdir, name))
+    os.rmdir(tmpdir)
+
+    return {
+        'profile': profile,
+        'rows_written_per_s': round(results['writes'] / duration, 1),
+        'write_p50_ms': round(percentile(results['write_ms'], 0.5), 2),
+        'write_p99_ms': round(percentile(results['write_ms'], 0.99), 2),
+        'write_errors': results['write_errors'],
+        'reads_per_s': round(results['reads'] / duration, 1),
+        'read_p50_ms': round(percentile(results['read_ms'], 0.5), 2),
+        'read_p99_ms': round(percentile(results['read_ms'], 0.99), 2),
+        'read_errors': results['read_errors'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite : lectures/écritures concurrentes par profil")
+    parser.add_argument('--duration', type=float, default=10, help="Durée par profil (secondes)")
+    parser.add_argument('--readers', type=int, default=4, help="Threads de lecture")
+    parser.add_argument('--batch', type=int, default=50, help="Lignes par transaction d'écriture")
+    parser.add_argument('--seed-rows', type=int, default=200000, help="Lignes présentes avant la mesure")
+    parser.add_argument('--profiles', default='default,production', help="Profils à comparer")
+    args = parser.parse_args()
+
+    rows = []
+    for profile in args.profiles.split(','):
+        print(f"⏱️  Profil '{profile}' ({args.duration}s, {args.readers} lecteurs, lots de {args.batch})...")
+        rows.append(run_profile(profile, args.duration, args.readers, args.batch, args.seed_rows))
+
+    columns = list(rows[0].keys())
+    print()
+    print(' | '.join(f"{c:>18}" for c in columns))
+    for row in rows:
+        print(' | '.join(f"{row[c]!s:>18}" for c in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Micro-benchmark du paquet de télémétrie : JSON historique contre trame binaire
+
+Mesure, pour chaque format, la taille sur le lien, le nombre de notifications
+BLE de 20 octets, le coût du décodage seul et celui du framer + décodage.
+
+Usage :
+    python benchmarks/telemetry_protocol.py --iterations 200000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.api  # noqa: E402,F401  (initialise app.api avant app.services : imports croisés)
+from app.services.framer import PacketFramer  # noqa: E402
+from app.services.telemetry_protocol import decode_telemetry, encode_telemetry  # noqa: E402
+
+NOTIFICATION_SIZE = 20
+
+# Paquet typique du firmware (MetricsManager::getTelemetryPacket)
+TELEMETRY = {
+    'uptime_s': 86400, 'mode': 'AUTO', 'distance_cm': 123.45, 'last_ir_cmd': '0xff02fd',
+    'light_level': 512, 'speed_pwm': 150, 'dist_traveled_cm': 98765.43
+}
+
+
+def measure(decode, packet: bytes, iterations: int) -> int:
+    """Coût moyen d'un appel en nanosecondes"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode(packet)
+    return round((time.perf_counter() - start) / iterations * 1e9)
+
+
+def measure_stream(decode, packet: bytes, iterations: int) -> int:
+    """Coût moyen framer + décodage d'un paquet découpé en notifications, en nanosecondes"""
+    notifications = [packet[i:i + NOTIFICATION_SIZE] for i in range(0, len(packet), NOTIFICATION_SIZE)]
+    framer = PacketFramer()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for notification in notifications:
+            for frame in framer.feed(notification):
+                decode(frame)
+    return round((time.perf_counter() - start) / iterations * 1e9)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark du format de télémétrie")
+    parser.add_argument('--iterations', type=int, default=200000, help="Paquets décodés par mesure")
+    args = parser.parse_args()
+
+    json_packet = (json.dumps(TELEMETRY, separators=(',', ':')) + '\r\n').encode()
+    binary_packet = encode_telemetry(TELEMETRY)
+    assert decode_telemetry(binary_packet) == TELEMETRY
+
+    formats = [
+        ('json', json_packet, lambda p: json.loads(p.decode('utf-8', errors='ignore').strip())),
+        ('binary', binary_packet, decode_telemetry),
+    ]
+    rows = []
+    for name, packet, decode in formats:
+        rows.append({
+            'format': name,
+            'bytes': len(packet),
+            'notifications': -(-len(packet) // NOTIFICATION_SIZE),
+            'decode_ns': measure(decode, packet, args.iterations),
+            'framed_decode_ns': measure_stream(decode, packet, args.iterations)
+        })
+
+    columns = list(rows[0].keys())
+    print(' | '.join(f"{c:>16}" for c in columns))
+    for row in rows:
+        print(' | '.join(f"{row[c]!s:>16}" for c in columns))
+
+
+if __name__ == '__main__':
+    main()
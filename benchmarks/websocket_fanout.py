@@ -0,0 +1,131 @@
+"""
+Latence de diffusion WebSocket selon le nombre de clients
+
+Le serveur tourne dans un processus séparé (uvicorn, BLE_BACKEND=simulator,
+base isolée) ; un robot virtuel émet la télémétrie à --rate paquets/s. N
+clients WebSocket réels (bibliothèque websockets) reçoivent les notifications
+sur /ws/ble-notifications ; la latence va du traitement du paquet par le
+serveur (champ 'timestamp' de la notification) à la réception par le client.
+
+Usage :
+    python benchmarks/websocket_fanout.py --clients 1,50,500 --duration 10 --rate 10 --json ws.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from harness import emit, free_port, isolated_env, percentiles, record, wait_for_port  # noqa: E402
+
+try:
+    import websockets
+except ImportError:  # Fourni par uvicorn[standard]
+    websockets = None
+
+ROBOT = '5A:00:00:00:00:01'
+
+
+async def client_loop(url: str, latencies: list, counts: list, index: int, ready: asyncio.Event, stop: asyncio.Event):
+    """Client WebSocket : enregistre la latence de chaque notification reçue"""
+    async with websockets.connect(url, max_queue=None, open_timeout=60) as ws:
+        ready.set()
+        while not stop.is_set():
+            try:
+                frame = await asyncio.wait_for(ws.recv(), 0.5)
+            except asyncio.TimeoutError:
+                continue
+            received = datetime.now()
+            message = json.loads(frame)
+            if message.get('type') != 'ble_notification':
+                continue
+            latencies.append((received - datetime.fromisoformat(message['timestamp'])).total_seconds() * 1000)
+            counts[index] += 1
+
+
+async def run_clients(port: int, clients: int, duration: float) -> dict:
+    """Connecte les clients, démarre le robot virtuel et collecte les latences"""
+    import httpx
+
+    base = f"http://127.0.0.1:{port}"
+    url = f"ws://127.0.0.1:{port}/ws/ble-notifications"
+    latencies, counts = [], [0] * clients
+    stop = asyncio.Event()
+    ready = [asyncio.Event() for _ in range(clients)]
+    tasks = [
+        asyncio.create_task(client_loop(url, latencies, counts, i, ready[i], stop))
+        for i in range(clients)
+    ]
+    await asyncio.wait_for(asyncio.gather(*(event.wait() for event in ready)), 120)
+
+    async with httpx.AsyncClient(base_url=base, timeout=60) as http:
+        await http.post('/api/ble/connect', params={'address': ROBOT})
+        await asyncio.sleep(duration)
+        await http.post('/api/ble/disconnect', params={'address': ROBOT})
+        await asyncio.sleep(1.0)  # Vidage des files d'envoi
+        stats = (await http.get('/api/diagnostic/simulator')).json()['simulator']
+
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    sent = sum(robot['telemetry_sent'] + robot['events_sent'] for robot in stats['robots'])
+    metrics = percentiles(latencies)
+    metrics['messages_per_s'] = round(len(latencies) / duration, 1)
+    metrics['delivered_ratio'] = round(sum(counts) / (sent * clients), 4) if sent else 0.0
+    return metrics
+
+
+def measure(clients: int, duration: float, rate: float) -> dict:
+    """Démarre un serveur isolé et mesure la diffusion vers N clients"""
+    port = free_port()
+    with tempfile.TemporaryDirectory(prefix='ws-') as workdir:
+        env = isolated_env(
+            workdir,
+            BLE_BACKEND='simulator',
+            BLE_DEVICE_ADDRESS=ROBOT,
+            BLE_SIMULATOR_ROBOTS=1,
+            BLE_SIMULATOR_TELEMETRY_HZ=rate,
+            BLE_SIMULATOR_EVENT_HZ=0
+        )
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'app.main:app', '--host', '127.0.0.1',
+             '--port', str(port), '--log-level', 'warning'],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for_port(port)
+            return asyncio.run(run_clients(port, clients, duration))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence de diffusion WebSocket selon le nombre de clients")
+    parser.add_argument('--clients', default='1,50,500', help="Nombres de clients mesurés")
+    parser.add_argument('--duration', type=float, default=10, help="Durée de diffusion par mesure (secondes)")
+    parser.add_argument('--rate', type=float, default=10, help="Télémétrie émise par le robot virtuel (paquets/s)")
+    parser.add_argument('--json', help="Fichier JSON de sortie")
+    args = parser.parse_args()
+
+    if websockets is None:
+        sys.exit("✗ Bibliothèque 'websockets' requise (pip install 'uvicorn[standard]')")
+
+    results = []
+    for clients in (int(n) for n in args.clients.split(',') if n):
+        print(f"⏱️  Diffusion WebSocket vers {clients} client(s)...")
+        start = time.perf_counter()
+        metrics = measure(clients, args.duration, args.rate)
+        print(f"   ({time.perf_counter() - start:.1f} s)")
+        results.append(record('websocket', 'broadcast', {'clients': clients, 'rate': args.rate}, metrics))
+    emit(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
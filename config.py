@@ -11,9 +11,101 @@ class Config:
     # Configuration Bluetooth
     BLE_DEVICE_ADDRESS = os.environ.get('BLE_DEVICE_ADDRESS') or '48:87:2d:76:b3:1d'
     BLE_UUID_WRITE = os.environ.get('BLE_UUID_WRITE') or 'FFE2'
+    # Flotte : adresses MAC supplémentaires séparées par des virgules
+    BLE_DEVICE_ADDRESSES = os.environ.get('BLE_DEVICE_ADDRESSES') or ''
     
     # Configuration CORS
     CORS_ORIGINS = ["*"]  # En production, spécifier les domaines autorisés
     
     # Limite de taille des requêtes (16 MB)
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024
\ No newline at end of file
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+    
+    # Ingestion BLE -> BDD (écriture différée par lots)
+    INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE') or 200)
+    INGEST_FLUSH_INTERVAL_MS = int(os.environ.get('INGEST_FLUSH_INTERVAL_MS') or 500)
+    INGEST_MAX_QUEUE = int(os.environ.get('INGEST_MAX_QUEUE') or 10000)
+    # Nouveaux essais d'un lot dont la transaction a échoué (avant de le compter perdu)
+    INGEST_RETRY_ATTEMPTS = int(os.environ.get('INGEST_RETRY_ATTEMPTS') or 3)
+    # Idempotence : clés (robot, uptime_s, checksum) récentes gardées en mémoire (0 = contrôle en base seulement)
+    INGEST_DEDUPE_WINDOW = int(os.environ.get('INGEST_DEDUPE_WINDOW') or 10000)
+    
+    # Diffusion WebSocket : file d'envoi bornée par client
+    WS_SEND_QUEUE_SIZE = int(os.environ.get('WS_SEND_QUEUE_SIZE') or 256)
+    # Client en retard : 'drop_oldest', 'latest' (dernier message seulement) ou 'disconnect'
+    WS_OVERFLOW_POLICY = os.environ.get('WS_OVERFLOW_POLICY') or 'drop_oldest'
+    WS_SEND_TIMEOUT_S = float(os.environ.get('WS_SEND_TIMEOUT_S') or 10)
+    # Télémétrie en delta : paquet complet (keyframe) tous les N paquets
+    WS_DELTA_KEYFRAME_INTERVAL = int(os.environ.get('WS_DELTA_KEYFRAME_INTERVAL') or 20)
+    
+    # Archive froide : segments colonnaires de la télémétrie archivée (un fichier par jour)
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive')
+    
+    # Fichier SQLite (défaut: robot_data.db à la racine du projet)
+    DB_PATH = os.environ.get('DB_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'robot_data.db')
+    
+    # Profil SQLite : 'production' (WAL, pragmas, écriture unique + pool de lecture) ou 'default'
+    DB_PROFILE = os.environ.get('DB_PROFILE') or 'production'
+    DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS') or 'NORMAL'
+    DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS') or 5000)
+    DB_MMAP_SIZE_MB = int(os.environ.get('DB_MMAP_SIZE_MB') or 256)
+    DB_READ_POOL_SIZE = int(os.environ.get('DB_READ_POOL_SIZE') or 4)
+    # Suppression des paquets en double d'une base existante au démarrage (copiés dans telemetry_duplicates_backup)
+    DB_DEDUPE_ON_STARTUP = (os.environ.get('DB_DEDUPE_ON_STARTUP') or 'false').lower() in ('1', 'true', 'yes')
+
+    # Cache des réponses de lecture, invalidé par l'ingestion (filigrane)
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES') or 256)
+    # Âge maximum d'une entrée (fenêtres glissantes "X dernières heures") ; 0 = sans limite
+    RESPONSE_CACHE_MAX_AGE_S = float(os.environ.get('RESPONSE_CACHE_MAX_AGE_S') or 60)
+
+    # État en direct du dashboard (topic WebSocket 'live') : événements récents du snapshot
+    LIVE_STATE_EVENTS = int(os.environ.get('LIVE_STATE_EVENTS') or 20)
+
+    # Règles de classification des événements (fichier JSON) ; vide = règles par défaut
+    EVENT_RULES_FILE = os.environ.get('EVENT_RULES_FILE') or None
+
+    # Backend BLE : 'bleak' (robots physiques) ou 'simulator' (robots virtuels, sans matériel)
+    BLE_BACKEND = os.environ.get('BLE_BACKEND') or 'bleak'
+    # Simulateur : nombre minimal de robots virtuels (en plus des adresses configurées)
+    BLE_SIMULATOR_ROBOTS = int(os.environ.get('BLE_SIMULATOR_ROBOTS') or 1)
+    # Cadences par robot (le firmware envoie la télémétrie toutes les 30 s)
+    BLE_SIMULATOR_TELEMETRY_HZ = float(os.environ.get('BLE_SIMULATOR_TELEMETRY_HZ') or 1.0)
+    BLE_SIMULATOR_EVENT_HZ = float(os.environ.get('BLE_SIMULATOR_EVENT_HZ') or 0.1)
+    # Format de télémétrie émis : 'binary' (trame 0x11) ou 'json' (anciens firmwares)
+    BLE_SIMULATOR_FORMAT = os.environ.get('BLE_SIMULATOR_FORMAT') or 'binary'
+    BLE_SIMULATOR_MTU = int(os.environ.get('BLE_SIMULATOR_MTU') or 20)
+    # Gigue maximale entre deux notifications, probabilité de perte d'une notification
+    BLE_SIMULATOR_JITTER_MS = float(os.environ.get('BLE_SIMULATOR_JITTER_MS') or 0)
+    BLE_SIMULATOR_DROP_RATE = float(os.environ.get('BLE_SIMULATOR_DROP_RATE') or 0)
+    # Déconnexions subies par robot et par minute (0 = jamais)
+    BLE_SIMULATOR_DISCONNECT_RATE = float(os.environ.get('BLE_SIMULATOR_DISCONNECT_RATE') or 0)
+    BLE_SIMULATOR_MAX_COMMANDS = int(os.environ.get('BLE_SIMULATOR_MAX_COMMANDS') or 1000)
+    # Graine des robots virtuels (scénarios reproductibles) ; vide = aléatoire
+    BLE_SIMULATOR_SEED = int(os.environ['BLE_SIMULATOR_SEED']) if os.environ.get('BLE_SIMULATOR_SEED') else None
+
+    # Commandes BLE : délai minimal entre deux écritures (par fragment de 20 octets), file par voie
+    BLE_COMMAND_INTERVAL_MS = float(os.environ.get('BLE_COMMAND_INTERVAL_MS') or 15)
+    BLE_COMMAND_MAX_PENDING = int(os.environ.get('BLE_COMMAND_MAX_PENDING') or 32)
+    # Mode d'écriture GATT : 'auto' (sans réponse si la caractéristique le permet), 'response' ou 'without-response'
+    BLE_WRITE_MODE = os.environ.get('BLE_WRITE_MODE') or 'auto'
+
+    # Reconnexion automatique après une perte de liaison : délai initial et plafond du backoff exponentiel (gigue incluse)
+    BLE_AUTO_RECONNECT = (os.environ.get('BLE_AUTO_RECONNECT') or 'true').lower() in ('1', 'true', 'yes')
+    BLE_RECONNECT_BASE_S = float(os.environ.get('BLE_RECONNECT_BASE_S') or 1.0)
+    BLE_RECONNECT_MAX_S = float(os.environ.get('BLE_RECONNECT_MAX_S') or 60.0)
+
+    # Scanner BLE continu (table des appareils à proximité pour /api/ble/scan et la reconnexion)
+    BLE_SCANNER_ENABLED = (os.environ.get('BLE_SCANNER_ENABLED') or 'false').lower() in ('1', 'true', 'yes')
+    # Délai sans advertising au-delà duquel un appareil sort de la table (secondes)
+    BLE_SCAN_EXPIRY_S = float(os.environ.get('BLE_SCAN_EXPIRY_S') or 30)
+
+    # Cache disque de la disposition GATT par robot (handles et propriétés) : reconnexion sans énumération
+    GATT_CACHE_ENABLED = (os.environ.get('GATT_CACHE_ENABLED') or 'true').lower() in ('1', 'true', 'yes')
+    GATT_CACHE_FILE = os.environ.get('GATT_CACHE_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gatt_cache.json')
+
+    # Journalisation par paquet BLE en INFO : un paquet sur N (0 = aucun ; tous en DEBUG)
+    LOG_PACKET_SAMPLE = int(os.environ.get('LOG_PACKET_SAMPLE') or 100)
+    # Dernières trames BLE brutes conservées en mémoire (/api/diagnostic/frames) ; 0 = désactivé
+    FRAME_CAPTURE_SIZE = int(os.environ.get('FRAME_CAPTURE_SIZE') or 500)
+
+    # Endpoint /metrics (format Prometheus) et latence des requêtes HTTP par route
+    METRICS_ENABLED = (os.environ.get('METRICS_ENABLED') or 'true').lower() in ('1', 'true', 'yes')
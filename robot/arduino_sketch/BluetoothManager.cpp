@@ -27,6 +27,11 @@ void BluetoothManager::sendTelemetry(const String& packet) {
     _lastPingTime = millis(); // Update last communication time
 }
 
+void BluetoothManager::sendFrame(const uint8_t* frame, size_t length) {
+    Serial.write(frame, length);
+    _lastPingTime = millis(); // Update last communication time
+}
+
 void BluetoothManager::checkIncomingMessages() {
     // Poll for incoming messages from the Bluetooth module
     String incomingMessage = "";
@@ -8,6 +8,7 @@ public:
     BluetoothManager();
     void setup(long baudRate = 9600);
     void sendTelemetry(const String& packet);
+    void sendFrame(const uint8_t* frame, size_t length); // Binary frame, no line ending
     bool isConnected();
     void checkIncomingMessages(); // Poll for incoming BT connection messages
 
@@ -60,3 +60,50 @@ String MetricsManager::getTelemetryPacket() {
 
     return packet;
 }
+
+// Mode byte of the binary frame (index in MODES on the host side)
+static uint8_t modeCode(const String& mode) {
+    if (mode == "STARTING") return 1;
+    if (mode == "WAITING_BT") return 2;
+    if (mode == "MANUAL") return 3;
+    if (mode == "AUTO") return 4;
+    if (mode == "OBSTACLE") return 5;
+    return 0; // UNKNOWN
+}
+
+static uint8_t* putU16(uint8_t* p, uint16_t value) {
+    p[0] = value & 0xFF;
+    p[1] = (value >> 8) & 0xFF;
+    return p + 2;
+}
+
+static uint8_t* putU32(uint8_t* p, uint32_t value) {
+    for (uint8_t i = 0; i < 4; i++) {
+        p[i] = (value >> (8 * i)) & 0xFF;
+    }
+    return p + 4;
+}
+
+void MetricsManager::getTelemetryFrame(uint8_t* frame) {
+    // Distance in hundredths of cm, clamped to the uint16 range
+    float distance = constrain(_metrics.ultrasonic_distance_cm, 0.0, 655.35);
+    uint32_t traveled;
+    memcpy(&traveled, &_metrics.distance_traveled_cm, sizeof(traveled)); // IEEE 754 float32
+
+    uint8_t* p = frame;
+    *p++ = TELEMETRY_OPCODE_V1;
+    p = putU32(p, _metrics.uptime_s);
+    *p++ = modeCode(_metrics.current_mode);
+    p = putU16(p, (uint16_t)(distance * 100 + 0.5));
+    p = putU32(p, _metrics.last_ir_command);
+    p = putU16(p, (uint16_t)constrain(_metrics.light_level, 0, 0xFFFF));
+    *p++ = (uint8_t)constrain(_metrics.current_speed_pwm, 0, 255);
+    p = putU32(p, traveled);
+
+    // Checksum: XOR of the previous bytes
+    uint8_t checksum = 0;
+    for (uint8_t i = 0; i < TELEMETRY_FRAME_SIZE - 1; i++) {
+        checksum ^= frame[i];
+    }
+    *p = checksum;
+}
@@ -4,6 +4,16 @@
 #include <Arduino.h>
 #include "MotorController.h"
 
+// Telemetry format: 1 = fixed-layout binary frame (one 20-byte BLE notification),
+// 0 = legacy JSON packet (~150 bytes). The host accepts both.
+#ifndef TELEMETRY_BINARY
+#define TELEMETRY_BINARY 1
+#endif
+
+// Binary telemetry frame, layout version 1 (see app/services/telemetry_protocol.py)
+#define TELEMETRY_OPCODE_V1 0x11
+#define TELEMETRY_FRAME_SIZE 20
+
 // Data structure to hold all robot metrics
 struct RobotMetrics {
     unsigned long uptime_s;
@@ -29,6 +39,9 @@ public:
     // Builds the telemetry data packet (JSON format)
     String getTelemetryPacket();
 
+    // Builds the binary telemetry frame (TELEMETRY_FRAME_SIZE bytes, little-endian)
+    void getTelemetryFrame(uint8_t* frame);
+
     // Allows direct access to the metrics data if needed
     const RobotMetrics& getMetrics() const;
 
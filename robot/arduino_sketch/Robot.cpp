@@ -370,7 +370,13 @@ void Robot::updateMetrics() {
 void Robot::sendTelemetryIfNeeded() {
     if (millis() - _telemetryTimer > TELEMETRY_INTERVAL) {
         _telemetryTimer = millis();
+#if TELEMETRY_BINARY
+        uint8_t frame[TELEMETRY_FRAME_SIZE];
+        _metricsManager.getTelemetryFrame(frame);
+        _btManager.sendFrame(frame, TELEMETRY_FRAME_SIZE);
+#else
         String packet = _metricsManager.getTelemetryPacket();
         _btManager.sendTelemetry(packet);
+#endif
     }
 }
@@ -0,0 +1,28 @@
+"""
+Configuration des tests : base, archive et cache GATT dans un dossier temporaire,
+backend BLE simulé (aucun adaptateur Bluetooth requis)
+
+Les variables d'environnement sont posées avant le premier import de config.py.
+"""
+import os
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix='robot-tests-')
+os.environ['DB_PATH'] = os.path.join(_TMP_DIR, 'test.db')
+os.environ['ARCHIVE_DIR'] = os.path.join(_TMP_DIR, 'archive')
+os.environ['GATT_CACHE_FILE'] = os.path.join(_TMP_DIR, 'gatt_cache.json')
+os.environ['BLE_BACKEND'] = 'simulator'
+os.environ['BLE_SCANNER_ENABLED'] = 'false'
+
+import pytest  # noqa: E402
+
+# app.api avant app.services (les services importent le gestionnaire WebSocket)
+import app.api  # noqa: E402,F401
+
+
+@pytest.fixture(scope='session')
+def database():
+    """Base SQLite de test, tables créées une fois"""
+    from app.models.database import init_db
+    init_db()
+    return os.environ['DB_PATH']
@@ -0,0 +1,110 @@
+"""
+Segments d'archive colonnaires : écriture puis relecture à l'identique
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import archive
+from config import Config
+
+DAY = datetime(2025, 3, 14)
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    """Archive vide dans un dossier temporaire"""
+    monkeypatch.setattr(Config, 'ARCHIVE_DIR', str(tmp_path))
+    monkeypatch.setattr(archive, '_catalog', None)
+    return tmp_path
+
+
+def make_columns(rows: int = 5) -> dict:
+    """Colonnes d'un jour, triées par horodatage, avec NULL et chaînes non ASCII"""
+    columns = {name: [] for name in archive.COLUMN_NAMES}
+    for i in range(rows):
+        ts = DAY + timedelta(hours=i, microseconds=i * 7)
+        values = {
+            'id': i + 1,
+            'packet_id': f"pkt-{i}",
+            'device_address': 'AA:00:00:00:00:01' if i % 2 == 0 else 'aa:00:00:00:00:02',
+            'timestamp': ts,
+            'received_at': ts + timedelta(milliseconds=3),
+            'uptime_s': 100 + i if i != 2 else None,
+            'mode': 'auto' if i < 3 else 'manual',
+            'distance_cm': 12.5 * i,
+            'obstacle_events': i,
+            'last_ir_cmd': None if i == 1 else f"0x{i:x}",
+            'speed_pwm': 200,
+            'dist_traveled_cm': 1.25 * i if i != 4 else None,
+            'battery_level': 90 - i,
+            'signal_strength': -60,
+            'packet_raw': f'{{"note": "obstacle évité n°{i}"}}',
+            'checksum': f"{i:064x}",
+            'processed': i % 2 == 0,
+            'archived': True,
+        }
+        for name in archive.COLUMN_NAMES:
+            columns[name].append(values[name])
+    return columns
+
+
+def test_segment_round_trip(archive_dir):
+    columns = make_columns()
+    entry = archive.write_segment(DAY, columns)
+
+    assert entry['path'] == archive.segment_path(DAY)
+    assert entry['rows'] == 5
+    with archive.Segment(entry['path']) as seg:
+        assert seg.all_columns() == columns
+
+
+def test_catalog_is_rebuilt_from_segment_headers(archive_dir):
+    archive.write_segment(DAY, make_columns())
+    archive.reload_catalog()
+
+    entries = archive.segments()
+    assert [entry['day'] for entry in entries] == ['2025-03-14']
+    assert entries[0]['rows'] == 5
+
+
+def test_iter_rows_filters_by_time_mode_and_device(archive_dir):
+    columns = make_columns()
+    archive.write_segment(DAY, columns)
+
+    rows = list(archive.iter_rows(start=DAY + timedelta(hours=1), end=DAY + timedelta(hours=4), fields=('id',)))
+    assert rows == [(2,), (3,), (4,)]
+
+    rows = list(archive.iter_rows(mode='manual', fields=('id',)))
+    assert rows == [(4,), (5,)]
+
+    # Adresse comparée sans tenir compte de la casse (segments écrits avant la normalisation)
+    rows = list(archive.iter_rows(device='AA:00:00:00:00:02', fields=('id', 'device_address')))
+    assert rows == [(2, 'aa:00:00:00:00:02'), (4, 'aa:00:00:00:00:02')]
+
+    rows = list(archive.iter_rows(descending=True, fields=('id',)))
+    assert rows == [(5,), (4,), (3,), (2,), (1,)]
+
+
+def test_segments_are_only_deleted_after_the_commit(archive_dir, database):
+    from app.models.database import SessionLocal
+    from app.models.statistics import delete_telemetry_before
+
+    entry = archive.write_segment(DAY, make_columns())
+    cutoff = DAY + timedelta(hours=2)
+    assert archive.pending_delete(cutoff) == (2, DAY + timedelta(hours=2, microseconds=14))
+
+    # Transaction annulée : segment et catalogue intacts
+    db = SessionLocal()
+    try:
+        assert delete_telemetry_before(db, cutoff) == 2
+        db.rollback()
+    finally:
+        db.close()
+    with archive.Segment(entry['path']) as seg:
+        assert seg.rows == 5
+    assert archive.segments()[0]['rows'] == 5
+
+    # Après le commit, l'appelant supprime les lignes archivées
+    assert archive.delete_before(cutoff) == 2
+    assert archive.segments()[0]['rows'] == 3
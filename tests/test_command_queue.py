@@ -0,0 +1,122 @@
+"""
+File de commandes BLE (CommandScheduler) : voies de priorité, fusion, rejet
+"""
+import asyncio
+
+import pytest
+
+from app.services.command_queue import CommandScheduler, classify_command, motor_command
+
+TEXT = bytes([0x01]) + b'HELLO'
+IMAGE_A = bytes([0x02]) + bytes(16)
+IMAGE_B = bytes([0x02]) + bytes([0xFF] * 16)
+
+
+class BlockingWriter:
+    """Écriture GATT factice : la première écriture attend gate, les suivantes passent"""
+
+    def __init__(self):
+        self.sent = []
+        self.gate = asyncio.Event()
+
+    async def __call__(self, data: bytes) -> bool:
+        self.sent.append(data)
+        if len(self.sent) == 1:
+            await self.gate.wait()
+        return True
+
+
+async def _busy_scheduler(**kwargs):
+    """Ordonnanceur dont la tâche d'envoi est bloquée dans une première écriture (texte)"""
+    writer = BlockingWriter()
+    scheduler = CommandScheduler('AA:00:00:00:00:01', writer, interval_ms=0, **kwargs)
+    first = asyncio.create_task(scheduler.submit(TEXT))
+    while not writer.sent:
+        await asyncio.sleep(0)
+    return scheduler, writer, first
+
+
+def test_classify_command():
+    assert classify_command(motor_command('stop')) == ('emergency', 'motor')
+    assert classify_command(motor_command('forward', 200)) == ('control', 'motor')
+    assert classify_command(TEXT) == ('display', 'text')
+    assert classify_command(IMAGE_A) == ('display', 'image')
+    assert classify_command(b'\x7f\x00') == ('display', None)
+
+
+def test_motor_command_frame():
+    assert motor_command('left', 300) == bytes([0x03, 0x03, 0xFF])
+    with pytest.raises(ValueError):
+        motor_command('jump')
+
+
+def test_pending_commands_with_same_key_are_coalesced():
+    async def scenario():
+        scheduler, writer, first = await _busy_scheduler()
+        pending = [asyncio.create_task(scheduler.submit(image)) for image in (IMAGE_A, IMAGE_B)]
+        await asyncio.sleep(0)
+        writer.gate.set()
+        results = await asyncio.gather(first, *pending)
+        await scheduler.stop()
+        return scheduler, writer, results
+
+    scheduler, writer, results = asyncio.run(scenario())
+    # Seule la dernière image est envoyée ; les deux appelants sont notifiés de son envoi
+    assert writer.sent == [TEXT, IMAGE_B]
+    assert results == [True, True, True]
+    assert scheduler.coalesced == 1
+    assert scheduler.sent == 2
+
+
+def test_emergency_stop_preempts_and_supersedes_motor_commands():
+    async def scenario():
+        scheduler, writer, first = await _busy_scheduler()
+        pending = [
+            asyncio.create_task(scheduler.submit(IMAGE_A)),
+            asyncio.create_task(scheduler.submit(motor_command('forward', 200))),
+            asyncio.create_task(scheduler.submit(motor_command('stop'))),
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.pending() == {'emergency': 1, 'control': 0, 'display': 1}
+        writer.gate.set()
+        results = await asyncio.gather(first, *pending)
+        await scheduler.stop()
+        return scheduler, writer, results
+
+    scheduler, writer, results = asyncio.run(scenario())
+    # L'arrêt passe devant l'image et remplace la commande moteur en attente
+    assert writer.sent == [TEXT, motor_command('stop'), IMAGE_A]
+    assert results == [True, True, True, True]
+    assert scheduler.coalesced == 1
+
+
+def test_full_lane_rejects_command():
+    async def scenario():
+        scheduler, writer, first = await _busy_scheduler(max_pending=1)
+        queued = asyncio.create_task(scheduler.submit(b'\x7f\x01'))
+        await asyncio.sleep(0)
+        rejected = await scheduler.submit(b'\x7f\x02')
+        writer.gate.set()
+        await asyncio.gather(first, queued)
+        await scheduler.stop()
+        return scheduler, rejected
+
+    scheduler, rejected = asyncio.run(scenario())
+    assert rejected is False
+    assert scheduler.rejected == 1
+
+
+def test_stop_cancels_pending_commands():
+    async def scenario():
+        scheduler, writer, first = await _busy_scheduler()
+        pending = asyncio.create_task(scheduler.submit(IMAGE_A))
+        await asyncio.sleep(0)
+        await scheduler.stop()
+        return scheduler, await pending, await first
+
+    scheduler, result, in_flight = asyncio.run(scenario())
+    # Commande en attente abandonnée, écriture en cours interrompue : aucun appelant bloqué
+    assert result is False
+    assert in_flight is False
+    assert scheduler.cancelled == 1
+    assert not scheduler.is_running
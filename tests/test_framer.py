@@ -0,0 +1,116 @@
+"""
+Réassemblage des notifications BLE (PacketFramer)
+"""
+from app.services.framer import PacketFramer
+from app.services.telemetry_protocol import decode_telemetry, encode_telemetry
+
+TELEMETRY_JSON = b'{"uptime_s":120,"mode":"AUTO","distance_cm":42.5,"speed_pwm":180,"dist_traveled_cm":310.5}'
+
+TELEMETRY = {
+    'uptime_s': 120,
+    'mode': 'AUTO',
+    'distance_cm': 42.5,
+    'last_ir_cmd': '0x0',
+    'light_level': 512,
+    'speed_pwm': 180,
+    'dist_traveled_cm': 310.5
+}
+
+
+def chunks(data: bytes, size: int = 20):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def feed_all(framer: PacketFramer, notifications) -> list:
+    frames = []
+    for notification in notifications:
+        frames += framer.feed(notification)
+    return frames
+
+
+def test_json_packet_split_in_20_byte_notifications():
+    framer = PacketFramer()
+    notifications = chunks(TELEMETRY_JSON + b'\r\n')
+    assert len(notifications) > 1
+
+    # Aucun paquet tant que l'accolade fermante n'est pas reçue
+    for notification in notifications[:-1]:
+        assert framer.feed(notification) == []
+    assert framer.feed(notifications[-1]) == [TELEMETRY_JSON]
+    assert framer.get_stats()['buffered_bytes'] == 0
+
+
+def test_concatenated_packets_and_text_lines():
+    framer = PacketFramer()
+    stream = TELEMETRY_JSON + b'\r\nObstacle detecte\r\n' + TELEMETRY_JSON + b'\r\n'
+
+    assert feed_all(framer, chunks(stream, 7)) == [TELEMETRY_JSON, b'Obstacle detecte', TELEMETRY_JSON]
+    assert framer.frames == 3
+    assert framer.resyncs == 0
+
+
+def test_text_line_waits_for_newline():
+    framer = PacketFramer()
+    assert framer.feed(b'Batterie fai') == []
+    assert framer.feed(b'ble\n') == [b'Batterie faible']
+
+
+def test_resync_after_lost_packet_start():
+    framer = PacketFramer()
+    # Fin d'un paquet JSON dont le début a été perdu, puis un paquet complet
+    frames = feed_all(framer, [b'_pwm":180}\r\n', TELEMETRY_JSON, b'\r\n'])
+
+    assert frames == [TELEMETRY_JSON]
+    assert framer.resyncs == 1
+    assert framer.discarded_bytes == len(b'_pwm":180}\r')
+
+
+def test_truncated_json_is_dropped_at_newline():
+    framer = PacketFramer()
+    frames = feed_all(framer, [b'{"uptime_s":1,"mo\r\n', TELEMETRY_JSON])
+
+    assert frames == [TELEMETRY_JSON]
+    assert framer.resyncs == 1
+
+
+def test_oversized_buffer_resyncs_on_next_packet_start():
+    framer = PacketFramer(max_frame_size=64)
+    assert framer.feed(b'x' * 100) == []
+    assert framer.get_stats()['buffered_bytes'] == 0
+    assert framer.discarded_bytes == 100
+
+    assert feed_all(framer, [TELEMETRY_JSON, b'\n']) == [TELEMETRY_JSON]
+
+
+def test_binary_frame_single_notification():
+    frame = encode_telemetry(TELEMETRY)
+    assert len(frame) == 20
+
+    framer = PacketFramer()
+    assert framer.feed(frame) == [frame]
+    assert decode_telemetry(frame) == TELEMETRY
+
+
+def test_binary_frame_split_and_followed_by_json():
+    frame = encode_telemetry(TELEMETRY)
+    framer = PacketFramer()
+
+    assert framer.feed(frame[:7]) == []
+    assert feed_all(framer, [frame[7:] + TELEMETRY_JSON[:10], TELEMETRY_JSON[10:]]) == [frame, TELEMETRY_JSON]
+
+
+def test_binary_frame_with_bad_checksum_is_skipped():
+    frame = encode_telemetry(TELEMETRY)
+    corrupted = frame[:-1] + bytes([frame[-1] ^ 0xFF])
+    framer = PacketFramer()
+
+    assert feed_all(framer, [corrupted, frame]) == [frame]
+    assert framer.resyncs >= 1
+
+
+def test_reset_clears_partial_packet():
+    framer = PacketFramer()
+    framer.feed(TELEMETRY_JSON[:15])
+    framer.reset()
+
+    assert feed_all(framer, [TELEMETRY_JSON]) == [TELEMETRY_JSON]
@@ -0,0 +1,168 @@
+"""
+Ingestion idempotente : fenêtre LRU, packet_id déterministe, doublons déjà en base,
+dédoublonnage d'une base existante
+"""
+import asyncio
+import hashlib
+import json
+import uuid
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from app.models.database import (
+    DUPLICATES_BACKUP_TABLE, TELEMETRY_UNIQUE_INDEX, SessionLocal, engine, migrate_schema
+)
+from app.models.telemetry import Event, Telemetry
+from app.services.ingestion import DedupeWindow, IngestionQueue, build_telemetry_row, telemetry_key
+
+
+def packet(uptime_s: int, distance: float = 10.0) -> dict:
+    return {'uptime_s': uptime_s, 'mode': 'AUTO', 'speed_pwm': 120, 'dist_traveled_cm': distance}
+
+
+def telemetry_item(device: str, uptime_s: int, distance: float = 10.0) -> tuple:
+    return ('telemetry', packet(uptime_s, distance), device, datetime.utcnow())
+
+
+def stored(device: str) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(Telemetry).filter(Telemetry.device_address == device).count()
+    finally:
+        db.close()
+
+
+def test_window_evicts_least_recently_used_key():
+    window = DedupeWindow(2)
+    window.add('a')
+    window.add('b')
+    assert 'a' in window  # 'a' redevient la clé la plus récente
+    window.add('c')
+
+    assert 'a' in window
+    assert 'b' not in window
+    assert 'c' in window
+    assert len(window) == 2
+
+
+def test_window_of_size_zero_keeps_nothing():
+    window = DedupeWindow(0)
+    window.add('a')
+    assert 'a' not in window
+    assert len(window) == 0
+
+
+def test_packet_id_is_derived_from_device_uptime_and_checksum():
+    received_at = datetime.utcnow()
+    first = build_telemetry_row(packet(5), 'AA:00:00:00:00:01', received_at)
+    again = build_telemetry_row(packet(5), 'AA:00:00:00:00:01', datetime.utcnow())
+    other_device = build_telemetry_row(packet(5), 'AA:00:00:00:00:02', received_at)
+    other_content = build_telemetry_row(packet(5, 11.0), 'AA:00:00:00:00:01', received_at)
+
+    assert first['packet_id'] == again['packet_id']
+    assert telemetry_key(first) == telemetry_key(again)
+    assert other_device['packet_id'] != first['packet_id']
+    assert other_content['packet_id'] != first['packet_id']
+
+
+def test_duplicates_in_batch_and_window_are_not_written(database):
+    device = 'DE:D0:00:00:00:01'
+    queue = IngestionQueue()
+
+    batch = [telemetry_item(device, u) for u in (1, 2, 1)]
+    _, _, duplicates, duplicates_db = queue._write_batch(batch)
+    assert (duplicates, duplicates_db) == (1, 0)
+
+    # Retransmission d'un paquet déjà écrit : écartée par la fenêtre
+    _, _, duplicates, duplicates_db = queue._write_batch([telemetry_item(device, 2), telemetry_item(device, 3)])
+    assert (duplicates, duplicates_db) == (1, 0)
+    assert stored(device) == 3
+
+
+def test_replay_after_restart_is_rejected_by_the_database(database):
+    device = 'DE:D0:00:00:00:02'
+    IngestionQueue()._write_batch([telemetry_item(device, u) for u in range(4)])
+
+    # Nouvelle file (fenêtre vide) : le contrôle en base écarte le rejeu
+    _, _, duplicates, duplicates_db = IngestionQueue()._write_batch([telemetry_item(device, u) for u in range(5)])
+    assert (duplicates, duplicates_db) == (0, 4)
+    assert stored(device) == 5
+
+
+def test_collision_with_legacy_row_keeps_the_rest_of_the_batch(database):
+    device = 'DE:D0:00:00:00:03'
+    legacy = packet(7)
+    db = SessionLocal()
+    try:
+        # Ligne antérieure au packet_id déterministe : même clé, packet_id aléatoire
+        db.add(Telemetry(
+            packet_id=str(uuid.uuid4()),
+            device_address=device,
+            timestamp=datetime.utcnow(),
+            uptime_s=7,
+            mode='AUTO',
+            checksum=hashlib.sha256(json.dumps(legacy, sort_keys=True).encode()).hexdigest()
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+    event = {'event_type': 'info', 'category': 'system', 'description': 'test'}
+    batch = [telemetry_item(device, 7), telemetry_item(device, 8), ('event', event, device, datetime.utcnow())]
+    totals, event_rows, duplicates, duplicates_db = IngestionQueue()._write_batch(batch)
+
+    assert (duplicates, duplicates_db) == (0, 1)
+    assert stored(device) == 2
+    assert len(event_rows) == 1
+    assert totals is not None
+
+    db = SessionLocal()
+    try:
+        assert db.query(Event).filter(Event.device_address == device).count() == 1
+    finally:
+        db.close()
+
+
+def test_flush_counts_only_written_rows(database):
+    device = 'DE:D0:00:00:00:04'
+    queue = IngestionQueue()
+    batch = [telemetry_item(device, u) for u in (1, 1, 2)]
+
+    asyncio.run(queue._flush(batch))
+
+    stats = queue.get_stats()
+    assert stats['duplicates'] == 1
+    assert stats['duplicates_db'] == 0
+    assert stats['rows_written'] == 2
+    assert stats['failed_rows'] == 0
+
+
+def test_existing_duplicates_are_only_removed_on_request(database):
+    device = 'DE:D0:00:00:00:05'
+    checksum = hashlib.sha256(b'legacy').hexdigest()
+    with engine.begin() as conn:
+        # Base antérieure à l'index unique : même paquet stocké trois fois (dont une en minuscules)
+        conn.execute(text(f'DROP INDEX {TELEMETRY_UNIQUE_INDEX}'))
+        for address in (device, device, device.lower()):
+            conn.execute(
+                text('INSERT INTO telemetry (packet_id, device_address, timestamp, received_at, uptime_s, checksum) '
+                     'VALUES (:packet_id, :address, :ts, :ts, 42, :checksum)'),
+                {'packet_id': str(uuid.uuid4()), 'address': address, 'ts': datetime.utcnow(), 'checksum': checksum}
+            )
+
+    # Sans demande explicite : rien n'est supprimé, l'index unique est reporté
+    assert migrate_schema() == 0
+    assert stored(device) == 3
+    with engine.connect() as conn:
+        assert TELEMETRY_UNIQUE_INDEX not in {index['name'] for index in inspect(conn).get_indexes('telemetry')}
+
+    assert migrate_schema(dedupe=True) == 2
+    assert stored(device) == 1
+    with engine.connect() as conn:
+        assert TELEMETRY_UNIQUE_INDEX in {index['name'] for index in inspect(conn).get_indexes('telemetry')}
+        backup = conn.execute(
+            text(f'SELECT COUNT(*) FROM {DUPLICATES_BACKUP_TABLE} WHERE UPPER(device_address) = :address'),
+            {'address': device}
+        ).scalar()
+    assert backup == 2
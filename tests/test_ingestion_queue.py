@@ -0,0 +1,59 @@
+"""
+File d'ingestion (IngestionQueue) : arrêt sans perte, soumissions refusées après stop()
+"""
+import asyncio
+from datetime import datetime
+
+from app.models.database import SessionLocal
+from app.models.telemetry import Telemetry
+from app.services.ingestion import IngestionQueue
+
+
+def packet(uptime_s: int) -> dict:
+    return {'uptime_s': uptime_s, 'mode': 'AUTO', 'speed_pwm': 120, 'dist_traveled_cm': 10.0}
+
+
+def stored(device: str) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(Telemetry).filter(Telemetry.device_address == device).count()
+    finally:
+        db.close()
+
+
+def test_stop_writes_partial_batch_then_rejects_submits(database):
+    device = 'DE:D1:00:00:00:01'
+
+    async def scenario():
+        # Lot jamais complet ni échu : seul l'arrêt déclenche l'écriture
+        queue = IngestionQueue(batch_size=100, flush_interval_ms=60000)
+        await queue.start()
+        accepted = [queue.submit_telemetry(packet(u), device_address=device) for u in range(5)]
+        await queue.stop()
+        late = queue.submit_telemetry(packet(99), device_address=device, received_at=datetime.utcnow())
+        return queue, accepted, late
+
+    queue, accepted, late = asyncio.run(scenario())
+    assert accepted == [True] * 5
+    assert stored(device) == 5
+    # Pas de writer orphelin après l'arrêt, thread d'écriture libéré
+    assert late is False
+    assert not queue.is_running
+    assert queue.get_stats()['rejected_stopped'] == 1
+    assert queue._executor._shutdown
+
+
+def test_restart_after_stop(database):
+    device = 'DE:D1:00:00:00:02'
+
+    async def scenario():
+        queue = IngestionQueue(batch_size=100, flush_interval_ms=60000)
+        await queue.start()
+        await queue.stop()
+        await queue.start()
+        accepted = queue.submit_telemetry(packet(1), device_address=device)
+        await queue.stop()
+        return accepted
+
+    assert asyncio.run(scenario()) is True
+    assert stored(device) == 1